@@ -0,0 +1,120 @@
+"""Admission control for the public (unauthenticated) endpoints.
+
+Public requests must get past two gates before a handler runs:
+
+- a token bucket per client IP (rate tokens per second, up to 'burst' saved up), so one
+  client can't monopolize the form endpoints;
+- a concurrency limit shared by all public requests, with a short bounded wait queue.
+  When the queue is full, or the wait runs out, the request is shed.
+
+Admin and dashboard endpoints don't go through the controller, so a burst of public
+submissions can't take every worker thread away from them.
+"""
+import math
+import threading
+import time
+from collections import OrderedDict
+
+
+class Rejected(Exception):
+    """Raised when a request is not admitted. 'reason' is 'rate_limited' or 'saturated'."""
+
+    def __init__(self, reason, retry_after):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class TokenBuckets:
+    """Per-key token buckets. Only the most recently seen max_keys keys are tracked."""
+
+    def __init__(self, rate, burst, max_keys=10000):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()  # key -> (tokens, last refill time)
+        self._lock = threading.Lock()
+
+    def take(self, key):
+        """Takes one token for 'key'. Returns 0 on success, else the seconds until a token is available."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, last = self._buckets.pop(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - last) * self.rate)
+            wait = 0 if tokens >= 1 else (1 - tokens) / self.rate
+            self._buckets[key] = (tokens - 1 if wait == 0 else tokens, now)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+            return wait
+
+    def __len__(self):
+        with self._lock:
+            return len(self._buckets)
+
+
+class AdmissionController:
+    """
+    Bounds public requests: at most max_concurrent run, at most max_queue wait (each up to
+    queue_timeout seconds) and every client IP is limited to rate requests/second with
+    bursts of 'burst'. Rejected requests should be answered with Retry-After: retry_after.
+    """
+
+    def __init__(self, max_concurrent=16, max_queue=32, queue_timeout=2.0, rate=1.0, burst=30, retry_after=5):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        self.buckets = TokenBuckets(rate, burst)
+        self._cond = threading.Condition()
+        self._in_flight = 0
+        self._queued = 0
+        self.admitted = 0
+        self.queued_total = 0
+        self.total_queue_ms = 0.0
+        self.shed = {'rate_limited': 0, 'queue_full': 0, 'queue_timeout': 0}
+
+    def acquire(self, client):
+        """Admits a request from 'client' (its IP) or raises Rejected. Pair every success with release()."""
+        wait = self.buckets.take(client)
+        if wait:
+            with self._cond:
+                self.shed['rate_limited'] += 1
+            raise Rejected('rate_limited', max(1, math.ceil(wait)))
+
+        with self._cond:
+            if self._in_flight < self.max_concurrent:
+                self._in_flight += 1
+                self.admitted += 1
+                return
+            if self._queued >= self.max_queue:
+                self.shed['queue_full'] += 1
+                raise Rejected('saturated', self.retry_after)
+            self._queued += 1
+            self.queued_total += 1
+            start = time.monotonic()
+            try:
+                admitted = self._cond.wait_for(lambda: self._in_flight < self.max_concurrent, self.queue_timeout)
+            finally:
+                self._queued -= 1
+                self.total_queue_ms += (time.monotonic() - start) * 1000
+            if not admitted:
+                self.shed['queue_timeout'] += 1
+                raise Rejected('saturated', self.retry_after)
+            self._in_flight += 1
+            self.admitted += 1
+
+    def release(self):
+        with self._cond:
+            self._in_flight -= 1
+            self._cond.notify()
+
+    def stats(self):
+        with self._cond:
+            return {
+                'in_flight': self._in_flight, 'queued': self._queued, 'admitted': self.admitted,
+                'shed': dict(self.shed), 'shed_total': sum(self.shed.values()),
+                'avg_queue_ms': round(self.total_queue_ms / self.queued_total, 3) if self.queued_total else 0.0,
+                'tracked_clients': len(self.buckets),
+                'max_concurrent': self.max_concurrent, 'max_queue': self.max_queue,
+                'queue_timeout': self.queue_timeout, 'rate': self.buckets.rate, 'burst': self.buckets.burst
+            }
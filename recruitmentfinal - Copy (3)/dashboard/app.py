@@ -1,15 +1,43 @@
 import os
 import io
+import csv
+import gzip
+import json
+import hashlib
+import hmac
+import logging
+import signal
+import tempfile
+import threading
+import time
 import traceback
 import sqlite3
-import pandas as pd
-import requests
-from flask import Flask, jsonify, render_template, request, redirect, url_for, session, send_from_directory
+import click
+from flask import Flask, jsonify, render_template, request, redirect, url_for, session, send_from_directory, g, has_request_context
 from werkzeug.security import generate_password_hash, check_password_hash
 from werkzeug.utils import secure_filename
+from werkzeug.exceptions import RequestEntityTooLarge
 from flask_cors import CORS
 from collections import defaultdict, OrderedDict
 
+import admission
+import changes
+import coherence
+import queries
+import rollups
+import row_versions
+import schema
+import search
+import ingest
+import metrics
+import migrations
+import payload
+import resume_store
+import resume_jobs
+import status_history
+from cache import ResponseCache
+from db import ConnectionPool, PoolTimeout
+
 # --- App Initialization ---
 app = Flask(__name__)
 # **MODIFICATION**: Configure CORS to allow requests to the API from any origin.
@@ -19,17 +47,100 @@ app.secret_key = os.environ.get('FLASK_SECRET_KEY', 'a-very-secure-and-random-de
 
 # --- Constants & Configuration ---
 DATABASE = 'recruitment_final.db'
+# Created by the first stored resume (see resume_store.store), not on import
 UPLOAD_FOLDER = 'uploads'
 ALLOWED_EXTENSIONS = {'pdf'}
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
+# Largest accepted resume; the rest of the submission form gets RESUME_FORM_OVERHEAD_BYTES on top
+RESUME_MAX_BYTES = int(os.environ.get('RESUME_MAX_BYTES', 10 * 1024 * 1024))
+RESUME_FORM_OVERHEAD_BYTES = 1024 * 1024
+# Worker processes extracting resume text in the background
+RESUME_WORKER_PROCESSES = int(os.environ.get('RESUME_WORKER_PROCESSES', 2))
+# Set to 0 to run resume extraction only in a separate "flask process-resumes --watch" process
+# instead of in the web process (gunicorn.conf.py does, and starts that process once per host)
+RESUME_WORKER_IN_WEB = os.environ.get('RESUME_WORKER_IN_WEB', '1') != '0'
+# Submissions are written by one thread in group commits: at most INGEST_MAX_BATCH per
+# transaction, waiting up to INGEST_MAX_DELAY_MS for more to arrive
+INGEST_MAX_BATCH = int(os.environ.get('INGEST_MAX_BATCH', 200))
+INGEST_MAX_DELAY_MS = float(os.environ.get('INGEST_MAX_DELAY_MS', 5))
+# Seconds a submitting request waits for the writer before answering 503
+INGEST_SUBMIT_TIMEOUT = float(os.environ.get('INGEST_SUBMIT_TIMEOUT', 10))
+
+# Request threads of each web worker process (gunicorn.conf.py starts workers with this many);
+# the per-worker limits below default to shares of it
+SERVER_THREADS = int(os.environ.get('SERVER_THREADS', 16))
+
+# Admission control for the public endpoints (campus forms): concurrent requests, wait queue,
+# and a per-IP token bucket. Admin and dashboard endpoints are not limited. Running and queued
+# public requests both hold a request thread, so each gets a quarter of them by default.
+PUBLIC_MAX_CONCURRENT = int(os.environ.get('PUBLIC_MAX_CONCURRENT', max(1, SERVER_THREADS // 4)))
+PUBLIC_MAX_QUEUE = int(os.environ.get('PUBLIC_MAX_QUEUE', max(1, SERVER_THREADS // 4)))
+PUBLIC_QUEUE_TIMEOUT = float(os.environ.get('PUBLIC_QUEUE_TIMEOUT', 2))
+PUBLIC_RATE_PER_IP = float(os.environ.get('PUBLIC_RATE_PER_IP', 2))
+PUBLIC_BURST_PER_IP = int(os.environ.get('PUBLIC_BURST_PER_IP', 60))
+PUBLIC_RETRY_AFTER = int(os.environ.get('PUBLIC_RETRY_AFTER', 5))
+PUBLIC_ENDPOINTS = {'api_submit_application', 'get_public_form_config'}
+# Public endpoints look for other workers' writes (coherence.py) at most this often per worker,
+# so a cached form config is answered without touching the database; dashboard and admin
+# requests look on every request
+SHARED_VERSIONS_CHECK_MS = float(os.environ.get('SHARED_VERSIONS_CHECK_MS', 1000))
 
 DEFAULT_ADMIN_EMAIL = os.environ.get('ADMIN_EMAIL', 'admin@adventz.com')
 DEFAULT_ADMIN_PASSWORD = os.environ.get('ADMIN_PASSWORD', '12345')
 # Core fields that are essential and cannot be deleted by the admin
 CORE_FIELDS = ['id', 'name', 'email', 'submission_timestamp', 'resume_path']
 
-if not os.path.exists(UPLOAD_FOLDER):
-    os.makedirs(UPLOAD_FOLDER)
+# SQLite connection pool (WAL journaling, busy timeout, tuned pragmas): by default one connection
+# per request thread plus a few for the ingest writer and the background workers
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', SERVER_THREADS + 4))
+DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', 10))
+DB_BUSY_TIMEOUT_MS = int(os.environ.get('DB_BUSY_TIMEOUT_MS', 5000))
+
+# In-process cache of computed /api/data payloads, bounded by entry count and total bytes
+DATA_CACHE_MAX_ENTRIES = int(os.environ.get('DATA_CACHE_MAX_ENTRIES', 128))
+DATA_CACHE_MAX_BYTES = int(os.environ.get('DATA_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+data_cache = ResponseCache(max_entries=DATA_CACHE_MAX_ENTRIES, max_bytes=DATA_CACHE_MAX_BYTES)
+
+# Live dashboard updates (Server-Sent Events): events kept for reconnecting clients, events
+# buffered per client before it is sent a resync instead, and the keepalive interval. Every open
+# stream holds a request thread, so a worker keeps at most a quarter of its threads streaming;
+# dashboards turned away poll for changes instead (see connectLiveUpdates in main.js).
+CHANGE_HISTORY = int(os.environ.get('CHANGE_HISTORY', 256))
+CHANGE_MAX_PENDING = int(os.environ.get('CHANGE_MAX_PENDING', 64))
+CHANGE_MAX_SUBSCRIBERS = int(os.environ.get('CHANGE_MAX_SUBSCRIBERS', max(1, SERVER_THREADS // 4)))
+SSE_HEARTBEAT_SECONDS = float(os.environ.get('SSE_HEARTBEAT_SECONDS', 15))
+SSE_RETRY_MS = 5000
+change_bus = changes.ChangeBus(history=CHANGE_HISTORY, max_pending=CHANGE_MAX_PENDING, max_subscribers=CHANGE_MAX_SUBSCRIBERS)
+
+# Public requests and live streams must leave threads over for the dashboard and admin requests.
+# gunicorn.conf.py refuses to start workers that break this; other servers only get the warning.
+if PUBLIC_MAX_CONCURRENT + PUBLIC_MAX_QUEUE + CHANGE_MAX_SUBSCRIBERS >= SERVER_THREADS:
+    print(f"Warning: PUBLIC_MAX_CONCURRENT + PUBLIC_MAX_QUEUE + CHANGE_MAX_SUBSCRIBERS should be below SERVER_THREADS "
+          f"({PUBLIC_MAX_CONCURRENT} + {PUBLIC_MAX_QUEUE} + {CHANGE_MAX_SUBSCRIBERS} >= {SERVER_THREADS}).")
+
+# Instrumentation: /metrics (Prometheus text format) and one JSON log line per request on stderr,
+# plus one per statement slower than SLOW_QUERY_MS. Scrapers without an admin session send
+# "Authorization: Bearer <METRICS_TOKEN>".
+JSON_LOGS = os.environ.get('JSON_LOGS', '1') != '0'
+SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS', 200))
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+request_logger = logging.getLogger('dashboard')
+if JSON_LOGS and not request_logger.handlers:
+    _log_handler = logging.StreamHandler()
+    _log_handler.setFormatter(metrics.JsonFormatter())
+    request_logger.addHandler(_log_handler)
+    request_logger.setLevel(logging.INFO)
+    request_logger.propagate = False
+app_metrics = metrics.Metrics(logger=request_logger if JSON_LOGS else None, slow_query_ms=SLOW_QUERY_MS)
+
+# Admins can profile a single request with "X-Profile: cprofile|sample" or "?_profile=cprofile|sample";
+# the newest PROFILE_MAX_FILES profiles are kept in PROFILE_FOLDER. profiling.py (and importer.py)
+# are only imported by the requests that use them.
+PROFILE_FOLDER = os.environ.get('PROFILE_FOLDER', 'profiles')
+PROFILE_MAX_FILES = int(os.environ.get('PROFILE_MAX_FILES', 20))
+PROFILE_SAMPLE_INTERVAL_MS = float(os.environ.get('PROFILE_SAMPLE_INTERVAL_MS', 5))
+_profile_store = None
+_profile_store_lock = threading.Lock()
 
 def allowed_file(filename):
     return '.' in filename and \
@@ -37,242 +148,264 @@ def allowed_file(filename):
 
 # --- Database Management ---
 
+_db_pool = None
+_db_pool_lock = threading.Lock()
+
+def get_db_pool():
+    global _db_pool
+    with _db_pool_lock:
+        if _db_pool is None or _db_pool.database != DATABASE:
+            if _db_pool is not None:
+                _db_pool.close_all()
+            _db_pool = ConnectionPool(DATABASE, max_size=DB_POOL_SIZE, timeout=DB_POOL_TIMEOUT, busy_timeout_ms=DB_BUSY_TIMEOUT_MS,
+                                      on_query=app_metrics.record_query)
+        return _db_pool
+
+def get_profile_store():
+    global _profile_store
+    with _profile_store_lock:
+        if _profile_store is None:
+            import profiling
+            _profile_store = profiling.ProfileStore(PROFILE_FOLDER, max_profiles=PROFILE_MAX_FILES)
+        return _profile_store
+
 def get_db_conn():
-    """Establishes a connection to the SQLite database."""
-    conn = sqlite3.connect(DATABASE, check_same_thread=False)
-    conn.row_factory = sqlite3.Row
-    return conn
+    """
+    Returns a pooled connection to the SQLite database.
+
+    Inside a request the same connection is reused for the whole request and handed back to
+    the pool on teardown, so handlers calling conn.close() early is harmless. Outside a request
+    (CLI, init_db, background threads) close() returns the connection to the pool.
+    """
+    if not has_request_context():
+        return get_db_pool().acquire()
+    if 'db_conn' not in g:
+        conn = get_db_pool().acquire()
+        conn._request_bound = True
+        g.db_conn = conn
+    return g.db_conn
+
+@app.teardown_appcontext
+def release_db_conn(exception):
+    conn = g.pop('db_conn', None)
+    if conn is not None:
+        conn._request_bound = False
+        conn.close()
+
+resume_worker = resume_jobs.ResumeWorker(lambda: get_db_conn(), UPLOAD_FOLDER, processes=RESUME_WORKER_PROCESSES,
+                                         on_error=app_metrics.record_background_error)
+# Reindexes search documents after form field changes, off the request path
+search_reindexer = search.Reindexer(lambda: get_db_pool().acquire(), on_error=app_metrics.record_background_error)
+
+def on_submissions_committed(conn, application_ids, groups):
+    placeholders = ', '.join('?' * len(application_ids))
+    invalidate_caches(change=('application', changes.build_row_event(conn, f"a.rowid IN ({placeholders})", application_ids, groups)), conn=conn)
+    resume_worker.notify()
+
+submission_queue = ingest.IngestQueue(lambda: get_db_pool().acquire(), on_commit=on_submissions_committed,
+                                      max_batch=INGEST_MAX_BATCH, max_delay_ms=INGEST_MAX_DELAY_MS,
+                                      submit_timeout=INGEST_SUBMIT_TIMEOUT, on_error=app_metrics.record_background_error)
+
+_change_lock = threading.Lock()
+# The cache_state versions this process has caught up with (see coherence.py)
+shared_versions = coherence.SharedVersions()
+
+def invalidate_caches(form_config=False, change=None, conn=None):
+    """
+    Called after every committed write; cached responses computed before it become unreachable.
+    Pass form_config=True when form_config or form_sections changed so the public form snapshot is rebuilt.
+
+    The write is counted in the shared cache_state row (on 'conn', or a pooled connection), so
+    the other worker processes drop their caches as well. Each call also publishes one event to
+    the live dashboards, numbered with the new shared data version: 'change' is its (type, data),
+    see changes.py; without it the dashboards are sent form_config (with form_config=True) or
+    resync. When other processes wrote in between, the delta would not be enough and they are
+    sent a resync (or form_config) instead.
+    """
+    if change is None:
+        change = ('form_config', None) if form_config else ('resync', None)
+    own_conn = conn is None
+    if own_conn:
+        conn = get_db_conn()
+    try:
+        # Versions must reach the bus in order, so a reconnecting client's Last-Event-ID is meaningful
+        with _change_lock:
+            version, data_elsewhere, form_config_elsewhere = shared_versions.bump(conn, form_config)
+            data_cache.bump_version(version)
+            if data_elsewhere:
+                change = ('form_config', None) if form_config or form_config_elsewhere else ('resync', None)
+            change_bus.publish(version, *change)
+    finally:
+        if own_conn:
+            conn.close()
+    if form_config or form_config_elsewhere:
+        invalidate_form_config_snapshot()
+
+def catch_up_shared_versions(conn):
+    """Drops this process's caches if other processes wrote since it last looked, and tells its live dashboards."""
+    versions = coherence.read_versions(conn)
+    if shared_versions.is_current(versions):
+        return
+    with _change_lock:
+        data_changed, form_config_changed = shared_versions.catch_up(versions)
+        if data_changed:
+            data_cache.bump_version(shared_versions.data_version)
+            change_bus.publish(shared_versions.data_version, 'form_config' if form_config_changed else 'resync', None)
+    if form_config_changed:
+        invalidate_form_config_snapshot()
 
 def init_db():
-    """Initializes and migrates database tables, creates form config, and default admin."""
-    print("Initializing database...")
+    """Applies pending schema migrations (see migrations.py) and creates the default admin."""
     with app.app_context():
         conn = get_db_conn()
-        cursor = conn.cursor()
-        
-        # Check if custom sections already exist - if so, skip form config initialization
         try:
-            custom_sections = cursor.execute("SELECT COUNT(*) FROM form_sections WHERE name = 'Personal Details'").fetchone()
-            if custom_sections and custom_sections[0] > 0:
-                print("Custom sections detected - skipping form config initialization")
-                # Still create other tables but skip form config population
-                cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS users (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        email TEXT UNIQUE NOT NULL,
-                        password_hash TEXT NOT NULL,
-                        role TEXT NOT NULL CHECK(role IN ('admin', 'viewer'))
-                    )
-                ''')
-                cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS statuses (
-                        email TEXT PRIMARY KEY,
-                        name TEXT,
-                        status TEXT NOT NULL
-                    )
-                ''')
-                
-                # Create form_config table if it doesn't exist
-                cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS form_config (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        name TEXT UNIQUE NOT NULL,
-                        label TEXT NOT NULL,
-                        type TEXT NOT NULL,
-                        subsection TEXT,
-                        options TEXT,
-                        required BOOLEAN NOT NULL DEFAULT 0,
-                        is_core BOOLEAN NOT NULL DEFAULT 0,
-                        field_order INTEGER DEFAULT 0,
-                        validations TEXT
-                    )
-                ''')
-                
-                # Create form_sections table if it doesn't exist
-                cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS form_sections (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        name TEXT UNIQUE NOT NULL,
-                        section_order INTEGER DEFAULT 0,
-                        description TEXT,
-                        icon TEXT DEFAULT 'folder',
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                    )
-                ''')
-                
+            applied = migrations.migrate(conn)
+            if applied:
+                print(f"Database migrated to schema version {migrations.LATEST_VERSION}.")
+            catch_up_shared_versions(conn)
+
+            # --- Create Default Admin ---
+            if conn.execute("SELECT id FROM users WHERE role = 'admin' LIMIT 1").fetchone() is None:
+                hashed_password = generate_password_hash(DEFAULT_ADMIN_PASSWORD)
+                # Workers starting together all get here; one statement, so only the first inserts
+                created = conn.execute(
+                    "INSERT OR IGNORE INTO users (email, password_hash, role) SELECT ?, ?, 'admin' "
+                    "WHERE NOT EXISTS (SELECT 1 FROM users WHERE role = 'admin')",
+                    (DEFAULT_ADMIN_EMAIL, hashed_password)
+                ).rowcount
                 conn.commit()
-                conn.close()
-                print("Database initialized successfully (custom sections preserved).")
-                return
-        except:
-            pass  # Table doesn't exist yet, continue with normal initialization
+                if created:
+                    print(f"No admin user found. Created default admin: {DEFAULT_ADMIN_EMAIL}")
+        finally:
+            conn.close()
 
-        # --- User and Status Tables ---
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS users (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                email TEXT UNIQUE NOT NULL,
-                password_hash TEXT NOT NULL,
-                role TEXT NOT NULL CHECK(role IN ('admin', 'viewer'))
-            )
-        ''')
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS statuses (
-                email TEXT PRIMARY KEY,
-                name TEXT,
-                status TEXT NOT NULL
-            )
-        ''')
+# --- Instrumentation ---
 
-        # --- Dynamic Form Configuration Table ---
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS form_config (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT UNIQUE NOT NULL,
-                label TEXT NOT NULL,
-                type TEXT NOT NULL,
-                subsection TEXT,
-                options TEXT,
-                required BOOLEAN NOT NULL DEFAULT 0,
-                is_core BOOLEAN NOT NULL DEFAULT 0,
-                field_order INTEGER DEFAULT 0
-            )
-        ''')
-
-        # --- Migration check for new columns in form_config ---
-        cursor.execute("PRAGMA table_info(form_config)")
-        columns = [col['name'] for col in cursor.fetchall()]
-        if 'subsection' not in columns:
-            print("Migrating form_config: Adding 'subsection' column...")
-            cursor.execute("ALTER TABLE form_config ADD COLUMN subsection TEXT")
-        if 'field_order' not in columns:
-            print("Migrating form_config: Adding 'field_order' column...")
-            cursor.execute("ALTER TABLE form_config ADD COLUMN field_order INTEGER DEFAULT 0")
-        if 'validations' not in columns:
-            print("Migrating form_config: Adding 'validations' column...")
-            cursor.execute("ALTER TABLE form_config ADD COLUMN validations TEXT DEFAULT '{}'")
-
-
-        # --- Applications Table (Initially simple, will be altered by form config) ---
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS applications (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT,
-                email TEXT UNIQUE,
-                submission_timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-                resume_path TEXT
-            )
-        ''')
-        
-        cursor.execute("PRAGMA table_info(applications)")
-        app_columns = [col['name'] for col in cursor.fetchall()]
-        if 'resume_path' not in app_columns:
-            print("Migrating applications: Adding 'resume_path' column...")
-            cursor.execute("ALTER TABLE applications ADD COLUMN resume_path TEXT")
+@app.before_request
+def start_request_trace():
+    g.metrics_token = app_metrics.start_trace()
 
+@app.after_request
+def record_request_metrics(response):
+    """Registered before the other after_request hooks, so it runs last and sees the body as sent."""
+    token = g.pop('metrics_token', None)
+    if token is not None:
+        size = None if response.is_streamed else response.calculate_content_length()
+        app_metrics.finish_trace(token, request.endpoint or 'unmatched', request.method, request.path,
+                                 response.status_code, size)
+    return response
 
-        # --- Populate Form Config if it's empty ---
-        cursor.execute("SELECT COUNT(id) as count FROM form_config")
-        if cursor.fetchone()['count'] == 0:
-            print("Form config is empty. Populating with fields from recruitment-form.html...")
-            
-            # This list is now based on the user-provided recruitment-form.html
-            default_fields = [
-                # Personal Details
-                {'name': 'name', 'label': 'Full Name', 'type': 'text', 'subsection': 'Personal Details', 'required': 1, 'is_core': 1},
-                {'name': 'email', 'label': 'Email Address', 'type': 'email', 'subsection': 'Personal Details', 'required': 1, 'is_core': 1},
-                {'name': 'dob', 'label': 'Date of Birth', 'type': 'date', 'subsection': 'Personal Details', 'required': 1},
-                {'name': 'place_of_birth', 'label': 'Place of Birth', 'type': 'text', 'subsection': 'Personal Details', 'required': 0},
-                {'name': 'gender', 'label': 'Gender', 'type': 'select', 'options': 'Male, Female, Other', 'subsection': 'Personal Details', 'required': 0},
-                {'name': 'nationality', 'label': 'Nationality', 'type': 'text', 'subsection': 'Personal Details', 'required': 0},
-                {'name': 'father_name', 'label': "Father's Name", 'type': 'text', 'subsection': 'Personal Details', 'required': 0},
-                {'name': 'blood_group', 'label': 'Blood Group', 'type': 'select', 'options': 'A+, A-, B+, B-, AB+, AB-, O+, O-', 'subsection': 'Personal Details', 'required': 0},
-                {'name': 'pan_card', 'label': 'PAN Card Number', 'type': 'text', 'subsection': 'Personal Details', 'required': 0},
-                {'name': 'marital_status', 'label': 'Marital Status', 'type': 'select', 'options': 'Single, Married, Divorced, Widowed', 'subsection': 'Personal Details', 'required': 0},
-                
-                # Spouse's Details
-                {'name': 'spouse_name', 'label': "Spouse's Name", 'type': 'text', 'subsection': "Spouse's Details", 'required': 0},
-                {'name': 'spouse_employment', 'label': "Spouse's Employment Status", 'type': 'text', 'subsection': "Spouse's Details", 'required': 0},
-                {'name': 'spouse_work_details', 'label': 'Spouse Work Details', 'type': 'textarea', 'subsection': "Spouse's Details", 'required': 0},
-                {'name': 'children_count', 'label': 'Number of Children', 'type': 'number', 'subsection': "Spouse's Details", 'required': 0},
-
-                # Contact & Position
-                {'name': 'mobile_number', 'label': 'Mobile Number', 'type': 'tel', 'subsection': 'Contact & Position', 'required': 1},
-                {'name': 'business_entity', 'label': 'Business Entity', 'type': 'select', 'options': 'SIL, ZIL, ZMSL, ZIIL', 'subsection': 'Contact & Position', 'required': 0},
-                {'name': 'post_applying_for', 'label': 'Post Applying For', 'type': 'select', 'options': 'Intern, Civil Engineer, Graduate Engineer Trainee, Software Developer Trainee, Data Analyst Trainee, Business Development Executive, Human Resources Trainee, Marketing Trainee', 'subsection': 'Contact & Position', 'required': 0},
-                {'name': 'location_of_position', 'label': 'Location of Position', 'type': 'select', 'options': 'Gurugram, Pune, Bangalore', 'subsection': 'Contact & Position', 'required': 0},
-                {'name': 'present_address', 'label': 'Present Address', 'type': 'textarea', 'subsection': 'Contact & Position', 'required': 1},
-                {'name': 'permanent_address', 'label': 'Permanent Address', 'type': 'textarea', 'subsection': 'Contact & Position', 'required': 0},
-                {'name': 'hobbies', 'label': 'Hobbies / Leisure Activities', 'type': 'text', 'subsection': 'Contact & Position', 'required': 0},
-
-                # Academic Qualifications
-                {'name': 'qualification_10th_school', 'label': '10th School/College', 'type': 'text', 'subsection': 'Academic Qualifications', 'required': 0},
-                {'name': 'qualification_10th_board', 'label': '10th Board', 'type': 'text', 'subsection': 'Academic Qualifications', 'required': 0},
-                {'name': 'qualification_10th_subjects', 'label': '10th Main Subjects', 'type': 'text', 'subsection': 'Academic Qualifications', 'required': 0},
-                {'name': 'qualification_10th_year', 'label': '10th Year of Passing', 'type': 'text', 'subsection': 'Academic Qualifications', 'required': 0},
-                {'name': 'qualification_10th_marks', 'label': '10th % Marks / CGPA', 'type': 'text', 'subsection': 'Academic Qualifications', 'required': 0},
-                {'name': 'qualification_10th_division', 'label': '10th Division/Class', 'type': 'text', 'subsection': 'Academic Qualifications', 'required': 0},
-                
-                {'name': 'qualification_12th_school', 'label': '12th School/College', 'type': 'text', 'subsection': 'Academic Qualifications', 'required': 0},
-                {'name': 'qualification_12th_board', 'label': '12th Board/University', 'type': 'text', 'subsection': 'Academic Qualifications', 'required': 0},
-                {'name': 'qualification_12th_specialization', 'label': '12th Course Specialization', 'type': 'text', 'subsection': 'Academic Qualifications', 'required': 0},
-                {'name': 'qualification_12th_year', 'label': '12th Year of Passing', 'type': 'text', 'subsection': 'Academic Qualifications', 'required': 0},
-                {'name': 'qualification_12th_marks', 'label': '12th % Marks / CGPA', 'type': 'text', 'subsection': 'Academic Qualifications', 'required': 0},
-                {'name': 'qualification_12th_division', 'label': '12th Division/Class', 'type': 'text', 'subsection': 'Academic Qualifications', 'required': 0},
-
-                {'name': 'qualification_grad_school', 'label': 'Graduation Institute/College', 'type': 'text', 'subsection': 'Academic Qualifications', 'required': 0},
-                {'name': 'qualification_grad_course', 'label': 'Graduation Course', 'type': 'text', 'subsection': 'Academic Qualifications', 'required': 0},
-                {'name': 'qualification_grad_specialization', 'label': 'Graduation Course Specialization', 'type': 'text', 'subsection': 'Academic Qualifications', 'required': 0},
-                {'name': 'qualification_grad_year', 'label': 'Graduation Year of Passing', 'type': 'text', 'subsection': 'Academic Qualifications', 'required': 0},
-                {'name': 'qualification_grad_marks', 'label': 'Graduation % Marks / CGPA', 'type': 'text', 'subsection': 'Academic Qualifications', 'required': 0},
-                {'name': 'qualification_grad_division', 'label': 'Graduation Division/Class', 'type': 'text', 'subsection': 'Academic Qualifications', 'required': 0},
-
-                {'name': 'qualification_pg_school', 'label': 'Post-Graduation Institute/College', 'type': 'text', 'subsection': 'Academic Qualifications', 'required': 0},
-                {'name': 'qualification_pg_course', 'label': 'Post-Graduation Course', 'type': 'text', 'subsection': 'Academic Qualifications', 'required': 0},
-                {'name': 'qualification_pg_specialization', 'label': 'Post-Graduation Course Specialization', 'type': 'text', 'subsection': 'Academic Qualifications', 'required': 0},
-                {'name': 'qualification_pg_year', 'label': 'Post-Graduation Year of Passing', 'type': 'text', 'subsection': 'Academic Qualifications', 'required': 0},
-                {'name': 'qualification_pg_marks', 'label': 'Post-Graduation % Marks / CGPA', 'type': 'text', 'subsection': 'Academic Qualifications', 'required': 0},
-                {'name': 'qualification_pg_division', 'label': 'Post-Graduation Division/Class', 'type': 'text', 'subsection': 'Academic Qualifications', 'required': 0},
-
-                # Additional Information
-                {'name': 'previously_applied', 'label': 'Have you applied with us earlier?', 'type': 'radio', 'options': 'Yes, No', 'subsection': 'Additional Information', 'required': 0},
-                {'name': 'related_employee', 'label': 'Are you related to any employee?', 'type': 'radio', 'options': 'Yes, No', 'subsection': 'Additional Information', 'required': 0},
-                {'name': 'related_employee_details', 'label': 'If yes, provide details', 'type': 'textarea', 'subsection': 'Additional Information', 'required': 0},
-                {'name': 'legal_cases', 'label': 'Are there any criminal/civil cases against you?', 'type': 'radio', 'options': 'Yes, No', 'subsection': 'Additional Information', 'required': 0},
-                {'name': 'legal_cases_details', 'label': 'If yes, provide details', 'type': 'textarea', 'subsection': 'Additional Information', 'required': 0},
-            ]
-
-            cursor.execute("PRAGMA table_info(applications)")
-            existing_columns = [row['name'] for row in cursor.fetchall()]
-
-            for i, field in enumerate(default_fields):
-                field.setdefault('is_core', 0)
-                field.setdefault('options', None)
-                field.setdefault('required', 0)
-                
-                if field['name'] not in existing_columns:
-                    try:
-                        cursor.execute(f"ALTER TABLE applications ADD COLUMN {field['name']} TEXT")
-                        print(f"Added column '{field['name']}' to applications table.")
-                    except sqlite3.OperationalError as e:
-                        print(f"Could not add column {field['name']}: {e}")
-                
-                cursor.execute(
-                    "INSERT INTO form_config (name, label, type, subsection, options, required, is_core, field_order) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
-                    (field['name'], field['label'], field['type'], field['subsection'], field.get('options'), field['required'], field['is_core'], i)
-                )
-            print("Default form config populated with all fields.")
-
-        # --- Create Default Admin ---
-        cursor.execute("SELECT id FROM users WHERE role = 'admin' LIMIT 1")
-        if cursor.fetchone() is None:
-            print(f"No admin user found. Creating default admin: {DEFAULT_ADMIN_EMAIL}")
-            hashed_password = generate_password_hash(DEFAULT_ADMIN_PASSWORD)
-            cursor.execute("INSERT INTO users (email, password_hash, role) VALUES (?, ?, ?)", (DEFAULT_ADMIN_EMAIL, hashed_password, 'admin'))
-        
-        conn.commit()
+def collect_gauges():
+    pool, cache, public = get_db_pool().stats(), data_cache.stats(), public_admission.stats()
+    return {
+        'dashboard_db_pool_connections': ('Open pooled SQLite connections.', pool['created']),
+        'dashboard_db_pool_in_use': ('Pooled connections checked out.', pool['in_use']),
+        'dashboard_db_pool_waiting': ('Threads waiting for a pooled connection.', pool['waiting']),
+        'dashboard_db_pool_timeouts': ('Connection requests that timed out since start.', pool['timeouts']),
+        'dashboard_data_version': ('Data version of the response cache and change stream.', cache['version']),
+        'dashboard_data_cache_bytes': ('Bytes held by the /api/data response cache.', cache['bytes']),
+        'dashboard_data_cache_hits': ('Response cache hits since start.', cache['hits']),
+        'dashboard_data_cache_misses': ('Response cache misses since start.', cache['misses']),
+        'dashboard_ingest_pending': ('Submissions waiting for the group-commit writer.', submission_queue.stats()['pending']),
+        'dashboard_public_in_flight': ('Public requests being handled.', public['in_flight']),
+        'dashboard_public_queued': ('Public requests waiting for admission.', public['queued']),
+        'dashboard_public_shed': ('Public requests rejected since start.', public['shed_total']),
+        'dashboard_sse_subscribers': ('Connected live dashboard streams.', change_bus.stats()['subscribers']),
+    }
+
+app_metrics.add_gauges(collect_gauges)
+
+# --- Request Profiling ---
+
+@app.before_request
+def start_request_profile():
+    requested = request.headers.get('X-Profile') or request.args.get('_profile')
+    if not requested or session.get('user_role') != 'admin':
+        return
+    import profiling
+    mode = profiling.parse_mode(requested)
+    if mode is None:
+        return
+    try:
+        g.request_profile = profiling.RequestProfile(mode, PROFILE_SAMPLE_INTERVAL_MS)
+    except ValueError:
+        pass  # another profiler is active in this process
+
+@app.after_request
+def save_request_profile(response):
+    """Registered ahead of compress_response, so the profile covers compression too."""
+    profile = g.pop('request_profile', None)
+    if profile is None:
+        return response
+    duration_ms = profile.finish()
+    try:
+        response.headers['X-Profile-Id'] = get_profile_store().save(profile, {
+            'method': request.method, 'path': request.full_path.rstrip('?'), 'endpoint': request.endpoint,
+            'status': response.status_code, 'duration_ms': round(duration_ms, 3), 'user': session.get('user_email'),
+        })
+    except OSError:
+        print(f"--- PROFILE SAVE ERROR ---\n{traceback.format_exc()}")
+    return response
+
+# --- Admission Control ---
+
+public_admission = admission.AdmissionController(
+    max_concurrent=PUBLIC_MAX_CONCURRENT, max_queue=PUBLIC_MAX_QUEUE, queue_timeout=PUBLIC_QUEUE_TIMEOUT,
+    rate=PUBLIC_RATE_PER_IP, burst=PUBLIC_BURST_PER_IP, retry_after=PUBLIC_RETRY_AFTER
+)
+
+@app.before_request
+def admit_public_request():
+    """Runs before the body is read, so shed requests never tie up a worker with their upload."""
+    if request.endpoint not in PUBLIC_ENDPOINTS or request.method == 'OPTIONS':
+        return None
+    try:
+        public_admission.acquire(request.remote_addr or 'unknown')
+    except admission.Rejected as e:
+        if e.reason == 'rate_limited':
+            response = jsonify({"error": "Too many requests from this address. Please try again shortly."})
+            response.status_code = 429
+        else:
+            response = jsonify({"error": "The server is busy. Please try again shortly."})
+            response.status_code = 503
+        response.headers['Retry-After'] = str(e.retry_after)
+        return response
+    g.public_admitted = True
+    return None
+
+@app.errorhandler(PoolTimeout)
+def handle_pool_timeout(e):
+    """Every pooled connection stayed busy for DB_POOL_TIMEOUT: ask the client to come back."""
+    response = jsonify({"error": "The server is busy. Please try again shortly."})
+    response.status_code = 503
+    response.headers['Retry-After'] = str(PUBLIC_RETRY_AFTER)
+    return response
+
+@app.teardown_request
+def release_public_request(exception):
+    if g.pop('public_admitted', False):
+        public_admission.release()
+
+# --- Cross-Process Cache Coherence ---
+
+_shared_versions_checked_at = 0.0  # time.monotonic() of the last check
+
+@app.before_request
+def check_shared_versions():
+    """One indexed read: notices writes made by other worker processes (or the CLI)."""
+    global _shared_versions_checked_at
+    if request.endpoint in (None, 'static'):
+        return
+    now = time.monotonic()
+    if request.endpoint in PUBLIC_ENDPOINTS and now - _shared_versions_checked_at < SHARED_VERSIONS_CHECK_MS / 1000:
+        return
+    _shared_versions_checked_at = now
+    # Returned right away, not bound to the request: submissions wait on the ingest writer without holding one
+    conn = get_db_pool().acquire()
+    try:
+        catch_up_shared_versions(conn)
+    finally:
         conn.close()
-        print("Database initialized successfully.")
 
 # --- Web Routes ---
 
@@ -311,153 +444,338 @@ def route_logout():
     session.clear()
     return redirect(url_for('route_admin_login'))
 
-@app.route('/uploads/<filename>')
+@app.route('/uploads/<path:filename>')
 def uploaded_file(filename):
     return send_from_directory(app.config['UPLOAD_FOLDER'], filename)
 
 # --- API Endpoints ---
 
+def get_table_format():
+    """The table encoding a request asked for with 'format' (see payload.py). Raises ValueError for an unknown one."""
+    table_format = request.args.get('format', 'rows')
+    if table_format not in payload.TABLE_FORMATS:
+        raise ValueError(f"format must be one of: {', '.join(payload.TABLE_FORMATS)}.")
+    return table_format
+
+@app.after_request
+def compress_response(response):
+    """Compresses JSON responses for clients that accept it, unless they are streamed or set their own encoding or ETag."""
+    if (response.status_code != 200 or response.mimetype != 'application/json' or response.is_streamed
+            or response.direct_passthrough or 'Content-Encoding' in response.headers or response.get_etag()[0]):
+        return response
+    response.vary.add('Accept-Encoding')
+    encoding = payload.negotiate_encoding(request.accept_encodings)
+    if encoding is None or (response.content_length or 0) < payload.COMPRESS_MIN_BYTES:
+        return response
+    response.set_data(payload.compress(response.get_data(), encoding))
+    response.headers['Content-Encoding'] = encoding
+    return response
+
 @app.route('/api/data')
 def api_get_data():
     if 'user_id' not in session:
         return jsonify({"error": "Authentication required."}), 401
     try:
-        conn = get_db_conn()
-        df = pd.read_sql_query("SELECT * FROM applications", conn)
-        if df.empty:
-            conn.close()
-            return jsonify({"kpis": {}, "charts": {}, "table_data": [], "all_columns": [], "default_columns": [], "filters": {}})
+        table_format = get_table_format()
+        encoding = payload.negotiate_encoding(request.accept_encodings)
+        # Take the key (and so the data version) before reading, so a concurrent write can't be cached as current.
+        # Bodies are cached compressed, once per encoding.
+        cache_key = data_cache.make_key({**request.args.to_dict(), 'encoding': encoding})
+        body = data_cache.get(cache_key)
+        cache_status = 'HIT'
+        if body is None:
+            cache_status = 'MISS'
+            conn = get_db_conn()
+            try:
+                include_table = request.args.get('include_table', '1') != '0'
+                version = row_versions.get_version(conn) if include_table else None
+                with metrics.span('dashboard_query'):
+                    data = queries.get_dashboard_data(conn, request.args, include_table=include_table, table_format=table_format)
+                if include_table:
+                    data['version'] = version  # baseline for /api/table/changes
+                    data['format'] = table_format
+            finally:
+                conn.close()
+            with metrics.span('serialize'):
+                body = app.json.dumps(data).encode('utf-8')
+            with metrics.span('compress'):
+                body = payload.compress(body, encoding)
+            data_cache.put(cache_key, body)
+        response = app.response_class(body, mimetype='application/json')
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        response.vary.add('Accept-Encoding')
+        response.headers['X-Cache'] = cache_status
+        # Live update events up to this version are already reflected in the payload
+        response.headers['X-Data-Version'] = str(cache_key[0])
+        return response
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        print(f"--- API ERROR in /api/data ---\n{traceback.format_exc()}")
+        return jsonify({"error": "An error occurred on the server.", "message": str(e)}), 500
+
+@app.route('/api/changes')
+def api_change_stream():
+    """
+    Server-Sent Events stream of dashboard changes (see changes.py for the event types).
+
+    Reconnecting clients send Last-Event-ID and get the events they missed, or a resync.
+    """
+    if 'user_id' not in session:
+        return jsonify({"error": "Authentication required."}), 401
+    last_event_id = request.headers.get('Last-Event-ID')
+    subscription = change_bus.subscribe(int(last_event_id) if last_event_id and last_event_id.isdigit() else None)
+    if subscription is None:
+        # The dashboard polls for changes instead while every stream slot is taken
+        response = jsonify({"error": "Too many live dashboard connections."})
+        response.status_code = 503
+        response.headers['Retry-After'] = str(SSE_RETRY_MS // 1000)
+        return response
+
+    def stream():
+        try:
+            yield f"retry: {SSE_RETRY_MS}\n\n"
+            while True:
+                if subscription.overflowed:
+                    # Fell behind: start over from a full reload instead of replaying the backlog
+                    change_bus.resubscribe(subscription)
+                    version = data_cache.version
+                    yield changes.format_event({'id': version, 'type': 'resync', 'data': {'version': version}})
+                    continue
+                event = subscription.get(SSE_HEARTBEAT_SECONDS)
+                if event is None:
+                    # A worker without other traffic learns about writes made elsewhere here
+                    conn = get_db_conn()
+                    try:
+                        catch_up_shared_versions(conn)
+                    finally:
+                        conn.close()
+                # The keepalive comment also makes a write fail once the client is gone, ending the stream
+                yield ": keepalive\n\n" if event is None else changes.format_event(event)
+        finally:
+            change_bus.unsubscribe(subscription)
+
+    response = app.response_class(stream(), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+@app.route('/api/table')
+def api_get_table():
+    """
+    One page of the filtered candidate table. Pass 'cursor' from the previous page to continue,
+    and format=columnar for the compact encoding (see payload.py).
+    """
+    if 'user_id' not in session:
+        return jsonify({"error": "Authentication required."}), 401
+    try:
+        page_size = int(request.args.get('page_size', queries.DEFAULT_PAGE_SIZE))
+    except ValueError:
+        return jsonify({"error": "page_size must be an integer."}), 400
 
-        df['email'] = df['email'].astype(str).str.lower().fillna('')
-        statuses_df = pd.read_sql_query("SELECT lower(email) as email, status FROM statuses", conn)
+    conn = get_db_conn()
+    try:
+        # Read first: rows changed meanwhile are sent again by /api/table/changes, which is harmless
+        table_format = get_table_format()
+        version = row_versions.get_version(conn)
+        page = queries.get_table_page(
+            conn, request.args,
+            sort=request.args.get('sort', 'id'), order=request.args.get('order', 'asc'),
+            page_size=page_size, cursor=request.args.get('cursor'), table_format=table_format
+        )
+        return jsonify({**page, "version": version, "format": table_format})
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        print(f"--- API ERROR in /api/table ---\n{traceback.format_exc()}")
+        return jsonify({"error": "An error occurred on the server.", "message": str(e)}), 500
+    finally:
         conn.close()
 
-        status_map = {row['email']: row['status'] for _, row in statuses_df.iterrows()} if not statuses_df.empty else {}
-        df['Status'] = df.apply(lambda row: status_map.get(row.get('email', '').lower(), 'Applied'), axis=1)
+@app.route('/api/table/changes')
+def api_table_changes():
+    """
+    Candidate table rows changed since 'since' (the version of an earlier /api/table or
+    /api/table/changes response), within the same filters: upserted rows, deleted ids and
+    the new version. {"full": true} means the client must reload the table instead.
+    format=columnar encodes 'upserted' as in /api/table.
+    """
+    if 'user_id' not in session:
+        return jsonify({"error": "Authentication required."}), 401
+    try:
+        since = int(request.args['since'])
+    except (KeyError, ValueError):
+        return jsonify({"error": "since must be an integer version."}), 400
 
-        COLUMNS = {
-            'STATUS': 'Status', 'GENDER': 'gender', 'DATE': 'submission_timestamp', 'NAME': 'name',
-            'COMPANY': 'business_entity', 'COLLEGE': 'qualification_grad_school',
-            'LOCATION': 'location_of_position', 'POST': 'post_applying_for',
-            'QUALIFICATION': 'qualification_grad_course', 'COURSE': 'qualification_grad_course'
-        }
-        
-        filters_applied = {key: request.args.get(key) for key in request.args}
-        if COLUMNS['DATE'] in df.columns:
-            df[COLUMNS['DATE']] = pd.to_datetime(df[COLUMNS['DATE']], errors='coerce')
-            if filters_applied.get('start_date'):
-                df = df[df[COLUMNS['DATE']] >= pd.to_datetime(filters_applied['start_date'])]
-            if filters_applied.get('end_date'):
-                df = df[df[COLUMNS['DATE']] <= pd.to_datetime(filters_applied['end_date'])]
-
-        def apply_filter(dataframe, col_name, value):
-            if value and value != 'all' and col_name in dataframe.columns:
-                return dataframe[dataframe[col_name].astype(str) == value]
-            return dataframe
-
-        for key, col in [('location', COLUMNS['LOCATION']), ('post', COLUMNS['POST']), ('qualification', COLUMNS['QUALIFICATION']), ('business_entity', COLUMNS['COMPANY']), ('course', COLUMNS['COURSE']), ('college', COLUMNS['COLLEGE'])]:
-            df = apply_filter(df, col, filters_applied.get(key))
-        
-        status_counts = df[COLUMNS['STATUS']].value_counts()
-        kpis = {
-            'applications': len(df), 'shortlisted': int(status_counts.get('Shortlisted', 0)),
-            'interviewed': int(status_counts.get('Interviewed', 0)), 'offered': int(status_counts.get('Offered', 0)),
-            'hired': int(status_counts.get('Hired', 0)), 'rejected': int(status_counts.get('Rejected', 0)),
-        }
-        kpis['acceptance_rate'] = round(((kpis['hired'] + kpis['offered'])/kpis['applications'] ) * 100 if kpis['offered'] > 0 else 0, 2)
-        kpis['rejection_rate'] = round((kpis['rejected'] / len(df)) * 100 if len(df) > 0 else 0, 2)
-
-        charts = {
-            'apps_per_company': df[COLUMNS['COMPANY']].value_counts().to_dict() if COLUMNS['COMPANY'] in df.columns else {},
-            'apps_per_college': df[COLUMNS['COLLEGE']].value_counts().to_dict() if COLUMNS['COLLEGE'] in df.columns else {},
-            'gender_diversity': df[COLUMNS['GENDER']].value_counts().to_dict() if COLUMNS['GENDER'] in df.columns else {},
-            'recruitment_funnel': {'labels': ['Applications', 'Shortlisted', 'Interviewed', 'Offered', 'Hired'], 'data': [kpis['applications'], kpis['shortlisted'], kpis['interviewed'], kpis['offered'], kpis['hired']]}
-        }
+    conn = get_db_conn()
+    try:
+        table_format = get_table_format()
+        return jsonify({**row_versions.get_changes(conn, request.args, since, table_format=table_format), "format": table_format})
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        print(f"--- API ERROR in /api/table/changes ---\n{traceback.format_exc()}")
+        return jsonify({"error": "An error occurred on the server.", "message": str(e)}), 500
+    finally:
+        conn.close()
 
-        for col in df.columns:
-            if pd.api.types.is_datetime64_any_dtype(df[col]):
-                df[col] = df[col].dt.strftime('%Y-%m-%d %H:%M:%S')
-        df.fillna('', inplace=True)
-        all_columns = df.columns.tolist()
-        if 'name' in all_columns:
-            all_columns.insert(0, all_columns.pop(all_columns.index('name')))
-        
-        default_columns = [col for col in ['name', 'email', 'post_applying_for', 'qualification_grad_school', 'Status', 'resume_path'] if col in all_columns]
-        table_data = df.to_dict(orient='records')
+EXPORT_FORMATS = {
+    'csv': ('text/csv; charset=utf-8', 'recruitment_data.csv'),
+    'xlsx': ('application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', 'recruitment_data.xlsx'),
+}
 
-        def get_unique_values(col_name):
-            return sorted(df[col_name].dropna().unique().tolist()) if col_name in df.columns else []
-        
-        filters = {
-            'locations': get_unique_values(COLUMNS['LOCATION']), 'posts': get_unique_values(COLUMNS['POST']),
-            'qualifications': get_unique_values(COLUMNS['QUALIFICATION']), 'business_entities': get_unique_values(COLUMNS['COMPANY']),
-            'courses': get_unique_values(COLUMNS['COURSE']), 'colleges': get_unique_values(COLUMNS['COLLEGE'])
-        }
+def stream_export_csv(filters, export_columns):
+    """Yields the CSV export one chunk of rows at a time."""
+    conn = get_db_pool().acquire()
+    try:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator='\n')
+        writer.writerow(export_columns)
+        for rows in queries.iter_export_rows(conn, filters, export_columns):
+            writer.writerows(rows)
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+        yield buffer.getvalue().encode('utf-8')
+    finally:
+        conn.close()
+
+def stream_export_xlsx(filters, export_columns):
+    """
+    Builds the XLSX export with openpyxl's write-only workbook and yields the file in chunks.
+
+    Write-only mode spools rows to a temporary file instead of keeping cell objects in memory;
+    the finished workbook is a zip archive, so it is streamed once it has been written.
+    """
+    from openpyxl import Workbook
+    from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
 
-        return jsonify({"kpis": kpis, "charts": charts, "table_data": table_data, "all_columns": all_columns, "default_columns": default_columns, "filters": filters})
+    conn = get_db_pool().acquire()
+    try:
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet('Applications')
+        sheet.append(export_columns)
+        for rows in queries.iter_export_rows(conn, filters, export_columns):
+            for row in rows:
+                sheet.append([ILLEGAL_CHARACTERS_RE.sub('', value) if isinstance(value, str) else value for value in row])
+    finally:
+        conn.close()
+
+    with tempfile.TemporaryFile() as spool:
+        workbook.save(spool)
+        spool.seek(0)
+        while True:
+            chunk = spool.read(64 * 1024)
+            if not chunk:
+                break
+            yield chunk
+
+@app.route('/api/export')
+def api_export():
+    """
+    Streams the filtered applications as CSV or XLSX.
+
+    Takes the same filters as /api/data plus format=csv|xlsx and an optional comma-separated
+    'columns' list (defaults to every table column).
+    """
+    if 'user_id' not in session:
+        return jsonify({"error": "Authentication required."}), 401
+    export_format = request.args.get('format', 'csv').lower()
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({"error": "format must be 'csv' or 'xlsx'."}), 400
+
+    requested = [col for col in request.args.get('columns', '').split(',') if col]
+    conn = get_db_conn()
+    try:
+        export_columns = queries.get_export_columns(conn, requested)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
-        print(f"--- API ERROR in /api/data ---\n{traceback.format_exc()}")
+        print(f"--- API ERROR in /api/export ---\n{traceback.format_exc()}")
+        return jsonify({"error": "An error occurred on the server.", "message": str(e)}), 500
+    finally:
+        conn.close()
+
+    # The generator runs after this request's connection is released, so it reads on its own
+    filters = request.args.to_dict()
+    stream = stream_export_csv if export_format == 'csv' else stream_export_xlsx
+    mimetype, filename = EXPORT_FORMATS[export_format]
+    response = app.response_class(stream(filters, export_columns), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+@app.route('/api/search')
+def api_search():
+    """Ranked full-text search (?q=...) over the application fields and resume text, with the /api/data filters."""
+    if 'user_id' not in session:
+        return jsonify({"error": "Authentication required."}), 401
+    try:
+        page = max(1, int(request.args.get('page', 1)))
+        page_size = max(1, min(int(request.args.get('page_size', 20)), queries.MAX_PAGE_SIZE))
+    except ValueError:
+        return jsonify({"error": "page and page_size must be integers."}), 400
+
+    conn = get_db_conn()
+    try:
+        return jsonify(search.search(conn, request.args.get('q', ''), request.args, page=page, page_size=page_size))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        print(f"--- API ERROR in /api/search ---\n{traceback.format_exc()}")
         return jsonify({"error": "An error occurred on the server.", "message": str(e)}), 500
+    finally:
+        conn.close()
 
 @app.route('/api/submit_application', methods=['POST'])
 def api_submit_application():
-    if 'cv-resume' not in request.files:
-        return jsonify({"error": "No resume file part"}), 400
-    
+    # Reject oversized uploads while reading the body instead of after buffering it
+    request.max_content_length = RESUME_MAX_BYTES + RESUME_FORM_OVERHEAD_BYTES
+    try:
+        if 'cv-resume' not in request.files:
+            return jsonify({"error": "No resume file part"}), 400
+    except RequestEntityTooLarge:
+        return jsonify({"error": f"Resume is larger than {RESUME_MAX_BYTES // (1024 * 1024)} MB."}), 413
+
     file = request.files['cv-resume']
     if file.filename == '':
         return jsonify({"error": "No selected file"}), 400
 
     if file and allowed_file(file.filename):
-        filename = secure_filename(file.filename)
-        # To avoid overwrites, prepend a unique identifier or use a better strategy
-        # For simplicity, we'll use email + original filename
-        email = request.form.get('email', 'unknown')
-        unique_filename = f"{secure_filename(email)}_{filename}"
-        
-        file_path = os.path.join(app.config['UPLOAD_FOLDER'], unique_filename)
-        file.save(file_path)
+        # Stored once per content under its SHA-256, whoever uploads it
+        try:
+            resume_path = resume_store.store(file.stream, app.config['UPLOAD_FOLDER'],
+                                             file.filename.rsplit('.', 1)[1], RESUME_MAX_BYTES)
+        except resume_store.ResumeTooLarge as e:
+            return jsonify({"error": str(e)}), 413
 
         data = request.form.to_dict()
-        data['resume_path'] = unique_filename # Store the path to be saved in DB
-        
-        conn = get_db_conn()
-        try:
-            form_fields = conn.execute("SELECT name FROM form_config").fetchall()
-            valid_columns = {field['name'] for field in form_fields}
-            valid_columns.add('resume_path') # Add resume_path to valid columns
-            
-            columns_to_insert = [col for col in data.keys() if col in valid_columns]
-            values_to_insert = [data[col] for col in columns_to_insert]
-            
-            if not columns_to_insert:
-                return jsonify({"error": "No valid data received."}), 400
 
-            placeholders = ', '.join(['?'] * len(columns_to_insert))
-            query = f"INSERT INTO applications ({', '.join(columns_to_insert)}) VALUES ({placeholders})"
-            
-            cursor = conn.cursor()
-            cursor.execute(query, values_to_insert)
-            conn.commit()
+        # Written with other concurrent submissions in one group commit; returns once it is durable
+        try:
+            submission_queue.submit(data, resume_path)
             return jsonify({"success": True, "message": "Application submitted successfully."})
+        except ingest.InvalidSubmission as e:
+            return jsonify({"error": str(e)}), 400
+        except ingest.IngestTimeout as e:
+            response = jsonify({"error": f"{e} Please try again shortly."})
+            response.status_code = 503
+            response.headers['Retry-After'] = str(PUBLIC_RETRY_AFTER)
+            return response
         except sqlite3.IntegrityError:
             return jsonify({"error": f"An application with the email '{data.get('email')}' already exists."}), 409
         except Exception as e:
             print(f"--- API ERROR in /api/submit_application ---\n{traceback.format_exc()}")
             return jsonify({"error": "An error occurred on the server.", "message": str(e)}), 500
-        finally:
-            conn.close()
     else:
         return jsonify({"error": "File type not allowed"}), 400
 
 
 # --- Form Configuration APIs ---
 
-@app.route('/api/public/form-config', methods=['GET'])
-def get_public_form_config():
-    """A public endpoint to fetch the form structure for any applicant."""
-    conn = get_db_conn()
-    
+def build_public_form_config(conn):
+    """Serializes the form structure (fields grouped by subsection, in section order) as JSON bytes."""
     # Get section order from form_sections table if it exists
     section_order = {}
     try:
@@ -467,7 +785,6 @@ def get_public_form_config():
         pass  # Table doesn't exist yet
     
     fields_query = conn.execute("SELECT * FROM form_config ORDER BY field_order ASC").fetchall()
-    conn.close()
     
     # Group fields by subsection for easier rendering in the template
     subsections = defaultdict(list)
@@ -486,13 +803,68 @@ def get_public_form_config():
     for k in subsection_order:
         ordered_subsections[k] = subsections[k]
     
-    # Use Flask's Response with json.dumps to preserve order
-    import json
-    response = app.response_class(
-        response=json.dumps(ordered_subsections, separators=(',', ':')),
-        status=200,
-        mimetype='application/json'
-    )
+    # json.dumps (not jsonify) to preserve the section order
+    return json.dumps(ordered_subsections, separators=(',', ':')).encode('utf-8')
+
+# The serialized public form config, pre-compressed and tagged. Rebuilt lazily after form config changes.
+_form_config_snapshot = None
+# Bumped by every invalidation; a snapshot is only stored if no invalidation happened while it was built
+_form_config_generation = 0
+_form_config_snapshot_lock = threading.Lock()  # one build at a time
+_form_config_state_lock = threading.Lock()
+
+def invalidate_form_config_snapshot():
+    global _form_config_snapshot, _form_config_generation
+    with _form_config_state_lock:
+        _form_config_generation += 1
+        _form_config_snapshot = None
+
+def get_form_config_snapshot():
+    global _form_config_snapshot
+    snapshot = _form_config_snapshot
+    if snapshot is not None:
+        return snapshot
+    with _form_config_snapshot_lock:
+        snapshot = _form_config_snapshot
+        if snapshot is not None:
+            return snapshot
+        generation = _form_config_generation
+        conn = get_db_conn()
+        try:
+            body = build_public_form_config(conn)
+        finally:
+            conn.close()
+        digest = hashlib.sha256(body).hexdigest()[:32]
+        snapshot = {
+            'body': body,
+            'gzip_body': gzip.compress(body, compresslevel=9, mtime=0),
+            'etag': digest,
+            'gzip_etag': f"{digest}-gzip",
+        }
+        # Built from config that may predate a concurrent invalidation: serve it, but don't keep it
+        with _form_config_state_lock:
+            if generation == _form_config_generation:
+                _form_config_snapshot = snapshot
+        return snapshot
+
+@app.route('/api/public/form-config', methods=['GET'])
+def get_public_form_config():
+    """A public endpoint to fetch the form structure for any applicant."""
+    snapshot = get_form_config_snapshot()
+    use_gzip = 'gzip' in request.accept_encodings
+
+    # Both representations describe the same config version, so either tag validates
+    if request.if_none_match.contains(snapshot['etag']) or request.if_none_match.contains(snapshot['gzip_etag']):
+        response = app.response_class(status=304)
+    elif use_gzip:
+        response = app.response_class(response=snapshot['gzip_body'], status=200, mimetype='application/json')
+        response.headers['Content-Encoding'] = 'gzip'
+    else:
+        response = app.response_class(response=snapshot['body'], status=200, mimetype='application/json')
+
+    response.set_etag(snapshot['gzip_etag'] if use_gzip else snapshot['etag'])
+    response.headers['Cache-Control'] = 'public, no-cache'
+    response.vary.add('Accept-Encoding')
     return response
 
 
@@ -515,6 +887,7 @@ def add_form_field():
     options = data.get('options')
     required = data.get('required', False)
     validations = data.get('validations', '{}')  # JSON string for validation rules
+    indexed = bool(data.get('indexed', False))  # filterable fields get an index on applications
 
     if not all([field_name, field_label, field_type, subsection]):
         return jsonify({"error": "Name, label, type, and subsection are required."}), 400
@@ -532,10 +905,17 @@ def add_form_field():
         
         # Insert into form_config
         cursor.execute(
-            "INSERT INTO form_config (name, label, type, subsection, options, required, validations, field_order) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
-            (field_name, field_label, field_type, subsection, options, required, validations, new_order)
+            "INSERT INTO form_config (name, label, type, subsection, options, required, validations, field_order, indexed) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (field_name, field_label, field_type, subsection, options, required, validations, new_order, indexed)
         )
+        if indexed:
+            schema.create_field_index(conn, field_name)
+        # The new column is empty: only the search triggers and a re-added dimension's counters change
+        search.sync_search_index(conn)
+        if field_name in rollups.DIMENSIONS:
+            rollups.reset_dimension(conn, field_name)
         conn.commit()
+        invalidate_caches(form_config=True)
         return jsonify({"success": True, "message": "Field added successfully."})
     except sqlite3.OperationalError as e:
         if 'duplicate column name' in str(e):
@@ -590,6 +970,10 @@ def update_form_field(field_id):
         if 'validations' in data:
             update_fields.append('validations = ?')
             update_values.append(data['validations'])
+
+        if 'indexed' in data:
+            update_fields.append('indexed = ?')
+            update_values.append(bool(data['indexed']))
         
         if not update_fields:
             return jsonify({"error": "No fields to update."}), 400
@@ -599,7 +983,16 @@ def update_form_field(field_id):
         
         query = f"UPDATE form_config SET {', '.join(update_fields)} WHERE id = ?"
         cursor.execute(query, update_values)
+        if 'indexed' in data:
+            if data['indexed']:
+                schema.create_field_index(conn, field['name'])
+            else:
+                schema.drop_field_index(conn, field['name'])
+        if 'type' in data:
+            search.sync_search_index(conn, defer=True)
         conn.commit()
+        invalidate_caches(form_config=True)
+        search_reindexer.start()
         return jsonify({"success": True, "message": "Field updated successfully."})
     except Exception as e:
         print(f"--- API ERROR in /api/form/config [PUT] ---")
@@ -621,21 +1014,23 @@ def delete_form_field(field_id):
         if field['is_core']: return jsonify({"error": "Core fields cannot be deleted."}), 400
 
         field_name = field['name']
-        
-        cursor = conn.cursor()
-        cursor.execute("PRAGMA table_info(applications)")
-        columns_info = cursor.fetchall()
-        column_defs = [f"{c['name']} {c['type']}" for c in columns_info if c['name'] != field_name]
-        column_names = [c['name'] for c in columns_info if c['name'] != field_name]
-
-        cursor.execute("BEGIN TRANSACTION")
-        cursor.execute(f"CREATE TABLE applications_new ({', '.join(column_defs)})")
-        cursor.execute(f"INSERT INTO applications_new ({', '.join(column_names)}) SELECT {', '.join(column_names)} FROM applications")
-        cursor.execute("DROP TABLE applications")
-        cursor.execute("ALTER TABLE applications_new RENAME TO applications")
-        
-        cursor.execute("DELETE FROM form_config WHERE id = ?", (field_id,))
+
+        # Drops the column in place (no table copy), so constraints, defaults and other indexes stay intact
+        conn.execute("BEGIN IMMEDIATE")
+        if field_name in search.get_search_columns(conn):
+            search.drop_triggers(conn)  # they reference the column
+        schema.drop_application_column(conn, field_name)
+        conn.execute("DELETE FROM form_config WHERE id = ?", (field_id,))
+        # Search triggers without the column; its text is removed from the documents in the background
+        search.sync_search_index(conn, defer=True)
+        row_versions.init_row_versions(conn)  # restores its triggers if the table had to be copied
+        if field_name in rollups.DIMENSIONS:
+            rollups.reset_dimension(conn, field_name)
+            # Rows may no longer match the filters of delta-syncing clients: they reload
+            row_versions.mark_reset(conn)
         conn.commit()
+        invalidate_caches(form_config=True)
+        search_reindexer.start()
         return jsonify({"success": True, "message": "Field deleted successfully."})
     except Exception as e:
         conn.rollback()
@@ -655,6 +1050,7 @@ def reorder_form_fields():
         for field_id, new_order in field_orders:
             cursor.execute("UPDATE form_config SET field_order = ? WHERE id = ?", (new_order, field_id))
         conn.commit()
+        invalidate_caches(form_config=True)
         return jsonify({"success": True, "message": "Field order updated successfully."})
     except Exception as e:
         print(f"--- API ERROR in /api/form/config/reorder ---\n{traceback.format_exc()}")
@@ -728,6 +1124,7 @@ def create_form_section():
         """, (name, next_order, description, icon))
         
         conn.commit()
+        invalidate_caches(form_config=True)
         return jsonify({"success": True, "message": "Section created successfully."})
         
     except sqlite3.IntegrityError:
@@ -788,6 +1185,7 @@ def update_form_section(section_name):
             """, (new_name, section_name))
         
         conn.commit()
+        invalidate_caches(form_config=True)
         return jsonify({"success": True, "message": "Section updated successfully."})
         
     except sqlite3.IntegrityError:
@@ -817,6 +1215,7 @@ def delete_form_section(section_name):
             pass  # Table might not exist
         
         conn.commit()
+        invalidate_caches(form_config=True)
         return jsonify({"success": True, "message": "Section deleted successfully."})
         
     except Exception as e:
@@ -874,6 +1273,7 @@ def reorder_form_sections():
                 """, (section_name, order + 1))
         
         conn.commit()
+        invalidate_caches(form_config=True)
         print("--- REORDER COMPLETE ---")
         
         # Verify the changes
@@ -905,6 +1305,7 @@ def bulk_update_fields():
                     WHERE id = ?
                 """, (update.get('required', False), update.get('field_order', 0), field_id))
         conn.commit()
+        invalidate_caches(form_config=True)
         return jsonify({"success": True, "message": "Fields updated successfully."})
     except Exception as e:
         print(f"--- API ERROR in /api/form/config/bulk-update ---\n{traceback.format_exc()}")
@@ -948,18 +1349,342 @@ def api_delete_user():
 @app.route('/api/update_status', methods=['POST'])
 def api_update_status():
     if session.get('user_role') != 'admin': return jsonify({"error": "Admin access required."}), 403
-    data = request.json
+    data = request.json or {}
     email, name, status = data.get('email'), data.get('name'), data.get('status')
     if not email or not status: return jsonify({"error": "Email and status are required."}), 400
+    if status not in queries.STATUSES:
+        return jsonify({"error": f"Status must be one of: {', '.join(queries.STATUSES)}."}), 400
+    email = str(email).strip().lower()
     conn = get_db_conn()
-    conn.execute("INSERT OR REPLACE INTO statuses (email, name, status) VALUES (?, ?, ?)", (email.lower(), name, status))
-    conn.commit()
-    conn.close()
-    return jsonify({"success": True})
+    try:
+        # Move the candidate's applications from the old status group to the new one atomically
+        conn.execute("BEGIN IMMEDIATE")
+        previous = conn.execute("SELECT status FROM statuses WHERE email = ?", (email,)).fetchone()
+        removed = rollups.adjust(conn, "lower(a.email) = ?", [email], -1)
+        conn.execute("INSERT OR REPLACE INTO statuses (email, name, status) VALUES (?, ?, ?)", (email, name, status))
+        added = rollups.adjust(conn, "lower(a.email) = ?", [email], 1)
+        status_history.record_changes(conn, [(email, previous['status'] if previous else 'Applied', status)],
+                                      changed_by=session.get('user_email'))
+        change = changes.build_row_event(conn, "lower(a.email) = ?", [email], rollups.merge_deltas(removed, added))
+        conn.commit()
+        # Read after the commit, outside the write lock
+        change['funnel_velocity'] = queries.get_funnel_velocity(conn)
+        invalidate_caches(change=('status', change))
+        return jsonify({"success": True})
+    except Exception as e:
+        conn.rollback()
+        print(f"--- API ERROR in /api/update_status ---\n{traceback.format_exc()}")
+        return jsonify({"error": "Server error while updating the status.", "message": str(e)}), 500
+    finally:
+        conn.close()
+
+@app.route('/api/status_history', methods=['GET'])
+def api_status_history():
+    """The append-only list of status changes for one candidate (?email=...)."""
+    if 'user_id' not in session:
+        return jsonify({"error": "Authentication required."}), 401
+    email = request.args.get('email')
+    if not email: return jsonify({"error": "Email is required."}), 400
+    conn = get_db_conn()
+    try:
+        return jsonify(status_history.get_history(conn, email))
+    finally:
+        conn.close()
+
+@app.route('/api/update_status/bulk', methods=['POST'])
+def api_bulk_update_status():
+    """
+    Sets one status for many candidates in a single transaction.
+
+    Body: {"status": "...", "emails": [...]} or {"status": "...", "filters": {<same keys as /api/data>}}.
+    Returns a result per email: updated, unchanged or not_found (no application with that email).
+    """
+    if session.get('user_role') != 'admin': return jsonify({"error": "Admin access required."}), 403
+    data = request.json or {}
+    status = data.get('status')
+    emails, filters = data.get('emails'), data.get('filters')
+    if status not in queries.STATUSES:
+        return jsonify({"error": f"Status must be one of: {', '.join(queries.STATUSES)}."}), 400
+    if emails is None and filters is None:
+        return jsonify({"error": "Either 'emails' or 'filters' is required."}), 400
+
+    conn = get_db_conn()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        # Untyped column: a TEXT affinity would stop SQLite from using the lower(email) index for the IN lookup
+        conn.execute("CREATE TEMP TABLE IF NOT EXISTS bulk_status_targets (email PRIMARY KEY)")
+        conn.execute("DELETE FROM temp.bulk_status_targets")
+        if filters is not None:
+            columns = queries.get_application_columns(conn)
+            where, params = queries.build_filter_clause(filters, columns)
+            conn.execute(f"INSERT OR IGNORE INTO temp.bulk_status_targets SELECT lower(a.email) FROM applications a{where}", params)
+            requested = [row[0] for row in conn.execute("SELECT email FROM temp.bulk_status_targets ORDER BY email").fetchall()]
+        else:
+            requested = list(dict.fromkeys(str(e).strip().lower() for e in emails if e))
+            conn.executemany("INSERT OR IGNORE INTO temp.bulk_status_targets (email) VALUES (?)", [(e,) for e in requested])
+
+        targets = "lower(a.email) IN (SELECT email FROM temp.bulk_status_targets)"
+        names = {row[0]: row[1] for row in conn.execute(
+            f"SELECT lower(a.email), a.name FROM applications a WHERE {targets} ORDER BY a.rowid DESC"
+        ).fetchall()}
+        previous = {row[0]: row[1] for row in conn.execute(
+            "SELECT email, status FROM statuses WHERE email IN (SELECT email FROM temp.bulk_status_targets)"
+        ).fetchall()}
+
+        results, updates = [], []
+        for email in requested:
+            if email not in names:
+                results.append({"email": email, "result": "not_found"})
+                continue
+            old_status = previous.get(email, 'Applied')
+            results.append({"email": email, "previous_status": old_status, "status": status,
+                            "result": "unchanged" if old_status == status else "updated"})
+            if old_status != status:
+                updates.append((email, names[email], status))
+
+        change = None
+        if updates:
+            removed = rollups.adjust(conn, targets, [], -1)
+            conn.executemany("INSERT OR REPLACE INTO statuses (email, name, status) VALUES (?, ?, ?)", updates)
+            added = rollups.adjust(conn, targets, [], 1)
+            status_history.record_changes(conn, [(email, previous.get(email, 'Applied'), status) for email, _, _ in updates],
+                                          changed_by=session.get('user_email'))
+            change = changes.build_row_event(conn, targets, [], rollups.merge_deltas(removed, added))
+        conn.execute("DELETE FROM temp.bulk_status_targets")
+        conn.commit()
+        if change is not None:
+            # Read after the commit, outside the write lock
+            change['funnel_velocity'] = queries.get_funnel_velocity(conn)
+            invalidate_caches(change=('status', change))
+        return jsonify({"success": True, "updated": len(updates), "results": results})
+    except ValueError as e:
+        conn.rollback()
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        conn.rollback()
+        print(f"--- API ERROR in /api/update_status/bulk ---\n{traceback.format_exc()}")
+        return jsonify({"error": "Server error while updating statuses.", "message": str(e)}), 500
+    finally:
+        conn.close()
+
 
+@app.route('/api/admin/import', methods=['POST'])
+def api_import_applications():
+    """
+    Bulk-imports applications from an uploaded CSV or XLSX file ('file').
+
+    Headers are matched to form fields by name or label; an optional 'mapping' form value
+    ({"header": "field_name"}, JSON) overrides that. Existing candidates (same email) are updated.
+    """
+    if session.get('user_role') != 'admin': return jsonify({"error": "Admin access required."}), 403
+    upload = request.files.get('file')
+    if upload is None or upload.filename == '':
+        return jsonify({"error": "No file uploaded."}), 400
+    try:
+        mapping = json.loads(request.form['mapping']) if request.form.get('mapping') else None
+    except ValueError:
+        return jsonify({"error": "mapping must be a JSON object."}), 400
+
+    import importer
+    conn = get_db_conn()
+    try:
+        report = importer.import_rows(conn, importer.iter_file_rows(upload.stream, upload.filename), mapping=mapping)
+        if report['inserted'] or report['updated']:
+            invalidate_caches()
+        return jsonify({"success": True, **report})
+    except importer.ImportFileError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        print(f"--- API ERROR in /api/admin/import ---\n{traceback.format_exc()}")
+        return jsonify({"error": "Server error while importing applications.", "message": str(e)}), 500
+    finally:
+        conn.close()
+
+@app.route('/api/admin/cache', methods=['GET'])
+def api_cache_stats():
+    if session.get('user_role') != 'admin': return jsonify({"error": "Admin access required."}), 403
+    return jsonify({"data_cache": data_cache.stats(), "change_bus": change_bus.stats()})
+
+@app.route('/api/admin/db-pool', methods=['GET'])
+def api_db_pool_stats():
+    if session.get('user_role') != 'admin': return jsonify({"error": "Admin access required."}), 403
+    return jsonify({"db_pool": get_db_pool().stats()})
+
+
+@app.route('/api/admin/indexes', methods=['GET'])
+def api_index_report():
+    """Applications indexes and the EXPLAIN QUERY PLAN of the dashboard's filter queries."""
+    if session.get('user_role') != 'admin': return jsonify({"error": "Admin access required."}), 403
+    conn = get_db_conn()
+    try:
+        return jsonify(schema.get_index_report(conn))
+    except Exception as e:
+        print(f"--- API ERROR in /api/admin/indexes ---\n{traceback.format_exc()}")
+        return jsonify({"error": "Server error while reading index usage.", "message": str(e)}), 500
+    finally:
+        conn.close()
+
+
+@app.route('/api/admin/resume-jobs', methods=['GET'])
+def api_resume_job_stats():
+    """Backlog of the resume text extraction queue."""
+    if session.get('user_role') != 'admin': return jsonify({"error": "Admin access required."}), 403
+    conn = get_db_conn()
+    try:
+        return jsonify({**resume_jobs.get_backlog(conn), "worker": resume_worker.stats()})
+    finally:
+        conn.close()
+
+@app.route('/api/admin/admission', methods=['GET'])
+def api_admission_stats():
+    """In-flight, queued and shed public requests."""
+    if session.get('user_role') != 'admin': return jsonify({"error": "Admin access required."}), 403
+    return jsonify({"public": public_admission.stats()})
+
+@app.route('/metrics', methods=['GET'])
+def api_metrics():
+    """Request, SQL and stage timings plus pool/cache/queue gauges, in the Prometheus text format."""
+    authorization = request.headers.get('Authorization', '')
+    token_ok = bool(METRICS_TOKEN) and hmac.compare_digest(authorization, f"Bearer {METRICS_TOKEN}")
+    if session.get('user_role') != 'admin' and not token_ok:
+        return jsonify({"error": "Admin access required."}), 403
+    return app.response_class(app_metrics.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/admin/profiles', methods=['GET'])
+def api_list_profiles():
+    """Recent request profiles, newest first, with their top functions."""
+    if session.get('user_role') != 'admin': return jsonify({"error": "Admin access required."}), 403
+    profile_store = get_profile_store()
+    return jsonify({"profiles": profile_store.list(), "max_profiles": profile_store.max_profiles})
+
+@app.route('/api/admin/profiles/<profile_id>', methods=['GET'])
+def api_download_profile(profile_id):
+    """Downloads a profile: .prof (pstats, snakeviz) or .collapsed (flamegraph.pl, speedscope)."""
+    if session.get('user_role') != 'admin': return jsonify({"error": "Admin access required."}), 403
+    profile_store = get_profile_store()
+    filename = profile_store.get_file(profile_id)
+    if filename is None:
+        return jsonify({"error": "Profile not found."}), 404
+    return send_from_directory(os.path.abspath(profile_store.directory), filename, as_attachment=True)
+
+@app.route('/api/admin/ingest', methods=['GET'])
+def api_ingest_stats():
+    """Batch sizes and commit times of the submission group-commit queue."""
+    if session.get('user_role') != 'admin': return jsonify({"error": "Admin access required."}), 403
+    return jsonify({"ingest": submission_queue.stats()})
+
+# --- CLI Commands ---
+
+@app.cli.command('rebuild-rollups')
+@click.option('--check-only', is_flag=True, help='Only report drifted groups, do not rewrite the counters.')
+def rebuild_rollups_command(check_only):
+    """Recomputes the dashboard rollup counters and the funnel velocity aggregates."""
+    conn = get_db_conn()
+    try:
+        migrations.migrate(conn)
+        if not rollups.is_available(conn):
+            print("Rollup tables do not exist yet; they will be built.")
+            drifted = None
+        else:
+            drifted = rollups.check(conn)
+            print(f"{drifted} rollup group(s) differ from applications + statuses.")
+        if not check_only:
+            groups = rollups.rebuild(conn)
+            events = status_history.rebuild(conn)
+            conn.commit()
+            invalidate_caches(conn=conn)  # running servers drop their cached dashboards
+            print(f"Rebuilt application rollups: {groups} group(s).")
+            print(f"Rebuilt funnel velocity aggregates from {events} status event(s).")
+        elif drifted:
+            raise SystemExit(1)
+    finally:
+        conn.close()
+
+
+@app.cli.command('import-applications')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--mapping', default=None, help='JSON object mapping file headers to form field names.')
+@click.option('--chunk-size', type=int, default=None, help='Rows written per transaction; defaults to importer.IMPORT_CHUNK_SIZE.')
+def import_applications_command(path, mapping, chunk_size):
+    """Bulk-imports applications from a CSV or XLSX file, updating candidates that already exist."""
+    import importer
+    conn = get_db_conn()
+    try:
+        migrations.migrate(conn)
+        with open(path, 'rb') as f:
+            report = importer.import_rows(conn, importer.iter_file_rows(f, path),
+                                          mapping=json.loads(mapping) if mapping else None,
+                                          chunk_size=chunk_size or importer.IMPORT_CHUNK_SIZE)
+        if report['inserted'] or report['updated']:
+            invalidate_caches(conn=conn)  # running servers drop their cached dashboards
+    except importer.ImportFileError as e:
+        raise click.ClickException(str(e))
+    finally:
+        conn.close()
+    print(f"Imported {report['rows']} row(s): {report['inserted']} inserted, {report['updated']} updated, {report['failed']} failed.")
+    if report['ignored_headers']:
+        print(f"Ignored headers: {', '.join(report['ignored_headers'])}")
+    for error in report['errors']:
+        print(f"  row {error['row']} ({error['email'] or 'no email'}): {error['error']}")
+
+@app.cli.command('gc-resumes')
+@click.option('--grace-hours', default=1.0, show_default=True, help='Keep unreferenced files younger than this.')
+@click.option('--dry-run', is_flag=True, help='Only list what would be removed.')
+def gc_resumes_command(grace_hours, dry_run):
+    """Removes stored resumes that no application references any more."""
+    conn = get_db_conn()
+    try:
+        removed, freed = resume_store.collect_garbage(conn, app.config['UPLOAD_FOLDER'],
+                                                      grace_seconds=grace_hours * 3600, dry_run=dry_run)
+    finally:
+        conn.close()
+    for path in removed:
+        print(f"  {path}")
+    print(f"{'Would remove' if dry_run else 'Removed'} {len(removed)} file(s), {freed / (1024 * 1024):.1f} MB.")
+
+@app.cli.command('process-resumes')
+@click.option('--watch', is_flag=True, help='Keep running and process new jobs as they arrive.')
+def process_resumes_command(watch):
+    """Runs the queued resume text extraction jobs."""
+    init_db()  # may start before any web worker has migrated the database
+    if watch:
+        # gunicorn.conf.py stops it with SIGTERM: finish the running jobs as on Ctrl+C
+        signal.signal(signal.SIGTERM, signal.default_int_handler)
+        resume_worker.start()
+        print("Processing resume jobs, press Ctrl+C to stop.")
+        try:
+            while True:
+                time.sleep(60)
+        except KeyboardInterrupt:
+            resume_worker.stop()
+        return
+    processed = resume_worker.drain()
+    conn = get_db_conn()
+    try:
+        backlog = resume_jobs.get_backlog(conn)
+    finally:
+        conn.close()
+    print(f"Processed {processed} job(s). Waiting for retry: {backlog['jobs']['pending']}, failed: {backlog['jobs']['failed']}.")
+
+# --- Worker Process Startup ---
+
+def init_worker_process(start_workers=True):
+    """
+    Prepares this process to serve requests with the module-level app: migrates the database,
+    catches up with the shared cache versions and starts the background search and resume workers.
+
+    Called once per worker process (see wsgi.py). Every worker has its own connection pool,
+    caches, ingest writer and admission limits; the cache_state row (coherence.py) keeps their
+    caches consistent with each other's writes.
+    """
+    init_db()
+    if start_workers:
+        search_reindexer.start()  # finishes a reindex an earlier process left pending
+    if start_workers and RESUME_WORKER_IN_WEB:
+        resume_worker.start()
 
 # --- Main Execution ---
 if __name__ == '__main__':
-    with app.app_context():
-        init_db()
+    # Development server. With the debug reloader, only the serving child process runs the worker
+    init_worker_process(start_workers=os.environ.get('WERKZEUG_RUN_MAIN') == 'true')
     app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
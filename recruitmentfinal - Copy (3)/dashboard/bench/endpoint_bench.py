@@ -0,0 +1,273 @@
+"""Endpoint latency and throughput benchmark with a JSON baseline.
+
+Runs the dashboard, form and submission endpoints against a copy of a database made by
+generate_data.py, through the Flask test client: each scenario is either a sequence of
+single requests or a load run, where THREADS clients (each with its own test client and
+client IP) send requests concurrently. For every scenario it records p50/p95/p99/max
+latency, throughput, response statuses and the process peak RSS so far, and writes them
+to a JSON file. Given an earlier file with --compare, it prints the change per scenario
+and exits with status 1 when a p95 got worse by more than --tolerance (and --min-delta-ms).
+
+    python bench/generate_data.py 100k
+    python bench/endpoint_bench.py bench/data/applications_100k.db [--threads 16] [--output run.json]
+        [--compare baseline.json] [--scenario data_dashboard_cold ...]
+
+Per-IP rate limits of the public endpoints are lifted (PUBLIC_RATE_PER_IP/PUBLIC_BURST_PER_IP
+can still be set in the environment); the concurrency limit stays, so 503s under load
+show up in the status counts.
+"""
+import argparse
+import io
+import json
+import math
+import os
+import platform
+import resource
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+
+DASHBOARD_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, DASHBOARD_DIR)
+
+os.environ.setdefault('PUBLIC_RATE_PER_IP', '1000000')
+os.environ.setdefault('PUBLIC_BURST_PER_IP', '1000000')
+os.environ.setdefault('JSON_LOGS', '0')  # metrics still collected, just not one log line per request
+
+RESUME = b"%PDF-1.4\n1 0 obj << /Type /Catalog >> endobj\ntrailer << /Root 1 0 R >>\n%%EOF\n"
+
+
+def percentile(sorted_values, p):
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return None
+    return sorted_values[max(0, math.ceil(p / 100 * len(sorted_values)) - 1)]
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / 1024 / (1024 if sys.platform == 'darwin' else 1), 1)  # bytes on macOS, KiB elsewhere
+
+
+def summarize(latencies, statuses, elapsed):
+    latencies = sorted(latencies)
+    result = {'requests': len(latencies), 'statuses': {str(k): v for k, v in sorted(statuses.items())},
+              'throughput_rps': round(len(latencies) / elapsed, 1) if elapsed else None}
+    for name, p in (('p50_ms', 50), ('p95_ms', 95), ('p99_ms', 99), ('max_ms', 100)):
+        value = percentile(latencies, p)
+        result[name] = round(value, 2) if value is not None else None
+    result['peak_rss_mb'] = peak_rss_mb()
+    return result
+
+
+class Bench:
+    def __init__(self, dashboard, threads):
+        self.dashboard = dashboard
+        self.threads = threads
+        self._sequence = 0
+        self._lock = threading.Lock()
+
+    def client(self, index=0, admin=False):
+        client = self.dashboard.app.test_client()
+        client.environ_base['REMOTE_ADDR'] = f"10.1.{index // 250}.{index % 250 + 1}"
+        if admin:
+            with client.session_transaction() as session:
+                session.update(user_id=1, user_role='admin', user_email='bench@example.com')
+        return client
+
+    def next_number(self):
+        with self._lock:
+            self._sequence += 1
+            return self._sequence
+
+    def sequential(self, count, request, before=None):
+        """Runs request(client) count times on one admin client; before() runs untimed ahead of each."""
+        client, latencies, statuses = self.client(admin=True), [], {}
+        start = time.perf_counter()
+        for _ in range(count):
+            if before is not None:
+                before()
+            t = time.perf_counter()
+            status = request(client)
+            latencies.append((time.perf_counter() - t) * 1000)
+            statuses[status] = statuses.get(status, 0) + 1
+        return summarize(latencies, statuses, time.perf_counter() - start)
+
+    def load(self, per_thread, request, admin=False):
+        """'threads' clients send per_thread requests each, all at once."""
+        latencies, statuses = [], {}
+        barrier = threading.Barrier(self.threads + 1)
+
+        def run(index):
+            client, local, codes = self.client(index, admin), [], {}
+            barrier.wait()
+            for _ in range(per_thread):
+                t = time.perf_counter()
+                status = request(client)
+                local.append((time.perf_counter() - t) * 1000)
+                codes[status] = codes.get(status, 0) + 1
+            with self._lock:
+                latencies.extend(local)
+                for status, count in codes.items():
+                    statuses[status] = statuses.get(status, 0) + count
+
+        workers = [threading.Thread(target=run, args=(i,)) for i in range(self.threads)]
+        for worker in workers:
+            worker.start()
+        barrier.wait()
+        start = time.perf_counter()
+        for worker in workers:
+            worker.join()
+        return summarize(latencies, statuses, time.perf_counter() - start)
+
+    # --- Requests ---
+
+    @staticmethod
+    def get(url):
+        def request(client):
+            response = client.get(url, headers={'Accept-Encoding': 'gzip'})
+            response.get_data()
+            return response.status_code
+        return request
+
+    def submit(self, client):
+        number = self.next_number()
+        response = client.post('/api/submit_application', content_type='multipart/form-data', data={
+            'name': f"Bench Candidate {number}", 'email': f"bench.{number}@example.com",
+            'mobile_number': '9876543210', 'gender': 'Female', 'location_of_position': 'Pune',
+            'post_applying_for': 'Graduate Engineer Trainee', 'qualification_grad_school': 'Bench Institute',
+            'cv-resume': (io.BytesIO(RESUME + str(number).encode()), 'resume.pdf'),
+        })
+        return response.status_code
+
+    def add_field(self):
+        self._field_name = f"bench_field_{self.next_number()}"
+        client = self.client(admin=True)
+        response = client.post('/api/form/config', json={'name': self._field_name, 'label': 'Bench field',
+                                                         'type': 'text', 'subsection': 'Additional Information'})
+        assert response.status_code == 200, response.get_json()
+        fields = client.get('/api/form/config').get_json()
+        self._field_id = next(field['id'] for field in fields if field['name'] == self._field_name)
+
+    def delete_field(self, client):
+        return client.delete(f"/api/form/config/{self._field_id}").status_code
+
+    def scenarios(self, repeat):
+        cache = self.dashboard.data_cache
+        quick = max(3, repeat // 20)
+        filtered = '/api/data?include_table=0&location=Pune&start_date=2024-02-01&end_date=2024-04-30'
+        return {
+            'data_dashboard_cold': lambda: self.sequential(repeat, self.get('/api/data?include_table=0'), before=cache.clear),
+            'data_dashboard_filtered_cold': lambda: self.sequential(repeat, self.get(filtered), before=cache.clear),
+            'data_dashboard_warm': lambda: self.load(repeat, self.get('/api/data?include_table=0'), admin=True),
+            'data_full_table_columnar': lambda: self.sequential(quick, self.get('/api/data?format=columnar'), before=cache.clear),
+            'table_page': lambda: self.load(repeat, self.get('/api/table?page_size=50&sort=qualification_grad_school&format=columnar'), admin=True),
+            'public_form_config': lambda: self.sequential(repeat, self.get('/api/public/form-config')),
+            'public_form_config_load': lambda: self.load(repeat, self.get('/api/public/form-config')),
+            'submit_application_load': lambda: self.load(max(1, repeat // 4), self.submit),
+            'delete_form_field': lambda: self.sequential(quick, self.delete_field, before=self.add_field),
+        }
+
+
+def compare(results, baseline, tolerance, min_delta_ms):
+    """Prints the change against an earlier run; returns the scenarios whose p95 regressed beyond tolerance."""
+    regressions = []
+    for key in ('applications', 'threads', 'repeat'):
+        if baseline.get('meta', {}).get(key) != results['meta'][key]:
+            print(f"\nWarning: baseline ran with {key}={baseline.get('meta', {}).get(key)}, this run with {results['meta'][key]}")
+    print(f"\n{'scenario':<30} {'p95 before':>11} {'p95 now':>10} {'change':>8} {'rps before':>11} {'rps now':>9}")
+    for name, now in results['scenarios'].items():
+        before = baseline.get('scenarios', {}).get(name)
+        if not before or not before.get('p95_ms') or now.get('p95_ms') is None:
+            print(f"{name:<30} {'-':>11} {now.get('p95_ms') or '-':>10}")
+            continue
+        change = now['p95_ms'] / before['p95_ms'] - 1
+        # Sub-millisecond jitter on fast endpoints is not a regression
+        flag = '  REGRESSION' if change > tolerance and now['p95_ms'] - before['p95_ms'] > min_delta_ms else ''
+        if flag:
+            regressions.append(name)
+        print(f"{name:<30} {before['p95_ms']:>11.1f} {now['p95_ms']:>10.1f} {change:>+8.0%} "
+              f"{before.get('throughput_rps') or 0:>11.1f} {now.get('throughput_rps') or 0:>9.1f}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('database', help='Database made by bench/generate_data.py (it is copied, never modified).')
+    parser.add_argument('--threads', type=int, default=16, help='Concurrent clients in load scenarios.')
+    parser.add_argument('--repeat', type=int, default=50, help='Requests per scenario (per client in load scenarios).')
+    parser.add_argument('--scenario', action='append', help='Run only these scenarios (repeatable).')
+    parser.add_argument('--output', help='Results file (default bench/results/<database>-<time>.json).')
+    parser.add_argument('--compare', help='Earlier results file to compare against.')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='Allowed p95 increase before a regression is reported.')
+    parser.add_argument('--min-delta-ms', type=float, default=1.0, help='Smaller p95 increases are never reported.')
+    args = parser.parse_args()
+
+    database = os.path.abspath(args.database)
+    output = os.path.abspath(args.output) if args.output else os.path.join(
+        DASHBOARD_DIR, 'bench', 'results', f"{os.path.splitext(os.path.basename(database))[0]}-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    baseline_path = os.path.abspath(args.compare) if args.compare else None
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as directory:
+        shutil.copy(database, os.path.join(directory, 'bench.db'))
+        # app creates its upload folder relative to the working directory on import
+        os.chdir(directory)
+        import app as dashboard
+
+        dashboard.DATABASE = os.path.join(directory, 'bench.db')
+        dashboard.init_db()
+        conn = dashboard.get_db_pool().acquire()
+        applications = conn.execute("SELECT COUNT(*) FROM applications").fetchone()[0]
+        conn.close()
+
+        bench = Bench(dashboard, args.threads)
+        scenarios = bench.scenarios(args.repeat)
+        unknown = set(args.scenario or []) - set(scenarios)
+        if unknown:
+            parser.error(f"unknown scenario(s): {', '.join(sorted(unknown))}; choose from {', '.join(scenarios)}")
+
+        results = {
+            'meta': {
+                'database': os.path.basename(database), 'applications': applications,
+                'started_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+                'threads': args.threads, 'repeat': args.repeat, 'python': platform.python_version(),
+                'sqlite': sqlite3.sqlite_version, 'platform': platform.platform(), 'cpus': os.cpu_count(),
+            },
+            'scenarios': {},
+        }
+        print(f"{applications} applications, {args.threads} threads, {args.repeat} requests per scenario")
+        print(f"{'scenario':<30} {'requests':>8} {'rps':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9} {'RSS MB':>8}  statuses")
+        try:
+            for name, run in scenarios.items():
+                if args.scenario and name not in args.scenario:
+                    continue
+                result = run()
+                results['scenarios'][name] = result
+                print(f"{name:<30} {result['requests']:>8} {result['throughput_rps']:>9.1f} {result['p50_ms']:>9.1f} "
+                      f"{result['p95_ms']:>9.1f} {result['p99_ms']:>9.1f} {result['max_ms']:>9.1f} "
+                      f"{result['peak_rss_mb']:>8.1f}  {result['statuses']}")
+        finally:
+            dashboard.submission_queue.stop()
+            dashboard.resume_worker.stop()
+            dashboard.get_db_pool().close_all()
+            os.chdir(cwd)
+
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults written to {output}")
+
+    if baseline_path:
+        with open(baseline_path) as f:
+            regressions = compare(results, json.load(f), args.tolerance, args.min_delta_ms)
+        if regressions:
+            print(f"\np95 regressed by more than {args.tolerance:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
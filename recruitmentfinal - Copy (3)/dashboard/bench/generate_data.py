@@ -0,0 +1,243 @@
+"""Synthetic applicant databases for benchmarking.
+
+Creates a fresh database with init_db() (default form_config, indexes, rollups, search
+index ...) and fills it with generated applications for every form field, with cardinalities
+close to a real hiring season: a few hundred colleges with a long tail, the posts and
+locations offered by the form, most candidates still 'Applied' and fewer at every later
+stage, each with its status history. Submissions are spread over RECRUITMENT_DAYS with
+campus-drive peaks.
+
+Rows are bulk inserted with the search and row version triggers dropped, then the derived
+tables (rollups, search index, row versions, funnel velocity) are rebuilt once.
+
+    python bench/generate_data.py 100k [--output bench/data/applications_100k.db] [--seed 1]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import app as dashboard  # noqa: E402
+import rollups  # noqa: E402
+import row_versions  # noqa: E402
+import search  # noqa: E402
+import status_history  # noqa: E402
+from queries import quote_ident  # noqa: E402
+
+CHUNK_SIZE = 5000
+RECRUITMENT_DAYS = 180
+SEASON_START = datetime(2024, 1, 1)
+
+FIRST_NAMES = ['Aarav', 'Vivaan', 'Aditya', 'Arjun', 'Sai', 'Rohan', 'Ishaan', 'Kabir', 'Ananya', 'Diya',
+               'Priya', 'Saanvi', 'Aadhya', 'Kavya', 'Meera', 'Riya', 'Neha', 'Pooja', 'Rahul', 'Amit',
+               'Vikram', 'Sneha', 'Tanvi', 'Nikhil', 'Harsh', 'Karan', 'Simran', 'Manish', 'Deepak', 'Shreya']
+LAST_NAMES = ['Sharma', 'Verma', 'Gupta', 'Singh', 'Kumar', 'Patel', 'Reddy', 'Nair', 'Iyer', 'Das',
+              'Bose', 'Mehta', 'Joshi', 'Chopra', 'Malhotra', 'Agarwal', 'Banerjee', 'Mukherjee', 'Rao', 'Pillai']
+CITIES = ['Delhi', 'Mumbai', 'Kolkata', 'Chennai', 'Hyderabad', 'Pune', 'Bangalore', 'Jaipur', 'Lucknow',
+          'Ahmedabad', 'Bhopal', 'Patna', 'Indore', 'Nagpur', 'Kochi', 'Gurugram', 'Noida', 'Chandigarh']
+BOARDS = ['CBSE', 'ICSE', 'State Board', 'WBBSE', 'Maharashtra State Board', 'UP Board', 'IB']
+COURSES = ['B.Tech', 'B.E.', 'B.Sc', 'B.Com', 'BBA', 'BCA', 'B.A.', 'B.Arch']
+SPECIALIZATIONS = ['Computer Science', 'Civil', 'Mechanical', 'Electrical', 'Electronics', 'Chemical',
+                   'Information Technology', 'Finance', 'Marketing', 'Economics', 'Mathematics', 'Physics']
+PG_COURSES = ['MBA', 'M.Tech', 'M.Sc', 'MCA', 'M.Com']
+DIVISIONS = ['First', 'First with Distinction', 'Second']
+HOBBIES = ['Reading', 'Cricket', 'Music', 'Travelling', 'Chess', 'Photography', 'Painting', 'Football']
+# Shares of candidates that reach each later stage from the previous one; the rest are rejected or stay
+FUNNEL = [('Shortlisted', 0.35), ('Interviewed', 0.6), ('Offered', 0.45), ('Hired', 0.7)]
+REJECTION_RATE = 0.3
+
+
+def parse_count(text):
+    """'10k' -> 10000, '1m' -> 1000000."""
+    text = text.strip().lower()
+    scale = {'k': 1000, 'm': 1000000}.get(text[-1:], 1)
+    return int(float(text[:-1] if scale > 1 else text) * scale)
+
+
+def make_colleges(rnd, count=400):
+    """College names with Zipf-like weights: a few campuses send most of the applicants."""
+    kinds = ['Institute of Technology', 'Engineering College', 'University', 'College of Commerce', 'Institute of Management']
+    names = [f"{rnd.choice(CITIES)} {rnd.choice(kinds)} {i + 1}" for i in range(count)]
+    weights = [1 / (rank + 1) for rank in range(count)]
+    return names, weights
+
+
+def submission_days(rnd, count):
+    """Campus drive days: roughly one every two weeks, each bringing a spike of submissions."""
+    drives = sorted(rnd.sample(range(RECRUITMENT_DAYS), RECRUITMENT_DAYS // 14))
+    days, weights = list(range(RECRUITMENT_DAYS)), [1.0] * RECRUITMENT_DAYS
+    for day in drives:
+        for offset, boost in ((0, 12.0), (1, 6.0), (2, 2.0)):
+            if day + offset < RECRUITMENT_DAYS:
+                weights[day + offset] += boost
+    return rnd.choices(days, weights, k=count)
+
+
+class ApplicantFactory:
+    """Generates the values of one application for the form fields, by field name or else by type."""
+
+    def __init__(self, rnd, fields):
+        self.rnd = rnd
+        self.fields = fields
+        self.colleges, self.college_weights = make_colleges(rnd)
+        self.options = {f['name']: [o.strip() for o in (f['options'] or '').split(',') if o.strip()] for f in fields}
+
+    def value(self, field, submitted):
+        rnd, name = self.rnd, field['name']
+        if not field['required'] and name not in ('gender', 'post_applying_for', 'location_of_position',
+                                                   'business_entity', 'qualification_grad_school') and rnd.random() < 0.15:
+            return None
+        if name == 'dob':
+            return (submitted - timedelta(days=365 * rnd.randint(20, 28) + rnd.randint(0, 364))).strftime('%Y-%m-%d')
+        if name == 'mobile_number':
+            return f"9{rnd.randrange(10 ** 9):09d}"
+        if name == 'pan_card':
+            return ''.join(rnd.choice('ABCDEFGHIJKLMNOPQRSTUVWXYZ') for _ in range(5)) + f"{rnd.randrange(10000):04d}" + rnd.choice('ABCDEFGHIJKLMNOPQRSTUVWXYZ')
+        if name == 'nationality':
+            return 'Indian' if rnd.random() < 0.97 else 'Nepalese'
+        if name in ('place_of_birth',) or name.endswith('_address'):
+            city = rnd.choice(CITIES)
+            return city if name == 'place_of_birth' else f"{rnd.randint(1, 999)}, Sector {rnd.randint(1, 80)}, {city}"
+        if name in ('father_name', 'spouse_name'):
+            return f"{rnd.choice(FIRST_NAMES)} {rnd.choice(LAST_NAMES)}"
+        if name == 'children_count':
+            return str(rnd.choice([0, 0, 0, 1, 2]))
+        if name == 'hobbies':
+            return ', '.join(rnd.sample(HOBBIES, rnd.randint(1, 3)))
+        if name == 'qualification_grad_school':
+            return rnd.choices(self.colleges, self.college_weights)[0]
+        if name.endswith('_board'):
+            return rnd.choice(BOARDS)
+        if name.endswith('_year'):
+            offset = {'10th': 7, '12th': 5, 'grad': 1, 'pg': 0}.get(name.split('_')[1], 0)
+            return str(submitted.year - offset)
+        if name.endswith('_marks'):
+            return f"{rnd.uniform(55, 98):.1f}"
+        if name.endswith('_division'):
+            return rnd.choice(DIVISIONS)
+        if name == 'qualification_grad_course':
+            return rnd.choice(COURSES)
+        if name == 'qualification_pg_course':
+            return rnd.choice(PG_COURSES) if rnd.random() < 0.3 else None
+        if name.endswith('_specialization') or name.endswith('_subjects'):
+            return rnd.choice(SPECIALIZATIONS)
+        if name.endswith('_school'):
+            return f"{rnd.choice(['Kendriya Vidyalaya', 'DAV Public School', 'St. Xavier', 'Delhi Public School'])} {rnd.choice(CITIES)}"
+        if name.endswith('_details'):
+            return None
+        options = self.options.get(name)
+        if options:
+            return rnd.choice(options) if field['type'] != 'radio' else ('No' if rnd.random() < 0.9 else 'Yes')
+        if field['type'] == 'number':
+            return str(rnd.randint(0, 10))
+        if field['type'] == 'date':
+            return (submitted - timedelta(days=rnd.randint(0, 3650))).strftime('%Y-%m-%d')
+        return f"{name.replace('_', ' ').title()} {rnd.randint(1, 500)}"
+
+    def application(self, number, submitted):
+        first, last = self.rnd.choice(FIRST_NAMES), self.rnd.choice(LAST_NAMES)
+        values = {field['name']: self.value(field, submitted) for field in self.fields}
+        values.update({
+            'name': f"{first} {last}", 'email': f"{first}.{last}.{number}@example.com".lower(),
+            'submission_timestamp': submitted.strftime('%Y-%m-%d %H:%M:%S'),
+            'resume_path': f"{number % 256:02x}/{number // 256 % 256:02x}/{number:064x}.pdf",
+        })
+        return values
+
+    def history(self, submitted):
+        """Status events (from, to, changed_at) of one candidate, walking down the funnel."""
+        events, status, at = [], 'Applied', submitted
+        for stage, share in FUNNEL:
+            at += timedelta(hours=self.rnd.uniform(12, 24 * 14))
+            if self.rnd.random() < share:
+                events.append((status, stage, at))
+                status = stage
+            else:
+                if self.rnd.random() < REJECTION_RATE:
+                    events.append((status, 'Rejected', at))
+                break
+        return events
+
+
+def generate(path, count, seed=1):
+    rnd = random.Random(seed)
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    dashboard.DATABASE = path
+    dashboard.init_db()
+
+    conn = dashboard.get_db_pool().acquire()
+    try:
+        fields = [dict(row) for row in conn.execute("SELECT name, type, options, required FROM form_config ORDER BY field_order")]
+        columns = [field['name'] for field in fields] + ['submission_timestamp', 'resume_path']
+        factory = ApplicantFactory(rnd, [f for f in fields if f['name'] not in ('name', 'email')])
+        days = submission_days(rnd, count)
+
+        # Derived tables are rebuilt once at the end instead of maintained row by row
+        conn.execute("BEGIN IMMEDIATE")
+        search.drop_triggers(conn)
+        for name in row_versions.TRIGGERS:
+            conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+        conn.commit()
+
+        insert_sql = (f"INSERT INTO applications ({', '.join(quote_ident(col) for col in columns)}) "
+                      f"VALUES ({', '.join('?' * len(columns))})")
+        start = time.perf_counter()
+        for offset in range(0, count, CHUNK_SIZE):
+            rows, statuses, events = [], [], []
+            for number in range(offset, min(offset + CHUNK_SIZE, count)):
+                submitted = SEASON_START + timedelta(days=days[number], seconds=rnd.randrange(86400))
+                values = factory.application(number, submitted)
+                rows.append([values.get(col) for col in columns])
+                history = factory.history(submitted)
+                if history:
+                    statuses.append((values['email'], values['name'], history[-1][1]))
+                    events.extend((values['email'], from_status, to_status, at.strftime('%Y-%m-%d %H:%M:%S'), 'bench')
+                                  for from_status, to_status, at in history)
+            conn.execute("BEGIN")
+            conn.executemany(insert_sql, rows)
+            conn.executemany("INSERT INTO statuses (email, name, status) VALUES (?, ?, ?)", statuses)
+            conn.executemany("INSERT INTO status_events (email, from_status, to_status, changed_at, changed_by) "
+                             "VALUES (?, ?, ?, ?, ?)", events)
+            conn.commit()
+            print(f"\r{offset + len(rows):>9} / {count} applications", end='', flush=True)
+        print(f"  ({time.perf_counter() - start:.1f} s)")
+
+        print("Rebuilding derived tables...")
+        conn.execute("BEGIN IMMEDIATE")
+        rollups.rebuild(conn)
+        status_history.rebuild(conn)
+        search.sync_search_index(conn)
+        row_versions.init_row_versions(conn)
+        conn.commit()
+        conn.execute("ANALYZE")
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    finally:
+        conn.close()
+    dashboard.get_db_pool().close_all()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('applications', help='Number of applications, e.g. 10k, 100k or 1m.')
+    parser.add_argument('--output', help='Database file (default bench/data/applications_<count>.db).')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    count = parse_count(args.applications)
+    output = args.output or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data',
+                                         f"applications_{args.applications.lower()}.db")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    start = time.perf_counter()
+    generate(output, count, args.seed)
+    print(f"Wrote {count} applications to {output} in {time.perf_counter() - start:.1f} s "
+          f"({os.path.getsize(output) / 1024 / 1024:.0f} MB)")
+
+
+if __name__ == '__main__':
+    main()
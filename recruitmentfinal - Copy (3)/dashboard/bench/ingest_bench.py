@@ -0,0 +1,135 @@
+"""Submission write throughput: one commit per request vs the group-commit ingest queue.
+
+Simulates a campus drive: CLIENTS threads each submit SUBMISSIONS applications as fast as
+they can against a fresh database, once through the per-request path (pooled connection,
+form_config lookup, INSERT, commit) and once through ingest.IngestQueue. A share of the
+submissions reuse an email so duplicate handling is exercised too.
+
+    python bench/ingest_bench.py [--clients 64] [--submissions 50] [--duplicates 0.02]
+"""
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import app as dashboard  # noqa: E402
+import ingest  # noqa: E402
+import resume_jobs  # noqa: E402
+import rollups  # noqa: E402
+from queries import quote_ident  # noqa: E402
+
+
+def make_submission(client, number, duplicate_rate):
+    if number > 0 and random.random() < duplicate_rate:
+        number -= 1  # resubmits the previous email
+    return {
+        'name': f"Student {client}-{number}",
+        'email': f"student{client}.{number}@campus.example",
+        'mobile_number': f"98{random.randrange(10 ** 8):08d}",
+        'gender': random.choice(['Male', 'Female']),
+        'post_applying_for': random.choice(['Graduate Engineer Trainee', 'Management Trainee', 'Analyst']),
+        'location_of_position': random.choice(['Kolkata', 'Delhi', 'Goa']),
+        'qualification_grad_school': random.choice(['IIT Kharagpur', 'NIT Durgapur', 'Jadavpur University']),
+    }
+
+
+def submit_per_request(data, resume_path):
+    """The submission path before the ingest queue: one transaction and commit per request."""
+    conn = dashboard.get_db_pool().acquire()
+    try:
+        valid_columns = {row['name'] for row in conn.execute("SELECT name FROM form_config").fetchall()}
+        valid_columns.add('resume_path')
+        data = dict(data, resume_path=resume_path)
+        columns = [col for col in data if col in valid_columns]
+        cursor = conn.execute(
+            f"INSERT INTO applications ({', '.join(quote_ident(col) for col in columns)}) "
+            f"VALUES ({', '.join('?' * len(columns))})",
+            [data[col] for col in columns]
+        )
+        rollups.adjust(conn, "a.rowid = ?", [cursor.lastrowid], 1)
+        resume_jobs.enqueue(conn, cursor.lastrowid, resume_path)
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def run(label, submit, clients, submissions, duplicate_rate):
+    latencies, conflicts, errors = [], [0], []
+    lock = threading.Lock()
+    barrier = threading.Barrier(clients + 1)
+
+    def client(index):
+        local = []
+        barrier.wait()
+        for number in range(submissions):
+            data = make_submission(index, number, duplicate_rate)
+            start = time.perf_counter()
+            try:
+                submit(data, 'aa/bb/resume.pdf')
+            except sqlite3.IntegrityError:
+                with lock:
+                    conflicts[0] += 1
+            except Exception as e:
+                with lock:
+                    errors.append(f"{type(e).__name__}: {e}")
+            local.append((time.perf_counter() - start) * 1000)
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    total = len(latencies)
+    print(f"{label:<34} {total / elapsed:>9.0f}/s  p50 {statistics.median(latencies):>7.1f} ms  "
+          f"p99 {latencies[int(total * 0.99) - 1]:>7.1f} ms  duplicates {conflicts[0]:>4}  errors {len(errors)}")
+    for error in sorted(set(errors))[:5]:
+        print(f"    {error}")
+
+
+def fresh_database(directory, name):
+    dashboard.DATABASE = os.path.join(directory, name)
+    dashboard.init_db()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clients', type=int, default=64)
+    parser.add_argument('--submissions', type=int, default=50, help='Submissions per client.')
+    parser.add_argument('--duplicates', type=float, default=0.02, help='Share of submissions reusing an email.')
+    args = parser.parse_args()
+
+    print(f"{args.clients} clients x {args.submissions} submissions, pool size {dashboard.DB_POOL_SIZE}")
+    with tempfile.TemporaryDirectory() as directory:
+        random.seed(1)
+        fresh_database(directory, 'per_request.db')
+        run("per-request commit (sync NORMAL)", submit_per_request, args.clients, args.submissions, args.duplicates)
+
+        for synchronous in ('NORMAL', 'FULL'):
+            random.seed(1)
+            fresh_database(directory, f"group_{synchronous.lower()}.db")
+            queue = ingest.IngestQueue(lambda: dashboard.get_db_pool().acquire(), max_batch=dashboard.INGEST_MAX_BATCH,
+                                       max_delay_ms=dashboard.INGEST_MAX_DELAY_MS, synchronous=synchronous)
+            run(f"group commit (sync {synchronous})", queue.submit, args.clients, args.submissions, args.duplicates)
+            queue.stop()
+            stats = queue.stats()
+            print(f"{'':<34} {stats['batches']} batches, avg {stats['avg_batch_size']} / max {stats['max_batch_size']} "
+                  f"submissions, avg {stats['avg_commit_ms']} ms per batch")
+        dashboard.get_db_pool().close_all()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""Cold start benchmark: time to import app and run init_db(), and the memory that costs.
+
+Starts a fresh interpreter per run against a copy of a database made by generate_data.py
+and measures, inside it, the import of app, the init_db() call and the peak RSS after each,
+plus which heavy optional modules ended up loaded. The first run reflects a database that
+may still need migrating; the median of the remaining runs is the normal worker boot.
+
+    python bench/startup_bench.py bench/data/applications_100k.db [--runs 7] [--output startup.json]
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+DASHBOARD_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+# Modules that should only be loaded by the routes that need them
+HEAVY_MODULES = ['pandas', 'numpy', 'openpyxl', 'requests', 'pypdf']
+
+# Runs in the child interpreter, with the working directory holding bench.db
+CHILD = '''
+import json, os, resource, sys, time
+started = time.perf_counter()
+sys.path.insert(0, {dashboard!r})
+def rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / 1024 / (1024 if sys.platform == 'darwin' else 1), 1)
+import app
+imported = time.perf_counter()
+import_rss = rss_mb()
+app.DATABASE = os.path.abspath('bench.db')
+app.init_db()
+initialized = time.perf_counter()
+app.get_db_pool().close_all()
+print(json.dumps({{
+    'import_ms': round((imported - started) * 1000, 1), 'init_db_ms': round((initialized - imported) * 1000, 1),
+    'import_rss_mb': import_rss, 'peak_rss_mb': rss_mb(), 'modules': len(sys.modules),
+    'heavy_modules': [name for name in {heavy!r} if name in sys.modules],
+}}))
+'''
+
+
+def run_once(directory):
+    env = dict(os.environ, JSON_LOGS='0')
+    started = time.perf_counter()
+    result = subprocess.run([sys.executable, '-c', CHILD.format(dashboard=DASHBOARD_DIR, heavy=HEAVY_MODULES)],
+                            cwd=directory, env=env, capture_output=True, text=True)
+    elapsed = (time.perf_counter() - started) * 1000
+    if result.returncode != 0:
+        raise SystemExit(f"Startup run failed:\n{result.stderr}")
+    measurement = json.loads(result.stdout.strip().splitlines()[-1])
+    measurement['process_ms'] = round(elapsed, 1)
+    return measurement
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('database', help='Database made by bench/generate_data.py (it is copied, never modified).')
+    parser.add_argument('--runs', type=int, default=7, help='Interpreter starts; the first may migrate the database.')
+    parser.add_argument('--output', help='Also write the results to this JSON file.')
+    args = parser.parse_args()
+
+    database = os.path.abspath(args.database)
+    with tempfile.TemporaryDirectory() as directory:
+        shutil.copy(database, os.path.join(directory, 'bench.db'))
+        runs = [run_once(directory) for _ in range(max(args.runs, 2))]
+
+    warm = runs[1:]
+    summary = {key: statistics.median(run[key] for run in warm)
+               for key in ('process_ms', 'import_ms', 'init_db_ms', 'import_rss_mb', 'peak_rss_mb', 'modules')}
+    results = {
+        'meta': {'database': os.path.basename(database), 'runs': len(runs), 'python': platform.python_version(),
+                 'platform': platform.platform(), 'started_at': datetime.now(timezone.utc).isoformat(timespec='seconds')},
+        'first_start': runs[0], 'median': summary, 'heavy_modules': warm[-1]['heavy_modules'],
+    }
+    print(f"{'':<14} {'process ms':>11} {'import ms':>10} {'init_db ms':>11} {'import RSS':>11} {'peak RSS':>9} {'modules':>8}")
+    for label, row in (('first start', runs[0]), ('median', summary)):
+        print(f"{label:<14} {row['process_ms']:>11.1f} {row['import_ms']:>10.1f} {row['init_db_ms']:>11.1f} "
+              f"{row['import_rss_mb']:>11.1f} {row['peak_rss_mb']:>9.1f} {row['modules']:>8}")
+    print(f"Heavy modules loaded at startup: {', '.join(results['heavy_modules']) or 'none'}")
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
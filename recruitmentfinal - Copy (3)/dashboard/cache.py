@@ -0,0 +1,82 @@
+"""In-process LRU cache for computed API responses.
+
+Entries are keyed by the normalized request filters plus a data version. Every write path
+calls bump_version(), which drops the stored entries; because the version is part of the key,
+a response that was still being computed from pre-write data when the version moved is
+discarded instead of being stored.
+"""
+import threading
+from collections import OrderedDict
+
+
+class ResponseCache:
+    """LRU cache of serialized responses bounded by entry count and total size in bytes."""
+
+    def __init__(self, max_entries=128, max_bytes=64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._version = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def version(self):
+        return self._version
+
+    def bump_version(self, version=None):
+        """Moves to 'version' (e.g. a version shared between processes) or the next one, dropping the entries."""
+        with self._lock:
+            self._version = self._version + 1 if version is None else version
+            self._entries.clear()
+            self._bytes = 0
+            return self._version
+
+    def make_key(self, params, version=None):
+        """Key for a request: its non-empty parameters (sorted, 'all' dropped) plus the data version."""
+        normalized = tuple(sorted((k, v) for k, v in params.items() if v and v != 'all'))
+        return (self._version if version is None else version, normalized)
+
+    def get(self, key):
+        with self._lock:
+            body = self._entries.get(key)
+            if body is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return body
+
+    def put(self, key, body):
+        size = len(body)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key[0] != self._version:
+                return  # computed from data older than the latest write
+            if key in self._entries:
+                self._bytes -= len(self._entries.pop(key))
+            self._entries[key] = body
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'version': self._version, 'entries': len(self._entries), 'bytes': self._bytes,
+                'max_entries': self.max_entries, 'max_bytes': self.max_bytes,
+                'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0
+            }
@@ -0,0 +1,127 @@
+"""In-process change bus feeding the dashboard's Server-Sent Events stream.
+
+Every committed write publishes one small typed event, numbered with the data version it
+produced (see ResponseCache.bump_version):
+
+- application: new applications; 'rows' are their table rows
+- status:      status changes; 'rows' are the affected table rows, plus the new funnel velocity
+- form_config: form fields or sections changed; dashboards reload their columns
+- resync:      something changed that isn't described by a delta (e.g. a bulk import)
+
+application and status events carry 'groups', the rollup group deltas of the change
+({status, business_entity, ..., submission_day, delta}), from which a dashboard updates its
+KPIs and charts for whatever filters it has selected. Subscribers get their own bounded
+queue; one that falls behind is sent a resync instead of an ever-growing backlog. The last
+'history' events are kept so a reconnecting EventSource resumes from Last-Event-ID.
+"""
+import json
+import queue
+import threading
+from collections import deque
+
+from queries import STATUS_JOIN, build_table_select, get_application_columns
+
+# Rows sent with one event; larger changes send the count and dashboards reload the table page
+MAX_EVENT_ROWS = 200
+
+
+class Subscription:
+    def __init__(self, max_pending):
+        self.events = queue.Queue(maxsize=max_pending)
+        self.overflowed = False
+
+    def get(self, timeout):
+        """Next event, or None after 'timeout' seconds without one."""
+        try:
+            return self.events.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class ChangeBus:
+    """Fans published events out to subscriber queues and keeps a short replay history."""
+
+    def __init__(self, history=256, max_pending=64, max_subscribers=200):
+        self.max_pending = max_pending
+        self.max_subscribers = max_subscribers
+        self._history = deque(maxlen=history)
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self.published = 0
+        self.overflows = 0
+
+    def publish(self, event_id, event_type, data=None):
+        event = {'id': event_id, 'type': event_type, 'data': dict(data or {}, version=event_id)}
+        with self._lock:
+            self._history.append(event)
+            self.published += 1
+            for subscription in self._subscribers:
+                if subscription.overflowed:
+                    continue
+                try:
+                    subscription.events.put_nowait(event)
+                except queue.Full:
+                    subscription.overflowed = True
+                    self.overflows += 1
+
+    def subscribe(self, last_event_id=None):
+        """
+        Registers a subscriber, or returns None when max_subscribers are connected.
+
+        With last_event_id, the events published since are queued first, or a resync if they
+        are no longer in the history.
+        """
+        subscription = Subscription(self.max_pending)
+        with self._lock:
+            if len(self._subscribers) >= self.max_subscribers:
+                return None
+            if last_event_id is not None:
+                latest = self._history[-1]['id'] if self._history else 0
+                missed = [event for event in self._history if event['id'] > last_event_id]
+                if (last_event_id > latest  # ids from before a restart
+                        or (missed and missed[0]['id'] > last_event_id + 1)  # older than the history
+                        or len(missed) > self.max_pending):
+                    subscription.overflowed = True
+                else:
+                    for event in missed:
+                        subscription.events.put_nowait(event)
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def resubscribe(self, subscription):
+        """Clears an overflowed subscription so it receives events again (after it was sent a resync)."""
+        with self._lock:
+            while not subscription.events.empty():
+                subscription.events.get_nowait()
+            subscription.overflowed = False
+
+    def stats(self):
+        with self._lock:
+            return {'subscribers': len(self._subscribers), 'published': self.published, 'overflows': self.overflows,
+                    'history': len(self._history), 'last_id': self._history[-1]['id'] if self._history else None}
+
+
+def format_event(event):
+    """Serializes an event in the text/event-stream format."""
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {json.dumps(event['data'], separators=(',', ':'))}\n\n"
+
+
+def build_row_event(conn, where, params, groups, extra=None):
+    """
+    Payload of an application / status event: the table rows matching 'where' (a condition on
+    applications aliased as 'a', as in rollups.adjust), at most MAX_EVENT_ROWS of them, and the
+    rollup group deltas. Call it on the writer's connection once its changes are made.
+    """
+    columns = get_application_columns(conn)
+    rows = conn.execute(
+        f"SELECT {build_table_select(columns)} FROM applications a {STATUS_JOIN} WHERE {where} ORDER BY a.rowid LIMIT ?",
+        list(params) + [MAX_EVENT_ROWS + 1]
+    ).fetchall()
+    data = {'rows': [dict(row) for row in rows[:MAX_EVENT_ROWS]], 'rows_truncated': len(rows) > MAX_EVENT_ROWS,
+            'groups': groups}
+    data.update(extra or {})
+    return data
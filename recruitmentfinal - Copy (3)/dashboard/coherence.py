@@ -0,0 +1,82 @@
+"""Cross-process cache coherence through a shared version row.
+
+Every worker process keeps its own caches (the /api/data response cache, the public form
+config snapshot) and clears them after its own writes. With several workers it also has to
+notice the writes of the others. cache_state holds two counters that every write bumps once
+it is committed (see invalidate_caches in app.py):
+
+- data_version:        anything the dashboards show changed (form config changes included)
+- form_config_version: form fields or sections changed
+
+A process remembers the versions it has caught up with. bump() counts one of its own writes
+and, from how far the counters moved, also tells whether other processes wrote in between;
+read_versions() at the start of each request (public endpoints: at most once per
+SHARED_VERSIONS_CHECK_MS), compared with is_current(), notices writes made elsewhere, and
+catch_up() moves to them. Since the data version is shared, cache keys
+and live update event ids mean the same on every worker.
+"""
+
+SCHEMA = [
+    '''
+    CREATE TABLE IF NOT EXISTS cache_state (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        data_version INTEGER NOT NULL DEFAULT 0,
+        form_config_version INTEGER NOT NULL DEFAULT 0
+    )
+    ''',
+    "INSERT OR IGNORE INTO cache_state (id) VALUES (1)",
+]
+
+
+def init_cache_state(conn):
+    for sql in SCHEMA:
+        conn.execute(sql)
+
+
+def read_versions(conn):
+    """(data_version, form_config_version) as committed by all processes."""
+    row = conn.execute("SELECT data_version, form_config_version FROM cache_state WHERE id = 1").fetchone()
+    return (row[0], row[1]) if row else (0, 0)
+
+
+class SharedVersions:
+    """The cache_state versions this process has caught up with. Callers serialize bump() and catch_up()."""
+
+    def __init__(self):
+        self.data_version = None
+        self.form_config_version = None
+
+    def is_current(self, versions):
+        return versions == (self.data_version, self.form_config_version)
+
+    def catch_up(self, versions):
+        """
+        Moves to 'versions' (from read_versions). Returns (data_changed, form_config_changed).
+
+        Versions older than the ones already seen (read before a concurrent bump) are ignored.
+        """
+        data_version, form_config_version = versions
+        if self.data_version is not None and data_version <= self.data_version:
+            return False, False
+        form_config_changed = self.form_config_version is not None and form_config_version != self.form_config_version
+        self.data_version, self.form_config_version = versions
+        return True, form_config_changed
+
+    def bump(self, conn, form_config=False):
+        """
+        Counts a committed write of this process, in its own short transaction on 'conn'.
+
+        Returns (data_version, data_changed_elsewhere, form_config_changed_elsewhere): the new
+        data version, and whether other processes wrote since this one last looked.
+        """
+        conn.execute(
+            "UPDATE cache_state SET data_version = data_version + 1"
+            f"{', form_config_version = form_config_version + 1' if form_config else ''} WHERE id = 1"
+        )
+        data_version, form_config_version = read_versions(conn)
+        conn.commit()
+        known = self.data_version is not None
+        data_elsewhere = known and data_version != self.data_version + 1
+        form_config_elsewhere = known and form_config_version != self.form_config_version + (1 if form_config else 0)
+        self.data_version, self.form_config_version = data_version, form_config_version
+        return data_version, data_elsewhere, form_config_elsewhere
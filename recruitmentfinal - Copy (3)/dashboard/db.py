@@ -0,0 +1,219 @@
+"""SQLite connection pooling.
+
+Connections are opened once with WAL journaling and tuned pragmas, then reused. A pooled
+connection's close() hands it back to the pool (rolling back anything left uncommitted)
+instead of closing the file, so existing `conn = get_db_conn() ... conn.close()` code gets
+pooling without changes.
+
+With on_query, every statement run through a pooled connection (or its cursors) is timed
+and reported as on_query(sql, seconds). For a SELECT that is the time to the first row.
+"""
+import collections
+import sqlite3
+import threading
+import time
+
+# Applied to every new connection. WAL lets dashboard reads run while a submission commits.
+DEFAULT_PRAGMAS = [
+    ('journal_mode', 'WAL'),
+    ('synchronous', 'NORMAL'),
+    ('cache_size', '-20000'),      # ~20 MB page cache per connection
+    ('mmap_size', '268435456'),    # 256 MB memory-mapped I/O
+    ('temp_store', 'MEMORY'),
+]
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection became free within the pool timeout."""
+
+
+def _timed(on_query, run, sql, *args):
+    if on_query is None:
+        return run(sql, *args)
+    start = time.perf_counter()
+    try:
+        return run(sql, *args)
+    finally:
+        on_query(sql, time.perf_counter() - start)
+
+
+class TimedCursor(sqlite3.Cursor):
+    def execute(self, sql, parameters=()):
+        return _timed(self.connection._on_query, super().execute, sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return _timed(self.connection._on_query, super().executemany, sql, seq_of_parameters)
+
+
+class PooledConnection(sqlite3.Connection):
+    """sqlite3 connection whose close() returns it to its pool."""
+
+    _pool = None
+    _request_bound = False
+    _checked_out = False
+    _on_query = None
+
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return _timed(self._on_query, super().execute, sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return _timed(self._on_query, super().executemany, sql, seq_of_parameters)
+
+    def executescript(self, sql_script):
+        return _timed(self._on_query, super().executescript, sql_script)
+
+    def close(self):
+        if self._request_bound:
+            return  # released by the request teardown
+        if self._pool is not None:
+            self._pool.release(self)
+        else:
+            super().close()
+
+    def really_close(self):
+        self._pool = None
+        super().close()
+
+
+class _Waiter:
+    __slots__ = ('ready', 'conn')
+
+    def __init__(self):
+        self.ready = threading.Event()
+        self.conn = None
+
+
+class ConnectionPool:
+    """
+    A bounded pool of SQLite connections with wait-time metrics.
+
+    When every connection is in use, acquire() waits in line: a released connection goes to
+    the longest waiting thread, so a thread that releases and immediately acquires again
+    can't take it from threads that have been waiting (which then starve until the timeout).
+    """
+
+    def __init__(self, database, max_size=8, timeout=10.0, busy_timeout_ms=5000, cached_statements=256, pragmas=None,
+                 on_query=None):
+        self.database = database
+        self.max_size = max_size
+        self.timeout = timeout
+        self.busy_timeout_ms = busy_timeout_ms
+        self.cached_statements = cached_statements
+        self.pragmas = DEFAULT_PRAGMAS if pragmas is None else pragmas
+        self.on_query = on_query
+        self._idle = []  # most recently released last
+        self._waiters = collections.deque()
+        self._lock = threading.Lock()
+        self._created = 0
+        self._in_use = 0
+        self.acquisitions = 0
+        self.waits = 0
+        self.timeouts = 0
+        self.total_wait_ms = 0.0
+        self.max_wait_ms = 0.0
+
+    def _connect(self):
+        conn = sqlite3.connect(self.database, timeout=self.busy_timeout_ms / 1000,
+                               check_same_thread=False, factory=PooledConnection,
+                               cached_statements=self.cached_statements)
+        conn.row_factory = sqlite3.Row
+        conn.execute(f"PRAGMA busy_timeout = {int(self.busy_timeout_ms)}")
+        for name, value in self.pragmas:
+            conn.execute(f"PRAGMA {name} = {value}")
+        conn._pool = self
+        conn._on_query = self.on_query
+        return conn
+
+    def _create(self):
+        """Opens a connection for a slot already counted in _created."""
+        try:
+            return self._connect()
+        except Exception:
+            with self._lock:
+                self._created -= 1
+            raise
+
+    def acquire(self):
+        start = time.perf_counter()
+        waiter = None
+        with self._lock:
+            if self._idle and not self._waiters:
+                conn = self._idle.pop()
+            elif self._created < self.max_size:
+                self._created += 1
+                conn = None
+            else:
+                conn, waiter = None, _Waiter()
+                self._waiters.append(waiter)
+
+        if waiter is not None:
+            if not waiter.ready.wait(self.timeout):
+                with self._lock:
+                    if not waiter.ready.is_set():  # not handed a connection at the last moment
+                        self._waiters.remove(waiter)
+                        self.timeouts += 1
+                        raise PoolTimeout(f"No database connection became free within {self.timeout}s.")
+            conn = waiter.conn  # None: a broken connection's slot was handed over instead
+        if conn is None:
+            conn = self._create()
+
+        wait_ms = (time.perf_counter() - start) * 1000
+        with self._lock:
+            self._in_use += 1
+            self.acquisitions += 1
+            if waiter is not None:
+                self.waits += 1
+                self.total_wait_ms += wait_ms
+                self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+        conn._checked_out = True
+        return conn
+
+    def _hand_over(self, conn):
+        """Gives a released connection (or, with None, a free slot) to the first waiter. Call with _lock held."""
+        if self._waiters:
+            waiter = self._waiters.popleft()
+            waiter.conn = conn
+            if conn is None:
+                self._created += 1
+            waiter.ready.set()
+        elif conn is not None:
+            self._idle.append(conn)
+
+    def release(self, conn):
+        if not conn._checked_out:
+            return  # already back in the pool
+        conn._checked_out = False
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            # A broken connection is dropped and replaced on the next acquire
+            with self._lock:
+                self._created -= 1
+                self._in_use -= 1
+                self._hand_over(None)
+            conn.really_close()
+            return
+        with self._lock:
+            self._in_use -= 1
+            self._hand_over(conn)
+
+    def close_all(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+            self._created -= len(idle)
+        for conn in idle:
+            conn.really_close()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'database': self.database, 'max_size': self.max_size, 'created': self._created,
+                'in_use': self._in_use, 'idle': len(self._idle), 'waiting': len(self._waiters),
+                'acquisitions': self.acquisitions, 'waits': self.waits, 'timeouts': self.timeouts,
+                'avg_wait_ms': round(self.total_wait_ms / self.waits, 3) if self.waits else 0.0,
+                'max_wait_ms': round(self.max_wait_ms, 3)
+            }
@@ -0,0 +1,48 @@
+"""gunicorn settings for wsgi.py, read from the same environment as app.py.
+
+The thread count comes from SERVER_THREADS, which app.py derives its per-worker admission
+limits and connection pool size from, so the two can't disagree.
+"""
+import os
+import subprocess
+import sys
+
+wsgi_app = 'wsgi:app'
+bind = os.environ.get('BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('WEB_WORKERS', 4))
+# Threaded workers: the live dashboard stream (/api/changes) holds a thread while a dashboard is open
+worker_class = 'gthread'
+threads = int(os.environ.get('SERVER_THREADS', 16))
+
+# Public requests and live streams must leave threads over for the dashboard and admin requests
+# (app.py defaults each of these limits to a quarter of SERVER_THREADS)
+_thread_share = max(1, threads // 4)
+_limits = {name: int(os.environ.get(name, _thread_share))
+           for name in ('PUBLIC_MAX_CONCURRENT', 'PUBLIC_MAX_QUEUE', 'CHANGE_MAX_SUBSCRIBERS')}
+if sum(_limits.values()) >= threads:
+    raise RuntimeError(f"{' + '.join(_limits)} must be below SERVER_THREADS "
+                       f"({' + '.join(str(limit) for limit in _limits.values())} >= {threads}).")
+
+# Resume extraction runs in one "flask process-resumes --watch" process per host, started by the
+# master, rather than in a process pool in every worker. RESUME_WORKER_IN_WEB=0 means it is run
+# separately, so don't start it here either.
+_start_resume_worker = os.environ.get('RESUME_WORKER_IN_WEB', '1') != '0'
+os.environ['RESUME_WORKER_IN_WEB'] = '0'  # inherited by the workers
+_resume_worker = None
+
+
+def when_ready(server):
+    global _resume_worker
+    if _start_resume_worker:
+        # Same working directory as the workers, which DATABASE and UPLOAD_FOLDER are relative to
+        _resume_worker = subprocess.Popen([sys.executable, '-m', 'flask', '--app', 'app', 'process-resumes', '--watch'])
+        server.log.info("Started the resume worker (pid: %s)", _resume_worker.pid)
+
+
+def on_exit(server):
+    if _resume_worker is not None and _resume_worker.poll() is None:
+        _resume_worker.terminate()  # it finishes the jobs it is running first
+        try:
+            _resume_worker.wait(30)
+        except subprocess.TimeoutExpired:
+            _resume_worker.kill()
@@ -0,0 +1,233 @@
+"""Bulk import of applications from CSV / XLSX files.
+
+The file is read row by row (csv.reader, or openpyxl in read-only mode), its headers are
+mapped to applications columns once, and rows are written in chunks: one transaction and a
+pair of executemany statements per chunk. Rows are matched to existing applications on the
+lower-cased email, so re-importing a file updates candidates instead of duplicating them.
+"""
+import csv
+import io
+import re
+import sqlite3
+from datetime import date, datetime
+
+import rollups
+from queries import quote_ident, get_application_columns, to_sql_timestamp
+
+IMPORT_CHUNK_SIZE = 2000
+# Errors kept in the report; the total is always counted
+MAX_REPORTED_ERRORS = 1000
+
+
+class ImportFileError(Exception):
+    """Raised when a file can't be imported at all (unknown format, unusable headers)."""
+
+
+def iter_file_rows(stream, filename):
+    """Yields each row of a CSV or XLSX file (first sheet) as a list of cell values."""
+    extension = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+    if extension == 'csv':
+        text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+        try:
+            yield from csv.reader(text)
+        finally:
+            text.detach()
+    elif extension == 'xlsx':
+        from openpyxl import load_workbook
+        workbook = load_workbook(stream, read_only=True, data_only=True)
+        try:
+            for row in workbook.worksheets[0].iter_rows(values_only=True):
+                yield list(row)
+        finally:
+            workbook.close()
+    else:
+        raise ImportFileError("Only .csv and .xlsx files can be imported.")
+
+
+def _normalize_header(value):
+    return re.sub(r'[^a-z0-9]+', '_', str(value or '').strip().lower()).strip('_')
+
+
+def map_headers(conn, headers, mapping=None):
+    """
+    Maps file headers to applications columns.
+
+    A header matches a form field by name or label (case, spaces and punctuation ignored);
+    'mapping' ({header: field name}) overrides the automatic match. Returns
+    (columns, ignored): columns is a list of (header position, column) and ignored the
+    headers that matched nothing.
+    """
+    app_columns = set(get_application_columns(conn))
+    lookup = {}
+    for row in conn.execute("SELECT name, label FROM form_config ORDER BY field_order").fetchall():
+        if row['name'] in app_columns:
+            lookup.setdefault(_normalize_header(row['label']), row['name'])
+    for name in app_columns:
+        if name != 'id':
+            lookup[_normalize_header(name)] = name
+    mapping = mapping or {}
+
+    columns, ignored, seen = [], [], {}
+    for position, header in enumerate(headers):
+        header = str(header).strip() if header is not None else ''
+        if header in mapping:
+            column = mapping[header] or None
+            if column is not None and column not in app_columns:
+                raise ImportFileError(f"Mapping for '{header}' points to unknown field '{column}'.")
+        else:
+            column = lookup.get(_normalize_header(header))
+        if column is None:
+            if header:
+                ignored.append(header)
+            continue
+        if column in seen:
+            raise ImportFileError(f"Headers '{seen[column]}' and '{header}' both map to '{column}'.")
+        seen[column] = header
+        columns.append((position, column))
+
+    if 'email' not in seen:
+        raise ImportFileError("The file needs an email column to match applications on.")
+    return columns, ignored
+
+
+def _cell(value, column):
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%d %H:%M:%S')
+    if isinstance(value, date):
+        return value.strftime('%Y-%m-%d')
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    value = str(value).strip()
+    if not value:
+        return None
+    if column == 'submission_timestamp':
+        return to_sql_timestamp(value)
+    return value
+
+
+def _merge_values(values, previous):
+    """Overlays a row on an earlier one for the same email: empty cells keep the earlier value."""
+    return [value if value is not None else old for value, old in zip(values, previous)]
+
+
+def _write_chunk(conn, column_names, records):
+    """
+    Upserts one chunk of (row number, values) records, one per lower-cased email, in a
+    single transaction.
+
+    Returns (inserted, updated). Empty cells never overwrite existing values.
+    """
+    email_index = column_names.index('email')
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        # Untyped column: a TEXT affinity would stop SQLite from using the lower(email) index for the IN lookup
+        conn.execute("CREATE TEMP TABLE IF NOT EXISTS import_targets (email PRIMARY KEY)")
+        conn.execute("DELETE FROM temp.import_targets")
+        conn.executemany("INSERT OR IGNORE INTO temp.import_targets (email) VALUES (?)",
+                         [(values[email_index].lower(),) for _, values in records])
+        targets = "lower(a.email) IN (SELECT email FROM temp.import_targets)"
+        # Should the table already hold emails differing only in case, the oldest row is updated
+        existing = {row[0]: row[1] for row in conn.execute(
+            f"SELECT lower(a.email), MIN(a.rowid) FROM applications a WHERE {targets} GROUP BY lower(a.email)"
+        ).fetchall()}
+
+        updates, inserts = [], []
+        for _, values in records:
+            rowid = existing.get(values[email_index].lower())
+            if rowid is None:
+                inserts.append(values)
+            else:
+                updates.append([v for i, v in enumerate(values) if i != email_index] + [rowid])
+
+        rollups.adjust(conn, targets, [], -1)
+        if updates:
+            assignments = ', '.join(
+                f"{quote_ident(col)} = COALESCE(?, {quote_ident(col)})" for col in column_names if col != 'email'
+            )
+            if assignments:
+                conn.executemany(f"UPDATE applications SET {assignments} WHERE rowid = ?", updates)
+        if inserts:
+            conn.executemany(
+                f"INSERT INTO applications ({', '.join(quote_ident(col) for col in column_names)}) "
+                f"VALUES ({', '.join('?' * len(column_names))})",
+                inserts
+            )
+        rollups.adjust(conn, targets, [], 1)
+        conn.execute("DELETE FROM temp.import_targets")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return len(inserts), len(updates)
+
+
+def import_rows(conn, rows, mapping=None, chunk_size=IMPORT_CHUNK_SIZE):
+    """
+    Imports an iterable of rows (the first one being the headers) into applications.
+
+    Returns a report: counts of inserted / updated / failed rows, the ignored headers and a
+    list of per-row errors ({"row": <1-based line in the file>, "email": ..., "error": ...}).
+    """
+    rows = iter(rows)
+    headers = next(rows, None)
+    if not headers:
+        raise ImportFileError("The file is empty.")
+    columns, ignored = map_headers(conn, headers, mapping)
+    column_names = [column for _, column in columns]
+    email_index = column_names.index('email')
+
+    report = {'rows': 0, 'inserted': 0, 'updated': 0, 'failed': 0,
+              'mapped_columns': {str(headers[position]).strip(): column for position, column in columns},
+              'ignored_headers': ignored, 'errors': []}
+
+    def fail(row_number, email, error):
+        report['failed'] += 1
+        if len(report['errors']) < MAX_REPORTED_ERRORS:
+            report['errors'].append({'row': row_number, 'email': email, 'error': error})
+
+    def flush(chunk):
+        if not chunk:
+            return
+        try:
+            inserted, updated = _write_chunk(conn, column_names, list(chunk.values()))
+        except sqlite3.Error:
+            # Retry row by row to find the ones the database rejects
+            inserted = updated = 0
+            for row_number, values in chunk.values():
+                try:
+                    row_inserted, row_updated = _write_chunk(conn, column_names, [(row_number, values)])
+                except sqlite3.Error as e:
+                    fail(row_number, values[email_index], str(e))
+                    continue
+                inserted += row_inserted
+                updated += row_updated
+        report['inserted'] += inserted
+        report['updated'] += updated
+
+    chunk = {}
+    for row_number, row in enumerate(rows, start=2):
+        if not any(cell not in (None, '') for cell in row):
+            continue  # blank line
+        report['rows'] += 1
+        try:
+            values = [_cell(row[position] if position < len(row) else None, column) for position, column in columns]
+        except ValueError as e:
+            fail(row_number, None, f"Invalid value: {e}")
+            continue
+        email = values[email_index]
+        if not email or '@' not in email:
+            fail(row_number, email, "Missing or invalid email.")
+            continue
+        key = email.lower()
+        if key in chunk:
+            # The same email twice in a chunk: merged like an update of the earlier row in a later chunk
+            values = _merge_values(values, chunk[key][1])
+            report['updated'] += 1
+        chunk[key] = (row_number, values)
+        if len(chunk) >= chunk_size:
+            flush(chunk)
+            chunk = {}
+    flush(chunk)
+    return report
@@ -0,0 +1,231 @@
+"""Group-commit write-behind queue for application submissions.
+
+Request threads validate a submission, hand it to IngestQueue.submit() and block until it
+is durable. A single writer thread collects whatever arrived within max_delay_ms (up to
+max_batch submissions) and writes them in one transaction, so a burst of submissions
+shares one lock acquisition and one fsync instead of queueing on the SQLite write lock
+one by one. Each submission runs under its own SAVEPOINT: a duplicate email (or any other
+database error) rolls back only that submission and is raised in the thread that submitted
+it. A submitter waits at most submit_timeout seconds; a submission the writer hasn't started
+by then is withdrawn and IngestTimeout raised.
+"""
+import queue
+import sqlite3
+import threading
+import time
+
+import metrics
+import rollups
+import resume_jobs
+from queries import quote_ident
+
+
+class InvalidSubmission(Exception):
+    """Raised when a submission has no column the form knows about."""
+
+
+class IngestTimeout(Exception):
+    """Raised when a submission wasn't written within the submit timeout."""
+
+
+class _Submission:
+    __slots__ = ('values', 'resume_path', 'done', 'application_id', 'error', 'claimed', 'withdrawn')
+
+    def __init__(self, values, resume_path):
+        self.values = values
+        self.resume_path = resume_path
+        self.done = threading.Event()
+        self.application_id = None
+        self.error = None
+        self.claimed = False  # taken into a batch by the writer
+        self.withdrawn = False  # given up by its submitter before that
+
+
+_STOP = object()
+
+
+class IngestQueue:
+    """
+    Batches application inserts from many request threads into group commits.
+
+    get_conn returns a database connection (closed after each batch). on_commit(conn, ids,
+    groups) is called after every commit that inserted something, with the connection, the
+    new application ids and their rollup group deltas (see rollups.merge_deltas).
+    Commits run with PRAGMA synchronous = 'synchronous' (FULL by default), so a
+    submission is acknowledged only once it is on disk. on_error(component, **fields) is called
+    from the except block of a failed batch or on_commit (see metrics.Metrics.record_background_error).
+    """
+
+    def __init__(self, get_conn, on_commit=None, max_batch=200, max_delay_ms=5, synchronous='FULL', submit_timeout=10.0,
+                 on_error=metrics.print_background_error):
+        self.get_conn = get_conn
+        self.on_commit = on_commit
+        self.on_error = on_error
+        self.max_batch = max_batch
+        self.max_delay_ms = max_delay_ms
+        self.synchronous = synchronous
+        self.submit_timeout = submit_timeout
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self.batches = 0
+        self.submissions = 0
+        self.conflicts = 0
+        self.timeouts = 0
+        self.max_batch_seen = 0
+        self.total_commit_ms = 0.0
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='ingest-writer', daemon=True)
+                self._thread.start()
+
+    def stop(self, timeout=None):
+        """Writes everything already queued, then stops the writer thread."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(_STOP)
+            thread.join(timeout)
+
+    def submit(self, values, resume_path):
+        """
+        Queues one application ({column: value}) and waits until it is committed. Returns its id.
+
+        Raises sqlite3.IntegrityError for a duplicate email, InvalidSubmission when no value
+        maps to a form field, IngestTimeout when it wasn't written within submit_timeout, or
+        whatever else made the write fail. After an IngestTimeout the submission was either
+        withdrawn before the writer got to it or is in a transaction that outlived a second
+        timeout, so it may still be committed.
+        """
+        self.start()
+        submission = _Submission(values, resume_path)
+        self._queue.put(submission)
+        if not submission.done.wait(self.submit_timeout):
+            with self._lock:
+                submission.withdrawn = not submission.claimed
+            # A claimed submission is in a transaction bounded by the busy timeout: give it one more period
+            if submission.withdrawn or not submission.done.wait(self.submit_timeout):
+                with self._lock:
+                    self.timeouts += 1
+                raise IngestTimeout("The application could not be saved in time.")
+        if submission.error is not None:
+            raise submission.error
+        return submission.application_id
+
+    def _collect(self):
+        """Blocks for the first submission, then gathers more until the batch is full or the delay is over."""
+        first = self._queue.get()
+        if first is _STOP:
+            return [], True
+        batch = [first]
+        deadline = time.perf_counter() + self.max_delay_ms / 1000
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _run(self):
+        while True:
+            batch, stopping = self._collect()
+            if batch:
+                try:
+                    self._write_batch(batch)
+                except Exception as e:
+                    self.on_error('ingest_writer', batch_size=len(batch))
+                    for submission in batch:
+                        if not submission.done.is_set():
+                            submission.error = e
+                            submission.done.set()
+            if stopping:
+                return
+
+    def _write_batch(self, batch):
+        with self._lock:
+            batch = [submission for submission in batch if not submission.withdrawn]
+            for submission in batch:
+                submission.claimed = True
+        if not batch:
+            return
+        start = time.perf_counter()
+        conn = self.get_conn()
+        inserted, groups = [], []
+        try:
+            previous_sync = conn.execute("PRAGMA synchronous").fetchone()[0]
+            conn.execute(f"PRAGMA synchronous = {self.synchronous}")
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    # Read under the write lock, so a concurrent field delete can't remove a column in between
+                    valid_columns = {row[0] for row in conn.execute("SELECT name FROM form_config").fetchall()}
+                    valid_columns.add('resume_path')
+                    for submission in batch:
+                        try:
+                            conn.execute("SAVEPOINT submission")
+                            submission.application_id = self._insert(conn, submission, valid_columns)
+                            conn.execute("RELEASE submission")
+                            inserted.append(submission)
+                        except (sqlite3.Error, InvalidSubmission) as e:
+                            conn.execute("ROLLBACK TO submission")
+                            conn.execute("RELEASE submission")
+                            submission.error = e
+                            if isinstance(e, sqlite3.IntegrityError):
+                                self.conflicts += 1
+                    if inserted:
+                        # One rollup pass for the whole batch
+                        ids = [submission.application_id for submission in inserted]
+                        groups = rollups.adjust(conn, f"a.rowid IN ({', '.join('?' * len(ids))})", ids, 1)
+                    conn.commit()
+                except Exception:
+                    conn.rollback()
+                    raise
+            finally:
+                conn.execute(f"PRAGMA synchronous = {previous_sync}")
+
+            commit_ms = (time.perf_counter() - start) * 1000
+            with self._lock:
+                self.batches += 1
+                self.submissions += len(batch)
+                self.max_batch_seen = max(self.max_batch_seen, len(batch))
+                self.total_commit_ms += commit_ms
+            if inserted and self.on_commit is not None:
+                try:
+                    self.on_commit(conn, [submission.application_id for submission in inserted], rollups.merge_deltas(groups))
+                except Exception:
+                    self.on_error('ingest_on_commit', applications=len(inserted))
+        finally:
+            conn.close()
+
+        for submission in batch:
+            submission.done.set()
+
+    def _insert(self, conn, submission, valid_columns):
+        values = dict(submission.values, resume_path=submission.resume_path)
+        columns = [col for col in values if col in valid_columns]
+        if not columns:
+            raise InvalidSubmission("No valid data received.")
+        cursor = conn.execute(
+            f"INSERT INTO applications ({', '.join(quote_ident(col) for col in columns)}) "
+            f"VALUES ({', '.join('?' * len(columns))})",
+            [values[col] for col in columns]
+        )
+        resume_jobs.enqueue(conn, cursor.lastrowid, submission.resume_path)
+        return cursor.lastrowid
+
+    def stats(self):
+        with self._lock:
+            return {
+                'running': self._thread is not None and self._thread.is_alive(), 'pending': self._queue.qsize(),
+                'batches': self.batches, 'submissions': self.submissions, 'conflicts': self.conflicts, 'timeouts': self.timeouts,
+                'avg_batch_size': round(self.submissions / self.batches, 2) if self.batches else 0.0,
+                'max_batch_size': self.max_batch_seen,
+                'avg_commit_ms': round(self.total_commit_ms / self.batches, 3) if self.batches else 0.0,
+                'max_batch': self.max_batch, 'max_delay_ms': self.max_delay_ms, 'synchronous': self.synchronous
+            }
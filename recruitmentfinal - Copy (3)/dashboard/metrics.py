@@ -0,0 +1,241 @@
+"""Request, SQL and stage timing, exposed in the Prometheus text format and as JSON logs.
+
+Metrics holds the instruments: per-route latency and response size histograms, per-query
+timings (fed by the pooled connections, see db.ConnectionPool's on_query) and named spans
+for the stages of a request. Each request runs under a trace (start_trace / finish_trace)
+that sums its spans and SQL time; finishing it observes the histograms and, with a logger,
+writes one JSON line per request. Queries slower than slow_query_ms are logged on their own.
+
+    with metrics.span('status_counts'):
+        ...
+
+span() is a no-op outside a traced request, so instrumented code also runs from the CLI and
+background threads.
+"""
+import bisect
+import contextvars
+import json
+import logging
+import re
+import threading
+import time
+import traceback
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from functools import lru_cache
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216, 67108864)
+
+_current = contextvars.ContextVar('metrics_trace', default=None)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in list(zip(names, values)) + list(extra)]
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, help_text, label_names=()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(label_names)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(name, '') for name in self.label_names)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket histogram per label set, as Prometheus expects."""
+
+    def __init__(self, name, help_text, label_names=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        self._series = {}  # labels -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(name, '') for name in self.label_names)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float('inf'),), series):
+                    cumulative += count
+                    lines.append(f"{self.name}_bucket{_format_labels(self.label_names, key, [('le', _format_value(bound))])} {cumulative}")
+                lines.append(f"{self.name}_sum{_format_labels(self.label_names, key)} {_format_value(series[-1])}")
+                lines.append(f"{self.name}_count{_format_labels(self.label_names, key)} {cumulative}")
+        return lines
+
+
+class GaugeSet:
+    """Gauges read when the metrics are rendered: collect() returns {name: (help, value)}."""
+
+    def __init__(self, collect):
+        self.collect = collect
+
+    def render(self):
+        lines = []
+        for name, (help_text, value) in sorted(self.collect().items()):
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} gauge", f"{name} {_format_value(value)}"]
+        return lines
+
+
+@lru_cache(maxsize=2048)
+def describe_statement(sql):
+    """(operation, table) labels of a statement, e.g. ('SELECT', 'applications')."""
+    operation = re.match(r'\s*(\w+)', sql)
+    table = re.search(r'\b(?:FROM|INTO|UPDATE|TABLE|ON)\s+(?:IF\s+(?:NOT\s+)?EXISTS\s+)?["\[`]?(?!ON\b)(\w+)', sql, re.IGNORECASE)
+    return (operation.group(1).upper() if operation else '', table.group(1) if table else '')
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats records whose message is a dict as one JSON object per line."""
+
+    def format(self, record):
+        entry = {'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+                 'level': record.levelname.lower()}
+        entry.update(record.msg if isinstance(record.msg, dict) else {'message': record.getMessage()})
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, separators=(',', ':'))
+
+
+def print_background_error(component, **fields):
+    """Default on_error of the background workers (ingest, search, resume_jobs): prints the traceback."""
+    print(f"--- {component.upper().replace('_', ' ')} ERROR ---\n{traceback.format_exc()}")
+
+
+class Trace:
+    __slots__ = ('metrics', 'start', 'spans', 'queries', 'sql_seconds')
+
+    def __init__(self, metrics):
+        self.metrics = metrics
+        self.start = time.perf_counter()
+        self.spans = {}
+        self.queries = 0
+        self.sql_seconds = 0.0
+
+
+@contextmanager
+def span(name):
+    """Times a named stage of the current request."""
+    trace = _current.get()
+    if trace is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        trace.spans[name] = trace.spans.get(name, 0.0) + seconds
+        trace.metrics.spans.observe(seconds, span=name)
+
+
+class Metrics:
+    def __init__(self, logger=None, slow_query_ms=200):
+        self.logger = logger
+        self.slow_query_ms = slow_query_ms
+        self.requests = Histogram('dashboard_http_request_duration_seconds', 'Request latency by route.',
+                                  ['endpoint', 'method', 'status'])
+        self.response_bytes = Histogram('dashboard_http_response_size_bytes', 'Response body size as sent, by route.',
+                                        ['endpoint'], buckets=SIZE_BUCKETS)
+        self.queries = Histogram('dashboard_sql_query_duration_seconds',
+                                 'SQL statement execution time (to the first row) by operation and table.',
+                                 ['operation', 'table'])
+        self.spans = Histogram('dashboard_span_duration_seconds', 'Time spent in named request stages.', ['span'])
+        self.errors = Counter('dashboard_http_server_errors_total', 'Responses with a 5xx status, by route.', ['endpoint'])
+        self.slow_queries = Counter('dashboard_sql_slow_queries_total', 'Statements slower than the slow query threshold.',
+                                    ['operation', 'table'])
+        self.background_errors = Counter('dashboard_background_errors_total',
+                                         'Errors caught by background threads, by component.', ['component'])
+        self.instruments = [self.requests, self.response_bytes, self.queries, self.spans, self.errors, self.slow_queries,
+                            self.background_errors]
+
+    def add_gauges(self, collect):
+        self.instruments.append(GaugeSet(collect))
+
+    def start_trace(self):
+        """Starts tracing the current request. Returns a token for finish_trace."""
+        return _current.set(Trace(self))
+
+    def finish_trace(self, token, endpoint, method, path, status, size):
+        trace = _current.get()
+        _current.reset(token)
+        if trace is None:
+            return
+        seconds = time.perf_counter() - trace.start
+        self.requests.observe(seconds, endpoint=endpoint, method=method, status=str(status))
+        if size is not None:
+            self.response_bytes.observe(size, endpoint=endpoint)
+        if status >= 500:
+            self.errors.inc(endpoint=endpoint)
+        if self.logger is not None:
+            self.logger.log(logging.ERROR if status >= 500 else logging.INFO, {
+                'event': 'request', 'method': method, 'path': path, 'endpoint': endpoint, 'status': status,
+                'duration_ms': round(seconds * 1000, 3), 'bytes': size, 'sql_queries': trace.queries,
+                'sql_ms': round(trace.sql_seconds * 1000, 3),
+                'spans': {name: round(value * 1000, 3) for name, value in trace.spans.items()},
+            })
+
+    def record_query(self, sql, seconds):
+        """on_query callback of the connection pool."""
+        operation, table = describe_statement(sql)
+        self.queries.observe(seconds, operation=operation, table=table)
+        trace = _current.get()
+        if trace is not None:
+            trace.queries += 1
+            trace.sql_seconds += seconds
+        if seconds * 1000 >= self.slow_query_ms:
+            self.slow_queries.inc(operation=operation, table=table)
+            if self.logger is not None:
+                self.logger.warning({'event': 'slow_query', 'duration_ms': round(seconds * 1000, 3),
+                                     'operation': operation, 'table': table, 'sql': ' '.join(sql.split())[:500]})
+
+    def record_background_error(self, component, **fields):
+        """on_error callback of the background workers. Call it from the except block that caught the error."""
+        self.background_errors.inc(component=component)
+        if self.logger is not None:
+            self.logger.exception({'event': 'background_error', 'component': component, **fields})
+        else:
+            print_background_error(component, **fields)
+
+    def render(self):
+        """All instruments in the Prometheus text exposition format."""
+        lines = []
+        for instrument in self.instruments:
+            lines += instrument.render()
+        return '\n'.join(lines) + '\n'
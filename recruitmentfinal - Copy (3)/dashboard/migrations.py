@@ -0,0 +1,234 @@
+"""Ordered schema migrations, recorded in the schema_version table.
+
+Each migration is (version, name, function(conn)) and runs in its own transaction together
+with the schema_version row that records it, so a failed migration leaves nothing half
+applied and the next start picks up from there. migrate() applies the ones newer than the
+recorded version; once the database is current, starting up costs a single query.
+
+Migrations are written to be idempotent: a database created before schema_version existed
+starts at version 0 and runs all of them, which only fills in what it is missing. New
+schema changes are appended to MIGRATIONS with the next version number; released ones are
+never edited or renumbered.
+
+Several processes may start at once (one per worker): each migration takes the write lock
+with BEGIN IMMEDIATE and re-reads the version, so every migration runs exactly once.
+"""
+import sqlite3
+
+import coherence
+import resume_jobs
+import rollups
+import row_versions
+import schema
+import search
+import status_history
+
+CREATE_SQL = '''
+    CREATE TABLE IF NOT EXISTS schema_version (
+        version INTEGER PRIMARY KEY,
+        name TEXT NOT NULL,
+        applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+'''
+
+# Fields of a new database's recruitment form (from recruitment-form.html)
+DEFAULT_FIELDS = [
+    # Personal Details
+    {'name': 'name', 'label': 'Full Name', 'type': 'text', 'subsection': 'Personal Details', 'required': 1, 'is_core': 1},
+    {'name': 'email', 'label': 'Email Address', 'type': 'email', 'subsection': 'Personal Details', 'required': 1, 'is_core': 1},
+    {'name': 'dob', 'label': 'Date of Birth', 'type': 'date', 'subsection': 'Personal Details', 'required': 1},
+    {'name': 'place_of_birth', 'label': 'Place of Birth', 'type': 'text', 'subsection': 'Personal Details', 'required': 0},
+    {'name': 'gender', 'label': 'Gender', 'type': 'select', 'options': 'Male, Female, Other', 'subsection': 'Personal Details', 'required': 0},
+    {'name': 'nationality', 'label': 'Nationality', 'type': 'text', 'subsection': 'Personal Details', 'required': 0},
+    {'name': 'father_name', 'label': "Father's Name", 'type': 'text', 'subsection': 'Personal Details', 'required': 0},
+    {'name': 'blood_group', 'label': 'Blood Group', 'type': 'select', 'options': 'A+, A-, B+, B-, AB+, AB-, O+, O-', 'subsection': 'Personal Details', 'required': 0},
+    {'name': 'pan_card', 'label': 'PAN Card Number', 'type': 'text', 'subsection': 'Personal Details', 'required': 0},
+    {'name': 'marital_status', 'label': 'Marital Status', 'type': 'select', 'options': 'Single, Married, Divorced, Widowed', 'subsection': 'Personal Details', 'required': 0},
+
+    # Spouse's Details
+    {'name': 'spouse_name', 'label': "Spouse's Name", 'type': 'text', 'subsection': "Spouse's Details", 'required': 0},
+    {'name': 'spouse_employment', 'label': "Spouse's Employment Status", 'type': 'text', 'subsection': "Spouse's Details", 'required': 0},
+    {'name': 'spouse_work_details', 'label': 'Spouse Work Details', 'type': 'textarea', 'subsection': "Spouse's Details", 'required': 0},
+    {'name': 'children_count', 'label': 'Number of Children', 'type': 'number', 'subsection': "Spouse's Details", 'required': 0},
+
+    # Contact & Position
+    {'name': 'mobile_number', 'label': 'Mobile Number', 'type': 'tel', 'subsection': 'Contact & Position', 'required': 1},
+    {'name': 'business_entity', 'label': 'Business Entity', 'type': 'select', 'options': 'SIL, ZIL, ZMSL, ZIIL', 'subsection': 'Contact & Position', 'required': 0},
+    {'name': 'post_applying_for', 'label': 'Post Applying For', 'type': 'select', 'options': 'Intern, Civil Engineer, Graduate Engineer Trainee, Software Developer Trainee, Data Analyst Trainee, Business Development Executive, Human Resources Trainee, Marketing Trainee', 'subsection': 'Contact & Position', 'required': 0},
+    {'name': 'location_of_position', 'label': 'Location of Position', 'type': 'select', 'options': 'Gurugram, Pune, Bangalore', 'subsection': 'Contact & Position', 'required': 0},
+    {'name': 'present_address', 'label': 'Present Address', 'type': 'textarea', 'subsection': 'Contact & Position', 'required': 1},
+    {'name': 'permanent_address', 'label': 'Permanent Address', 'type': 'textarea', 'subsection': 'Contact & Position', 'required': 0},
+    {'name': 'hobbies', 'label': 'Hobbies / Leisure Activities', 'type': 'text', 'subsection': 'Contact & Position', 'required': 0},
+
+    # Academic Qualifications
+    {'name': 'qualification_10th_school', 'label': '10th School/College', 'type': 'text', 'subsection': 'Academic Qualifications', 'required': 0},
+    {'name': 'qualification_10th_board', 'label': '10th Board', 'type': 'text', 'subsection': 'Academic Qualifications', 'required': 0},
+    {'name': 'qualification_10th_subjects', 'label': '10th Main Subjects', 'type': 'text', 'subsection': 'Academic Qualifications', 'required': 0},
+    {'name': 'qualification_10th_year', 'label': '10th Year of Passing', 'type': 'text', 'subsection': 'Academic Qualifications', 'required': 0},
+    {'name': 'qualification_10th_marks', 'label': '10th % Marks / CGPA', 'type': 'text', 'subsection': 'Academic Qualifications', 'required': 0},
+    {'name': 'qualification_10th_division', 'label': '10th Division/Class', 'type': 'text', 'subsection': 'Academic Qualifications', 'required': 0},
+
+    {'name': 'qualification_12th_school', 'label': '12th School/College', 'type': 'text', 'subsection': 'Academic Qualifications', 'required': 0},
+    {'name': 'qualification_12th_board', 'label': '12th Board/University', 'type': 'text', 'subsection': 'Academic Qualifications', 'required': 0},
+    {'name': 'qualification_12th_specialization', 'label': '12th Course Specialization', 'type': 'text', 'subsection': 'Academic Qualifications', 'required': 0},
+    {'name': 'qualification_12th_year', 'label': '12th Year of Passing', 'type': 'text', 'subsection': 'Academic Qualifications', 'required': 0},
+    {'name': 'qualification_12th_marks', 'label': '12th % Marks / CGPA', 'type': 'text', 'subsection': 'Academic Qualifications', 'required': 0},
+    {'name': 'qualification_12th_division', 'label': '12th Division/Class', 'type': 'text', 'subsection': 'Academic Qualifications', 'required': 0},
+
+    {'name': 'qualification_grad_school', 'label': 'Graduation Institute/College', 'type': 'text', 'subsection': 'Academic Qualifications', 'required': 0},
+    {'name': 'qualification_grad_course', 'label': 'Graduation Course', 'type': 'text', 'subsection': 'Academic Qualifications', 'required': 0},
+    {'name': 'qualification_grad_specialization', 'label': 'Graduation Course Specialization', 'type': 'text', 'subsection': 'Academic Qualifications', 'required': 0},
+    {'name': 'qualification_grad_year', 'label': 'Graduation Year of Passing', 'type': 'text', 'subsection': 'Academic Qualifications', 'required': 0},
+    {'name': 'qualification_grad_marks', 'label': 'Graduation % Marks / CGPA', 'type': 'text', 'subsection': 'Academic Qualifications', 'required': 0},
+    {'name': 'qualification_grad_division', 'label': 'Graduation Division/Class', 'type': 'text', 'subsection': 'Academic Qualifications', 'required': 0},
+
+    {'name': 'qualification_pg_school', 'label': 'Post-Graduation Institute/College', 'type': 'text', 'subsection': 'Academic Qualifications', 'required': 0},
+    {'name': 'qualification_pg_course', 'label': 'Post-Graduation Course', 'type': 'text', 'subsection': 'Academic Qualifications', 'required': 0},
+    {'name': 'qualification_pg_specialization', 'label': 'Post-Graduation Course Specialization', 'type': 'text', 'subsection': 'Academic Qualifications', 'required': 0},
+    {'name': 'qualification_pg_year', 'label': 'Post-Graduation Year of Passing', 'type': 'text', 'subsection': 'Academic Qualifications', 'required': 0},
+    {'name': 'qualification_pg_marks', 'label': 'Post-Graduation % Marks / CGPA', 'type': 'text', 'subsection': 'Academic Qualifications', 'required': 0},
+    {'name': 'qualification_pg_division', 'label': 'Post-Graduation Division/Class', 'type': 'text', 'subsection': 'Academic Qualifications', 'required': 0},
+
+    # Additional Information
+    {'name': 'previously_applied', 'label': 'Have you applied with us earlier?', 'type': 'radio', 'options': 'Yes, No', 'subsection': 'Additional Information', 'required': 0},
+    {'name': 'related_employee', 'label': 'Are you related to any employee?', 'type': 'radio', 'options': 'Yes, No', 'subsection': 'Additional Information', 'required': 0},
+    {'name': 'related_employee_details', 'label': 'If yes, provide details', 'type': 'textarea', 'subsection': 'Additional Information', 'required': 0},
+    {'name': 'legal_cases', 'label': 'Are there any criminal/civil cases against you?', 'type': 'radio', 'options': 'Yes, No', 'subsection': 'Additional Information', 'required': 0},
+    {'name': 'legal_cases_details', 'label': 'If yes, provide details', 'type': 'textarea', 'subsection': 'Additional Information', 'required': 0},
+]
+
+
+def _core_tables(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            email TEXT UNIQUE NOT NULL,
+            password_hash TEXT NOT NULL,
+            role TEXT NOT NULL CHECK(role IN ('admin', 'viewer'))
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS statuses (
+            email TEXT PRIMARY KEY,
+            name TEXT,
+            status TEXT NOT NULL
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS form_config (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT UNIQUE NOT NULL,
+            label TEXT NOT NULL,
+            type TEXT NOT NULL,
+            subsection TEXT,
+            options TEXT,
+            required BOOLEAN NOT NULL DEFAULT 0,
+            is_core BOOLEAN NOT NULL DEFAULT 0,
+            field_order INTEGER DEFAULT 0,
+            validations TEXT DEFAULT '{}',
+            indexed BOOLEAN NOT NULL DEFAULT 0
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS form_sections (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT UNIQUE NOT NULL,
+            section_order INTEGER DEFAULT 0,
+            description TEXT,
+            icon TEXT DEFAULT 'folder',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    # Initially simple, the form fields are added as columns
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS applications (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT,
+            email TEXT UNIQUE,
+            submission_timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+            resume_path TEXT
+        )
+    ''')
+
+
+def _add_missing_columns(conn, table, definitions):
+    existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})").fetchall()}
+    for name, definition in definitions:
+        if name not in existing:
+            print(f"Migrating {table}: Adding '{name}' column...")
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} {definition}")
+
+
+def _form_config_columns(conn):
+    """Columns added to form_config and applications after their first release."""
+    _add_missing_columns(conn, 'form_config', [('subsection', 'TEXT'), ('field_order', 'INTEGER DEFAULT 0'),
+                                               ('validations', "TEXT DEFAULT '{}'")])
+    _add_missing_columns(conn, 'applications', [('resume_path', 'TEXT')])
+
+
+def _default_form_config(conn):
+    """Fills an empty form_config with DEFAULT_FIELDS, unless the form sections were already customized."""
+    if conn.execute("SELECT COUNT(*) FROM form_config").fetchone()[0]:
+        return
+    if conn.execute("SELECT COUNT(*) FROM form_sections WHERE name = 'Personal Details'").fetchone()[0]:
+        print("Custom sections detected - skipping form config initialization")
+        return
+    print("Form config is empty. Populating with the default fields...")
+    existing_columns = {row[1] for row in conn.execute("PRAGMA table_info(applications)").fetchall()}
+    for i, field in enumerate(DEFAULT_FIELDS):
+        field = dict({'is_core': 0, 'options': None, 'required': 0}, **field)
+        if field['name'] not in existing_columns:
+            conn.execute(f"ALTER TABLE applications ADD COLUMN {field['name']} TEXT")
+        indexed = 1 if field['name'] in schema.DEFAULT_INDEXED_FIELDS else 0
+        conn.execute(
+            "INSERT INTO form_config (name, label, type, subsection, options, required, is_core, field_order, indexed) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (field['name'], field['label'], field['type'], field['subsection'], field['options'], field['required'], field['is_core'], i, indexed)
+        )
+
+
+MIGRATIONS = [
+    (1, 'core tables', _core_tables),
+    (2, 'form_config and applications columns', _form_config_columns),
+    (3, 'default form config', _default_form_config),
+    (4, 'applications constraints', schema.repair_applications_table),
+    (5, 'field indexes', schema.init_indexes),
+    (6, 'application rollups', rollups.init_rollups),
+    (7, 'status history', status_history.init_status_history),
+    (8, 'resume jobs', resume_jobs.init_resume_jobs),
+    (9, 'search index', search.sync_search_index),
+    (10, 'row versions', row_versions.init_row_versions),
+    (11, 'shared cache versions', coherence.init_cache_state),
+]
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def get_version(conn):
+    """Schema version of the database; 0 for one that predates schema_version."""
+    try:
+        return conn.execute("SELECT MAX(version) FROM schema_version").fetchone()[0] or 0
+    except sqlite3.OperationalError:
+        return 0
+
+
+def migrate(conn):
+    """Applies the pending migrations in order. Returns the versions applied (none when current)."""
+    if get_version(conn) >= LATEST_VERSION:
+        return []
+    conn.execute(CREATE_SQL)
+    conn.commit()
+    applied = []
+    for version, name, apply in MIGRATIONS:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if get_version(conn) >= version:  # already there, or another process just applied it
+                conn.rollback()
+                continue
+            print(f"Applying migration {version}: {name}...")
+            apply(conn)
+            conn.execute("INSERT INTO schema_version (version, name) VALUES (?, ?)", (version, name))
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        applied.append(version)
+    return applied
@@ -0,0 +1,66 @@
+"""Compact encodings for the candidate table payloads.
+
+In the default row format every row is a JSON object, so each column name is repeated once
+per row and categorical values (status, company, location, gender ...) once per occurrence.
+With format=columnar the table endpoints send the rows as
+
+    {"columns": [name, ...], "length": n, "data": [[column 0 values], [column 1 values], ...],
+     "dictionaries": {"<column index>": [distinct values]}}
+
+A column listed in 'dictionaries' holds indexes into its dictionary instead of the values.
+Columns are dictionary-encoded when they have few distinct values relative to the row count,
+which is decided per response. decodeColumnar() in static/js/main.js turns it back into rows.
+
+Responses are compressed when the client accepts it: brotli if the optional 'brotli' package
+is installed, else gzip.
+"""
+import gzip
+
+try:
+    import brotli
+except ImportError:  # optional: responses fall back to gzip
+    brotli = None
+
+TABLE_FORMATS = ('rows', 'columnar')
+
+# A column is dictionary-encoded when it has at most this share of distinct values
+DICTIONARY_MAX_RATIO = 0.5
+
+# Smaller bodies are sent as they are; compressing them saves less than the header costs
+COMPRESS_MIN_BYTES = 1024
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+
+def encode_columnar(columns, rows):
+    """
+    Encodes rows in the columnar format described above.
+
+    'rows' are value sequences in 'columns' order, e.g. sqlite3.Row objects straight from a
+    cursor: transposing them is much cheaper than building a dict per row first.
+    """
+    rows = list(rows)
+    max_distinct = int(len(rows) * DICTIONARY_MAX_RATIO)
+    data, dictionaries = [], {}
+    for index, values in enumerate(zip(*rows) if rows else [[] for _ in columns]):
+        if max_distinct and len(set(values)) <= max_distinct:
+            codes = {}
+            data.append([codes.setdefault(value, len(codes)) for value in values])
+            dictionaries[str(index)] = list(codes)
+        else:
+            data.append(list(values))
+    return {'columns': list(columns), 'length': len(rows), 'data': data, 'dictionaries': dictionaries}
+
+
+def negotiate_encoding(accept_encodings):
+    """Best Content-Encoding for a request's Accept-Encoding header (request.accept_encodings), or None."""
+    available = ['br', 'gzip'] if brotli is not None else ['gzip']
+    return accept_encodings.best_match(available)
+
+
+def compress(body, encoding):
+    if encoding == 'br':
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    if encoding == 'gzip':
+        return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+    return body
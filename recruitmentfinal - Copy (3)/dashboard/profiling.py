@@ -0,0 +1,173 @@
+"""On-demand profiling of single requests, kept in a bounded on-disk ring buffer.
+
+An admin adds "X-Profile: cprofile" (or "sample") to a request, or "_profile=..." to its
+query string, and that one request runs under a profiler:
+
+- cprofile: deterministic cProfile; saved as a .prof file for pstats / snakeviz, and the
+  top functions by cumulative time are kept with the profile's metadata.
+- sample:   a thread samples the request thread's stack every interval_ms; saved in the
+  collapsed-stack format ("frame;frame;frame count") read by flamegraph.pl and speedscope.
+  Lower overhead, so timings stay close to the unprofiled request.
+
+ProfileStore keeps the newest max_profiles profiles in its directory, each as the profile
+file plus a .json metadata file, and deletes older ones as new ones are saved.
+"""
+import cProfile
+import io
+import json
+import os
+import pstats
+import re
+import secrets
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+
+MODES = ('cprofile', 'sample')
+EXTENSIONS = {'cprofile': '.prof', 'sample': '.collapsed'}
+TOP_FUNCTIONS = 15
+
+_PROFILE_ID = re.compile(r'^\d{8}-\d{6}-[0-9a-f]{8}$')
+
+
+def parse_mode(value):
+    """Profiling mode asked for by a header or query value ('1' means cprofile), or None."""
+    value = (value or '').strip().lower()
+    if value in ('1', 'true', 'yes'):
+        return 'cprofile'
+    return value if value in MODES else None
+
+
+class StackSampler:
+    """Samples one thread's Python stack at a fixed interval and counts identical stacks."""
+
+    def __init__(self, thread_id, interval_ms=5):
+        self.thread_id = thread_id
+        self.interval = interval_ms / 1000
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='profile-sampler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})".replace(';', ','))
+                frame = frame.f_back
+            self.stacks[';'.join(reversed(stack))] += 1
+            self.samples += 1
+
+    def write(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class RequestProfile:
+    """A profiler running for one request: start(), then finish() once the response is ready."""
+
+    def __init__(self, mode, interval_ms=5):
+        self.mode = mode
+        self.started = time.perf_counter()
+        if mode == 'cprofile':
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+        else:
+            self.profiler = StackSampler(threading.get_ident(), interval_ms)
+            self.profiler.start()
+
+    def finish(self):
+        """Stops profiling. Returns the profiled duration in ms."""
+        if self.mode == 'cprofile':
+            self.profiler.disable()
+        else:
+            self.profiler.stop()
+        return (time.perf_counter() - self.started) * 1000
+
+    def top_functions(self):
+        if self.mode != 'cprofile':
+            return [{'stack': stack, 'samples': count} for stack, count in self.profiler.stacks.most_common(5)]
+        stats = pstats.Stats(self.profiler, stream=io.StringIO())
+        rows = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:TOP_FUNCTIONS]
+        return [{'function': f"{name} ({os.path.basename(filename)}:{line})", 'calls': calls,
+                 'total_ms': round(total * 1000, 3), 'cumulative_ms': round(cumulative * 1000, 3)}
+                for (filename, line, name), (_, calls, total, cumulative, _) in rows]
+
+    def write(self, path):
+        if self.mode == 'cprofile':
+            self.profiler.dump_stats(path)
+        else:
+            self.profiler.write(path)
+
+
+class ProfileStore:
+    """The newest max_profiles request profiles, as files in 'directory'."""
+
+    def __init__(self, directory, max_profiles=20):
+        self.directory = directory
+        self.max_profiles = max_profiles
+        self._lock = threading.Lock()
+
+    def save(self, profile, meta):
+        """Writes a finished RequestProfile with its metadata, drops the oldest beyond max_profiles. Returns the id."""
+        profile_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{secrets.token_hex(4)}"
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            filename = profile_id + EXTENSIONS[profile.mode]
+            profile.write(os.path.join(self.directory, filename))
+            meta = dict(meta, id=profile_id, mode=profile.mode, file=filename,
+                        created_at=datetime.now(timezone.utc).isoformat(timespec='seconds'),
+                        size=os.path.getsize(os.path.join(self.directory, filename)), top=profile.top_functions())
+            with open(os.path.join(self.directory, profile_id + '.json'), 'w', encoding='utf-8') as f:
+                json.dump(meta, f)
+            for old in self._ids()[:-self.max_profiles]:
+                self._delete(old)
+        return profile_id
+
+    def _ids(self):
+        """Stored profile ids, oldest first (ids start with their timestamp)."""
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(name[:-5] for name in os.listdir(self.directory)
+                      if name.endswith('.json') and _PROFILE_ID.match(name[:-5]))
+
+    def _delete(self, profile_id):
+        for extension in ('.json',) + tuple(EXTENSIONS.values()):
+            try:
+                os.remove(os.path.join(self.directory, profile_id + extension))
+            except FileNotFoundError:
+                pass
+
+    def list(self):
+        """Metadata of the stored profiles, newest first."""
+        profiles = []
+        for profile_id in reversed(self._ids()):
+            try:
+                with open(os.path.join(self.directory, profile_id + '.json'), encoding='utf-8') as f:
+                    profiles.append(json.load(f))
+            except (OSError, ValueError):
+                continue  # removed or half-written by a concurrent save
+        return profiles
+
+    def get_file(self, profile_id):
+        """File name of a stored profile, or None (also for anything that isn't a profile id)."""
+        if not _PROFILE_ID.match(profile_id or ''):
+            return None
+        for extension in EXTENSIONS.values():
+            if os.path.exists(os.path.join(self.directory, profile_id + extension)):
+                return profile_id + extension
+        return None
@@ -0,0 +1,408 @@
+"""SQL query builders for the dashboard APIs.
+
+The dashboard filters (location, post, qualification, ...) are translated into a
+parameterized WHERE clause so KPIs, charts and filter lists are computed with
+COUNT / GROUP BY inside SQLite instead of loading every application into pandas.
+"""
+import base64
+import json
+from datetime import datetime
+
+import metrics
+import payload
+import rollups
+import status_history
+
+# Logical dashboard columns -> columns of the applications table
+COLUMNS = {
+    'STATUS': 'Status', 'GENDER': 'gender', 'DATE': 'submission_timestamp', 'NAME': 'name',
+    'COMPANY': 'business_entity', 'COLLEGE': 'qualification_grad_school',
+    'LOCATION': 'location_of_position', 'POST': 'post_applying_for',
+    'QUALIFICATION': 'qualification_grad_course', 'COURSE': 'qualification_grad_course'
+}
+
+# Query-string filter keys and the column each one matches on
+FILTER_COLUMNS = [
+    ('location', COLUMNS['LOCATION']), ('post', COLUMNS['POST']), ('qualification', COLUMNS['QUALIFICATION']),
+    ('business_entity', COLUMNS['COMPANY']), ('course', COLUMNS['COURSE']), ('college', COLUMNS['COLLEGE'])
+]
+
+# Keys of the 'filters' object returned to the dashboard and the column each list is built from
+FILTER_LISTS = [
+    ('locations', COLUMNS['LOCATION']), ('posts', COLUMNS['POST']), ('qualifications', COLUMNS['QUALIFICATION']),
+    ('business_entities', COLUMNS['COMPANY']), ('courses', COLUMNS['COURSE']), ('colleges', COLUMNS['COLLEGE'])
+]
+
+STATUSES = ['Applied', 'Shortlisted', 'Interviewed', 'Offered', 'Hired', 'Rejected']
+
+STATUS_KPIS = [('shortlisted', 'Shortlisted'), ('interviewed', 'Interviewed'), ('offered', 'Offered'),
+               ('hired', 'Hired'), ('rejected', 'Rejected')]
+
+DEFAULT_TABLE_COLUMNS = ['name', 'email', 'post_applying_for', 'qualification_grad_school', 'Status', 'resume_path']
+
+STATUS_EXPR = "COALESCE(s.status, 'Applied')"
+STATUS_JOIN = "LEFT JOIN statuses s ON s.email = lower(a.email)"
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+# Rows fetched from the export cursor per round trip
+EXPORT_CHUNK_SIZE = 1000
+
+EMPTY_DASHBOARD = {"kpis": {}, "charts": {}, "table_data": [], "all_columns": [], "default_columns": [], "filters": {}}
+
+
+def quote_ident(name):
+    """Quotes a column name taken from form_config / PRAGMA table_info for use in SQL."""
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def get_application_columns(conn):
+    """Returns the column names of the (dynamic) applications table in table order."""
+    return [row[1] for row in conn.execute("PRAGMA table_info(applications)").fetchall()]
+
+
+def to_sql_timestamp(value):
+    """Normalizes a date/datetime filter value to the 'YYYY-MM-DD HH:MM:SS' format SQLite stores."""
+    return datetime.fromisoformat(value.strip()).strftime('%Y-%m-%d %H:%M:%S')
+
+
+def build_filter_clause(filters, columns):
+    """
+    Builds the WHERE clause for the dashboard filters.
+
+    Mirrors the old pandas semantics: 'all' or empty values are ignored, filters on
+    columns that no longer exist are skipped and the date range is inclusive.
+    Returns (sql, params) where sql is either '' or ' WHERE ...'.
+    """
+    conditions, params = [], []
+    if COLUMNS['DATE'] in columns:
+        date_col = f"a.{quote_ident(COLUMNS['DATE'])}"
+        if filters.get('start_date'):
+            conditions.append(f"{date_col} >= ?")
+            params.append(to_sql_timestamp(filters['start_date']))
+        if filters.get('end_date'):
+            conditions.append(f"{date_col} <= ?")
+            params.append(to_sql_timestamp(filters['end_date']))
+
+    for key, col in FILTER_COLUMNS:
+        value = filters.get(key)
+        if value and value != 'all' and col in columns:
+            conditions.append(f"a.{quote_ident(col)} = ?")
+            params.append(value)
+
+    sql = f" WHERE {' AND '.join(conditions)}" if conditions else ''
+    return sql, params
+
+
+def build_rollup_conditions(filters, columns):
+    """
+    Translates the dashboard filters into conditions on the rollup tables.
+
+    Returns (conditions, start_day), or None when the filters can't be answered from the
+    day-granular rollups (an end date, or a start date that isn't at midnight).
+    """
+    if filters.get('end_date'):
+        return None
+    start_day = None
+    if filters.get('start_date'):
+        start = to_sql_timestamp(filters['start_date'])
+        if not start.endswith(' 00:00:00'):
+            return None
+        start_day = start[:10]
+
+    conditions = []
+    for key, col in FILTER_COLUMNS:
+        value = filters.get(key)
+        if value and value != 'all' and col in columns:
+            conditions.append((col, value))
+    return conditions, start_day
+
+
+def compute_kpis(status_counts, total):
+    """Builds the KPI object from a {status: count} mapping and the filtered total."""
+    kpis = {'applications': total}
+    for key, status in STATUS_KPIS:
+        kpis[key] = int(status_counts.get(status, 0))
+    kpis['acceptance_rate'] = round(((kpis['hired'] + kpis['offered']) / total) * 100 if kpis['offered'] > 0 else 0, 2)
+    kpis['rejection_rate'] = round((kpis['rejected'] / total) * 100 if total > 0 else 0, 2)
+    return kpis
+
+
+def build_funnel(kpis):
+    return {'labels': ['Applications', 'Shortlisted', 'Interviewed', 'Offered', 'Hired'],
+            'data': [kpis['applications'], kpis['shortlisted'], kpis['interviewed'], kpis['offered'], kpis['hired']]}
+
+
+def get_status_counts(conn, where, params):
+    rows = conn.execute(
+        f"SELECT {STATUS_EXPR} AS status, COUNT(*) AS count FROM applications a {STATUS_JOIN}{where} GROUP BY 1",
+        params
+    ).fetchall()
+    return {row['status']: row['count'] for row in rows}
+
+
+def get_value_counts(conn, col, columns, where, params):
+    """COUNT(*) per non-NULL value of a column, like pandas' value_counts()."""
+    if col not in columns:
+        return {}
+    col_sql = f"a.{quote_ident(col)}"
+    condition = f"{where} AND {col_sql} IS NOT NULL" if where else f" WHERE {col_sql} IS NOT NULL"
+    rows = conn.execute(
+        f"SELECT {col_sql} AS value, COUNT(*) AS count FROM applications a{condition} GROUP BY {col_sql} ORDER BY count DESC",
+        params
+    ).fetchall()
+    return {row['value']: row['count'] for row in rows}
+
+
+def get_distinct_values(conn, col, columns, where, params):
+    """Sorted distinct values of a column within the filtered rows, NULL reported as ''."""
+    if col not in columns:
+        return []
+    col_sql = f"a.{quote_ident(col)}"
+    rows = conn.execute(f"SELECT DISTINCT COALESCE({col_sql}, '') FROM applications a{where} ORDER BY 1", params).fetchall()
+    return [row[0] for row in rows]
+
+
+def build_table_select(columns):
+    """SELECT list for table rows: NULLs as '', lower-cased email, normalized timestamp and derived Status."""
+    select = []
+    for col in columns:
+        col_sql = f"a.{quote_ident(col)}"
+        if col == 'email':
+            col_sql = f"lower({col_sql})"
+        elif col == COLUMNS['DATE']:
+            col_sql = f"strftime('%Y-%m-%d %H:%M:%S', {col_sql})"
+        select.append(f"COALESCE({col_sql}, '') AS {quote_ident(col)}")
+    select.append(f"{STATUS_EXPR} AS {quote_ident(COLUMNS['STATUS'])}")
+    return ', '.join(select)
+
+
+def get_table_columns(columns):
+    """Columns shown in the candidate table: applications columns plus Status, with name first."""
+    all_columns = list(columns) + [COLUMNS['STATUS']]
+    if 'name' in all_columns:
+        all_columns.insert(0, all_columns.pop(all_columns.index('name')))
+    default_columns = [col for col in DEFAULT_TABLE_COLUMNS if col in all_columns]
+    return all_columns, default_columns
+
+
+def encode_cursor(sort, order, value, rowid):
+    """Opaque keyset cursor: the sort key and rowid of the last row of a page."""
+    raw = json.dumps([sort, order, value, rowid], separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+
+def decode_cursor(cursor, sort, order):
+    try:
+        cursor_sort, cursor_order, value, rowid = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor.")
+    if cursor_sort != sort or cursor_order != order or not isinstance(rowid, int):
+        raise ValueError("Cursor does not match the requested sort order.")
+    return value, rowid
+
+
+def get_sort_expr(sort, columns):
+    """
+    SQL expression a page is ordered by: the raw column, so an index on it serves the sort.
+
+    NULLs keep SQLite's own order (first ascending, last descending) and are handled
+    explicitly by the keyset conditions, see get_keyset_segments().
+    """
+    if sort == COLUMNS['STATUS']:
+        return STATUS_EXPR
+    if sort not in columns:
+        raise ValueError(f"Cannot sort by unknown column '{sort}'.")
+    if sort == 'id':
+        return "a.rowid"
+    if sort == 'email':
+        return "lower(a.email)"  # as displayed, and served by idx_applications_email_lower
+    return f"a.{quote_ident(sort)}"
+
+
+def get_keyset_segments(sort_expr, order, cursor_value=None, cursor_rowid=None):
+    """
+    Conditions selecting the rows of a page, in page order: rows matching the first come
+    before those matching the second. Without a cursor that is the whole table.
+
+    Rows are ordered by (sort value, rowid), NULL sort values first ascending and last
+    descending. After a cursor the rest of the order is one row-value range, plus the NULL
+    rows when they come after it. Each segment is a plain range an index can seek to, which
+    a single condition OR-ing the NULL case in would not be.
+    """
+    if cursor_rowid is None:
+        return [('', [])]
+    op = '<' if order == 'desc' else '>'
+    if cursor_value is None:
+        nulls = (f"{sort_expr} IS NULL AND a.rowid {op} ?", [cursor_rowid])
+        return [nulls] if order == 'desc' else [nulls, (f"{sort_expr} IS NOT NULL", [])]
+    after = (f"({sort_expr}, a.rowid) {op} (?, ?)", [cursor_value, cursor_rowid])
+    return [after, (f"{sort_expr} IS NULL", [])] if order == 'desc' else [after]
+
+
+def get_table_page(conn, filters, sort='id', order='asc', page_size=DEFAULT_PAGE_SIZE, cursor=None, table_format='rows'):
+    """
+    Returns one page of the filtered candidate table using keyset pagination.
+
+    Rows are ordered by the sort column with rowid as a tie-breaker, and the page after
+    'cursor' is located with a (sort_value, rowid) comparison instead of OFFSET, so every
+    page costs the same however deep the client scrolls.
+    With table_format='columnar', table_data is encoded with payload.encode_columnar.
+    """
+    order = 'desc' if str(order).lower() == 'desc' else 'asc'
+    page_size = max(1, min(int(page_size), MAX_PAGE_SIZE))
+    columns = get_application_columns(conn)
+    all_columns, default_columns = get_table_columns(columns)
+    sort_expr = get_sort_expr(sort, columns)
+
+    where, params = build_filter_clause(filters, columns)
+    total = conn.execute(f"SELECT COUNT(*) FROM applications a{where}", params).fetchone()[0]
+
+    value, rowid = decode_cursor(cursor, sort, order) if cursor else (None, None)
+    direction = order.upper()
+    rows, description = [], None
+    for condition, condition_params in get_keyset_segments(sort_expr, order, value, rowid):
+        page_where = where
+        if condition:
+            page_where = f"{where} AND {condition}" if where else f" WHERE {condition}"
+        result = conn.execute(
+            f"SELECT {build_table_select(columns)}, {sort_expr} AS __sort_key, a.rowid AS __rowid "
+            f"FROM applications a {STATUS_JOIN}{page_where} ORDER BY {sort_expr} {direction}, a.rowid {direction} LIMIT ?",
+            params + condition_params + [page_size + 1 - len(rows)]
+        )
+        rows += result.fetchall()
+        description = result.description
+        if len(rows) > page_size:
+            break
+
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    next_cursor = None
+    if has_more:
+        last = rows[-1]
+        next_cursor = encode_cursor(sort, order, last['__sort_key'], last['__rowid'])
+
+    table_columns = [d[0] for d in description][:-2]  # without __sort_key, __rowid
+    if table_format == 'columnar':
+        table_data = payload.encode_columnar(table_columns, [tuple(row)[:-2] for row in rows])
+    else:
+        table_data = [dict(zip(table_columns, row)) for row in rows]
+
+    return {"table_data": table_data, "total": total, "page_size": page_size, "next_cursor": next_cursor,
+            "sort": sort, "order": order, "all_columns": all_columns, "default_columns": default_columns}
+
+
+def get_export_columns(conn, requested=None):
+    """
+    Columns of an export, in table order: the requested ones, or every table column.
+
+    Raises ValueError for a requested column the table doesn't have.
+    """
+    all_columns, _ = get_table_columns(get_application_columns(conn))
+    if not requested:
+        return all_columns
+    unknown = [col for col in requested if col not in all_columns]
+    if unknown:
+        raise ValueError(f"Unknown export column(s): {', '.join(unknown)}.")
+    return [col for col in all_columns if col in requested]
+
+
+def iter_export_rows(conn, filters, export_columns, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Yields lists of row tuples (values in export_columns order) for every application matching the filters.
+
+    Rows are read from a single cursor with fetchmany, so at most one chunk is held in memory
+    whatever the size of the result.
+    """
+    columns = get_application_columns(conn)
+    where, params = build_filter_clause(filters, columns)
+    table_columns = [col for col in export_columns if col != COLUMNS['STATUS']]
+    cursor = conn.execute(
+        f"SELECT {build_table_select(table_columns)} FROM applications a {STATUS_JOIN}{where} ORDER BY a.rowid", params
+    )
+    try:
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield [tuple(row[col] for col in export_columns) for row in rows]
+    finally:
+        cursor.close()
+
+
+def get_funnel_velocity(conn):
+    """Median time in each stage and transition counts. Precomputed and global: dashboard filters don't apply."""
+    available = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'stage_duration_buckets'"
+    ).fetchone()
+    if available is None:
+        return {'labels': [], 'data': [], 'samples': [], 'transitions': []}
+    return status_history.get_funnel_velocity(conn, STATUSES)
+
+
+def get_dashboard_data(conn, filters, include_table=True, table_format='rows'):
+    """
+    Computes the full /api/data payload for the given filters using SQL aggregates.
+
+    With include_table=False the (potentially large) table_data list is left empty;
+    the dashboard then loads the candidate table page by page from /api/table.
+    With table_format='columnar' it is encoded with payload.encode_columnar.
+    """
+    if conn.execute("SELECT 1 FROM applications LIMIT 1").fetchone() is None:
+        return dict(EMPTY_DASHBOARD)
+
+    columns = get_application_columns(conn)
+    where, params = build_filter_clause(filters, columns)
+
+    # Each aggregate comes from the rollups when they can answer it for these filters, else from SQL
+    rollup_conditions = build_rollup_conditions(filters, columns) if rollups.is_available(conn) else None
+    conditions, start_day = rollup_conditions or ([], None)
+    use_rollups = lambda col=None: rollup_conditions is not None and rollups.can_answer(conditions, col)
+
+    def get_counts():
+        if use_rollups():
+            return rollups.get_status_counts(conn, conditions, start_day)
+        return get_status_counts(conn, where, params)
+
+    def value_counts(col):
+        if col in columns and use_rollups(col):
+            return rollups.get_value_counts(conn, col, conditions, start_day)
+        return get_value_counts(conn, col, columns, where, params)
+
+    def distinct_values(col):
+        if col in columns and use_rollups(col):
+            return rollups.get_distinct_values(conn, col, conditions, start_day)
+        return get_distinct_values(conn, col, columns, where, params)
+
+    with metrics.span('status_counts'):
+        status_counts = get_counts()
+    kpis = compute_kpis(status_counts, sum(status_counts.values()))
+
+    with metrics.span('charts'):
+        charts = {
+            'apps_per_company': value_counts(COLUMNS['COMPANY']),
+            'apps_per_college': value_counts(COLUMNS['COLLEGE']),
+            'gender_diversity': value_counts(COLUMNS['GENDER']),
+            'recruitment_funnel': build_funnel(kpis),
+        }
+    with metrics.span('funnel_velocity'):
+        charts['funnel_velocity'] = get_funnel_velocity(conn)
+
+    table_data = []
+    if include_table:
+        with metrics.span('table'):
+            cursor = conn.execute(
+                f"SELECT {build_table_select(columns)} FROM applications a {STATUS_JOIN}{where} ORDER BY a.rowid", params
+            )
+            rows = cursor.fetchall()
+            if table_format == 'columnar':
+                table_data = payload.encode_columnar([d[0] for d in cursor.description], rows)
+            else:
+                table_data = [dict(row) for row in rows]
+    all_columns, default_columns = get_table_columns(columns)
+
+    with metrics.span('filter_lists'):
+        filter_lists = {key: distinct_values(col) for key, col in FILTER_LISTS}
+
+    return {"kpis": kpis, "charts": charts, "table_data": table_data, "all_columns": all_columns,
+            "default_columns": default_columns, "filters": filter_lists}
@@ -0,0 +1,261 @@
+"""Background text extraction for uploaded resumes.
+
+Submissions add a row to resume_jobs in the same transaction as the application. A
+ResumeWorker thread claims pending jobs and hands the PDF parsing to a process pool, so
+neither the request nor the web process pays for it; results land in resume_text, keyed
+by application id. The queue lives in SQLite, so jobs survive restarts: a job left
+'running' by a crashed worker is picked up again once its lease expires, and failed
+jobs are retried with exponential backoff up to MAX_ATTEMPTS.
+"""
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+import metrics
+
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+MAX_ATTEMPTS = 5
+RETRY_BASE_SECONDS = 30
+# A running job whose worker hasn't finished it within this time is handed out again
+LEASE_SECONDS = 600
+# Text kept per resume; longer documents are truncated
+MAX_TEXT_CHARS = 200_000
+
+SCHEMA = [
+    '''
+    CREATE TABLE IF NOT EXISTS resume_jobs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        application_id INTEGER NOT NULL,
+        resume_path TEXT NOT NULL,
+        status TEXT NOT NULL DEFAULT 'pending' CHECK(status IN ('pending', 'running', 'done', 'failed')),
+        attempts INTEGER NOT NULL DEFAULT 0,
+        last_error TEXT,
+        available_at TEXT NOT NULL,
+        created_at TEXT NOT NULL,
+        updated_at TEXT NOT NULL
+    )
+    ''',
+    "CREATE INDEX IF NOT EXISTS idx_resume_jobs_queue ON resume_jobs (status, available_at)",
+    '''
+    CREATE TABLE IF NOT EXISTS resume_text (
+        application_id INTEGER PRIMARY KEY,
+        resume_path TEXT NOT NULL,
+        page_count INTEGER,
+        size_bytes INTEGER,
+        title TEXT,
+        author TEXT,
+        text TEXT,
+        extracted_at TEXT NOT NULL
+    )
+    ''',
+]
+
+
+def init_resume_jobs(conn):
+    for sql in SCHEMA:
+        conn.execute(sql)
+
+
+def _timestamp(offset_seconds=0):
+    return (datetime.now(timezone.utc) + timedelta(seconds=offset_seconds)).strftime(TIMESTAMP_FORMAT)
+
+
+def enqueue(conn, application_id, resume_path):
+    """Queues text extraction for an application's resume, on the caller's transaction."""
+    now = _timestamp()
+    conn.execute(
+        "INSERT INTO resume_jobs (application_id, resume_path, available_at, created_at, updated_at) VALUES (?, ?, ?, ?, ?)",
+        (application_id, resume_path, now, now, now)
+    )
+
+
+def claim(conn, limit):
+    """Marks up to 'limit' due jobs (pending, or running with an expired lease) as running and returns them."""
+    now = _timestamp()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        jobs = conn.execute(
+            "SELECT id, application_id, resume_path, attempts FROM resume_jobs "
+            "WHERE status IN ('pending', 'running') AND available_at <= ? ORDER BY available_at, id LIMIT ?",
+            (now, limit)
+        ).fetchall()
+        conn.executemany(
+            "UPDATE resume_jobs SET status = 'running', attempts = attempts + 1, available_at = ?, updated_at = ? WHERE id = ?",
+            [(_timestamp(LEASE_SECONDS), now, job['id']) for job in jobs]
+        )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return [dict(job, attempts=job['attempts'] + 1) for job in jobs]
+
+
+def complete(conn, job, result):
+    now = _timestamp()
+    conn.execute(
+        "INSERT OR REPLACE INTO resume_text (application_id, resume_path, page_count, size_bytes, title, author, text, extracted_at) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        (job['application_id'], job['resume_path'], result['page_count'], result['size_bytes'],
+         result['title'], result['author'], result['text'], now)
+    )
+    conn.execute("UPDATE resume_jobs SET status = 'done', last_error = NULL, updated_at = ? WHERE id = ?", (now, job['id']))
+    conn.commit()
+
+
+def fail(conn, job, error):
+    """Records a failed attempt: retried later with exponential backoff, or failed for good after MAX_ATTEMPTS."""
+    if job['attempts'] >= MAX_ATTEMPTS:
+        status, available_at = 'failed', _timestamp()
+    else:
+        status, available_at = 'pending', _timestamp(RETRY_BASE_SECONDS * 2 ** (job['attempts'] - 1))
+    conn.execute(
+        "UPDATE resume_jobs SET status = ?, last_error = ?, available_at = ?, updated_at = ? WHERE id = ?",
+        (status, str(error)[:2000], available_at, _timestamp(), job['id'])
+    )
+    conn.commit()
+
+
+def get_backlog(conn):
+    """Job counts per status plus the age of the oldest job still waiting."""
+    counts = {status: 0 for status in ('pending', 'running', 'done', 'failed')}
+    counts.update({row[0]: row[1] for row in conn.execute(
+        "SELECT status, COUNT(*) FROM resume_jobs GROUP BY status"
+    ).fetchall()})
+    oldest = conn.execute("SELECT MIN(created_at) FROM resume_jobs WHERE status IN ('pending', 'running')").fetchone()[0]
+    oldest_age = None
+    if oldest:
+        created = datetime.strptime(oldest, TIMESTAMP_FORMAT).replace(tzinfo=timezone.utc)
+        oldest_age = round((datetime.now(timezone.utc) - created).total_seconds())
+    return {'jobs': counts, 'backlog': counts['pending'] + counts['running'], 'oldest_waiting_seconds': oldest_age}
+
+
+def extract_resume(path):
+    """Extracts text and metadata from a PDF. Runs in a worker process."""
+    from pypdf import PdfReader
+
+    reader = PdfReader(path)
+    parts, length = [], 0
+    for page in reader.pages:
+        if length >= MAX_TEXT_CHARS:
+            break
+        text = page.extract_text() or ''
+        parts.append(text)
+        length += len(text)
+    metadata = reader.metadata or {}
+    return {
+        'page_count': len(reader.pages),
+        'size_bytes': os.path.getsize(path),
+        'title': str(metadata.get('/Title') or '') or None,
+        'author': str(metadata.get('/Author') or '') or None,
+        'text': '\n'.join(parts)[:MAX_TEXT_CHARS],
+    }
+
+
+class ResumeWorker:
+    """
+    Polls resume_jobs and runs the extractions on a process pool.
+
+    get_conn returns a database connection (closed after each use); upload_folder is where
+    resume_path is resolved. notify() wakes the worker up right after a submission.
+    on_error(component, **fields) is called from the except block of a failed poll.
+    """
+
+    def __init__(self, get_conn, upload_folder, processes=2, poll_seconds=5.0, on_error=metrics.print_background_error):
+        self.get_conn = get_conn
+        self.on_error = on_error
+        self.upload_folder = upload_folder
+        self.processes = processes
+        self.poll_seconds = poll_seconds
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._executor = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._executor = self._new_executor()
+        self._thread = threading.Thread(target=self._run, name='resume-worker', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def _new_executor(self):
+        # spawn, not fork: the web process is threaded, and a forked child can inherit a lock
+        # another thread was holding and hang on it
+        return ProcessPoolExecutor(max_workers=self.processes, mp_context=multiprocessing.get_context('spawn'))
+
+    def notify(self):
+        self._wake.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                processed = self.run_once()
+            except Exception:
+                self.on_error('resume_worker')
+                processed = 0
+            if not processed:
+                self._wake.wait(self.poll_seconds)
+                self._wake.clear()
+
+    def run_once(self):
+        """
+        Claims one batch of due jobs, waits for their results and records them. Returns the batch size.
+
+        Needs the process pool, i.e. start() or drain().
+        """
+        conn = self.get_conn()
+        try:
+            jobs = claim(conn, self.processes * 2)
+        finally:
+            conn.close()
+        if not jobs:
+            return 0
+
+        futures = [(job, self._executor.submit(extract_resume, os.path.join(self.upload_folder, job['resume_path'])))
+                   for job in jobs]
+        for job, future in futures:
+            try:
+                result, error = future.result(timeout=LEASE_SECONDS), None
+            except Exception as e:
+                result, error = None, f"{type(e).__name__}: {e}"
+            conn = self.get_conn()
+            try:
+                if error is None:
+                    complete(conn, job, result)
+                else:
+                    fail(conn, job, error)
+            finally:
+                conn.close()
+        return len(jobs)
+
+    def drain(self):
+        """Processes due jobs until none are left (used by the CLI). Returns the number of jobs run."""
+        owns_executor = self._executor is None
+        if owns_executor:
+            self._executor = self._new_executor()
+        total = 0
+        try:
+            while True:
+                processed = self.run_once()
+                if not processed:
+                    return total
+                total += processed
+        finally:
+            if owns_executor:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+
+    def stats(self):
+        return {'running': self._thread is not None and self._thread.is_alive(), 'processes': self.processes}
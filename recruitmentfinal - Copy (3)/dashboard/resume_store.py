@@ -0,0 +1,120 @@
+"""Content-addressed storage for uploaded resumes.
+
+Uploads are copied to a temporary file in fixed-size chunks while their SHA-256 is computed,
+then moved to <root>/<hash[0:2]>/<hash[2:4]>/<hash>.<ext>. Identical files therefore end up
+at the same path and are stored once; applications.resume_path holds that relative path.
+Blobs no application references any more are removed by collect_garbage().
+"""
+import hashlib
+import os
+import re
+import tempfile
+import time
+
+CHUNK_SIZE = 64 * 1024
+TMP_DIR = '.tmp'
+# A blob path as stored in resume_path: two shard levels and the full hash
+BLOB_PATH_RE = re.compile(r'^([0-9a-f]{2})/([0-9a-f]{2})/([0-9a-f]{64})\.[a-z0-9]+$')
+
+
+class ResumeTooLarge(Exception):
+    """Raised when an upload exceeds the configured maximum size."""
+
+
+def blob_path(digest, extension):
+    return f"{digest[:2]}/{digest[2:4]}/{digest}.{extension}"
+
+
+def store(stream, root, extension, max_bytes):
+    """
+    Streams 'stream' into the store and returns its relative path.
+
+    Raises ResumeTooLarge (leaving nothing behind) once more than max_bytes have been read.
+    """
+    tmp_dir = os.path.join(root, TMP_DIR)
+    os.makedirs(tmp_dir, exist_ok=True)
+    digest, size = hashlib.sha256(), 0
+    fd, tmp_path = tempfile.mkstemp(dir=tmp_dir, suffix='.part')
+    try:
+        with os.fdopen(fd, 'wb') as tmp:
+            while True:
+                chunk = stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise ResumeTooLarge(f"Resume is larger than {max_bytes // (1024 * 1024)} MB.")
+                digest.update(chunk)
+                tmp.write(chunk)
+
+        relative_path = blob_path(digest.hexdigest(), extension.lower())
+        final_path = os.path.join(root, relative_path)
+        if os.path.exists(final_path):
+            try:
+                os.utime(final_path)  # already stored; fresh again for the garbage collector's grace period
+                os.remove(tmp_path)
+                return relative_path
+            except FileNotFoundError:
+                pass  # collected in the meantime, store it again
+        os.makedirs(os.path.dirname(final_path), exist_ok=True)
+        os.replace(tmp_path, final_path)
+        return relative_path
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def iter_blobs(root):
+    """Yields (relative path, absolute path) for every blob in the store."""
+    for shard in sorted(os.listdir(root)) if os.path.isdir(root) else []:
+        shard_dir = os.path.join(root, shard)
+        if len(shard) != 2 or not os.path.isdir(shard_dir):
+            continue
+        for sub_shard in sorted(os.listdir(shard_dir)):
+            sub_dir = os.path.join(shard_dir, sub_shard)
+            if not os.path.isdir(sub_dir):
+                continue
+            for name in sorted(os.listdir(sub_dir)):
+                relative_path = f"{shard}/{sub_shard}/{name}"
+                if BLOB_PATH_RE.match(relative_path):
+                    yield relative_path, os.path.join(sub_dir, name)
+
+
+def collect_garbage(conn, root, grace_seconds=3600, dry_run=False):
+    """
+    Deletes blobs that no application references, plus abandoned temporary files.
+
+    Files modified within grace_seconds are kept so uploads whose application row is not
+    committed yet are not collected. Returns (removed paths, bytes freed).
+    """
+    referenced = {row[0] for row in conn.execute(
+        "SELECT DISTINCT resume_path FROM applications WHERE resume_path IS NOT NULL"
+    ).fetchall()}
+    cutoff = time.time() - grace_seconds
+    candidates = [(rel, path) for rel, path in iter_blobs(root) if rel not in referenced]
+    tmp_dir = os.path.join(root, TMP_DIR)
+    if os.path.isdir(tmp_dir):
+        candidates += [(f"{TMP_DIR}/{name}", os.path.join(tmp_dir, name)) for name in sorted(os.listdir(tmp_dir))]
+
+    removed, freed = [], 0
+    for relative_path, path in candidates:
+        stat = os.stat(path)
+        if stat.st_mtime > cutoff:
+            continue
+        if not dry_run:
+            os.remove(path)
+            _remove_empty_shards(root, os.path.dirname(path))
+        removed.append(relative_path)
+        freed += stat.st_size
+    return removed, freed
+
+
+def _remove_empty_shards(root, directory):
+    root = os.path.abspath(root)
+    directory = os.path.abspath(directory)
+    while directory != root and os.path.dirname(directory).startswith(root) and not os.listdir(directory):
+        if os.path.basename(directory) == TMP_DIR:
+            break
+        os.rmdir(directory)
+        directory = os.path.dirname(directory)
@@ -0,0 +1,255 @@
+"""Incrementally maintained aggregate counters for the dashboard.
+
+Every rollup dimension has its own small table keyed by (value, submission day, status)
+with the number of applications in that group, and rollup_status holds the counts per
+(submission day, status). The write endpoints adjust the counters in the same transaction
+as their own change, upserting the keys they touch, so KPIs, charts and filter lists are
+answered by summing a few hundred groups instead of scanning the applications table.
+
+A per-dimension table can only answer queries filtered on that one dimension (or not
+filtered at all); can_answer() tells the read path when it has to fall back to SQL on the
+applications table instead. rebuild() recomputes everything from applications + statuses
+and check() reports groups that drifted.
+"""
+
+# Columns of the applications table that get a rollup table
+DIMENSIONS = ['business_entity', 'post_applying_for', 'location_of_position', 'gender',
+              'qualification_grad_school', 'qualification_grad_course']
+# Keys of the group deltas returned by adjust() / merge_deltas()
+GROUP_COLUMNS = ['status'] + DIMENSIONS + ['submission_day']
+
+STATUS_TABLE = 'rollup_status'
+
+# NULL values are stored as value '' with value_is_null = 1: primary key columns can't be NULL
+# and value_counts() has to tell NULL (not counted) from '' (counted) apart.
+DIMENSION_KEY = ['value', 'value_is_null', 'submission_day', 'status']
+STATUS_KEY = ['submission_day', 'status']
+
+
+def table_name(col):
+    return f"rollup_{col}"
+
+
+def _tables():
+    """(table, key columns) of every rollup table."""
+    return [(STATUS_TABLE, STATUS_KEY)] + [(table_name(col), DIMENSION_KEY) for col in DIMENSIONS]
+
+
+def _create_sql(table, key):
+    columns = ', '.join(f"{col} {'INTEGER' if col == 'value_is_null' else 'TEXT'} NOT NULL" for col in key)
+    return (f"CREATE TABLE IF NOT EXISTS {table} ({columns}, count INTEGER NOT NULL DEFAULT 0, "
+            f"PRIMARY KEY ({', '.join(key)})) WITHOUT ROWID")
+
+
+def _day_sql(app_columns):
+    return "COALESCE(substr(a.submission_timestamp, 1, 10), '')" if 'submission_timestamp' in app_columns else "''"
+
+
+def _group_select(app_columns):
+    """SELECT list that maps an applications row (joined with statuses) to its GROUP_COLUMNS key."""
+    select = ["COALESCE(s.status, 'Applied')"]
+    for col in DIMENSIONS:
+        select.append(f'a."{col}"' if col in app_columns else 'NULL')
+    select.append(_day_sql(app_columns))
+    return ', '.join(select)
+
+
+def _app_columns(conn):
+    return {row[1] for row in conn.execute("PRAGMA table_info(applications)").fetchall()}
+
+
+def is_available(conn):
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (STATUS_TABLE,)
+    ).fetchone() is not None
+
+
+def init_rollups(conn):
+    """Creates the rollup tables, populating them from the existing data the first time."""
+    created = not is_available(conn)
+    for table, key in _tables():
+        conn.execute(_create_sql(table, key))
+    if created:
+        print("Building application rollups from existing applications...")
+        rebuild(conn)
+
+
+def _table_keys(groups):
+    """Projects (GROUP_COLUMNS key, count) pairs onto {table: {table key: count}}."""
+    keys = {table: {} for table, _ in _tables()}
+    for group, count in groups:
+        status, day = group[0], group[-1]
+        status_keys = keys[STATUS_TABLE]
+        status_keys[(day, status)] = status_keys.get((day, status), 0) + count
+        for col, value in zip(DIMENSIONS, group[1:-1]):
+            key = ('' if value is None else value, 1 if value is None else 0, day, status)
+            dimension_keys = keys[table_name(col)]
+            dimension_keys[key] = dimension_keys.get(key, 0) + count
+    return keys
+
+
+def adjust(conn, where, params, sign):
+    """
+    Adds (sign=1) or removes (sign=-1) the applications matching 'where' from their groups.
+
+    'where' is a condition on the applications table aliased as 'a', e.g. "a.rowid = ?".
+    Call it with -1 before changing a row's status or dimensions and +1 afterwards, on the
+    same connection and before the commit, so the counters change atomically with the data.
+    Only the keys the rows belong to are written, and a key whose count drops to zero is
+    deleted. Returns the applied changes as (group key, signed count) pairs; see merge_deltas().
+    """
+    if not is_available(conn):
+        return []
+    groups = conn.execute(
+        f"SELECT {_group_select(_app_columns(conn))}, COUNT(*) FROM applications a "
+        f"LEFT JOIN statuses s ON s.email = lower(a.email) WHERE {where} GROUP BY {', '.join(str(i + 1) for i in range(len(GROUP_COLUMNS)))}",
+        params
+    ).fetchall()
+    groups = [(tuple(group[:-1]), group[-1] * sign) for group in groups]
+
+    for (table, key), table_keys in zip(_tables(), _table_keys(groups).values()):
+        rows = [list(k) + [count] for k, count in table_keys.items() if count]
+        if not rows:
+            continue
+        conn.executemany(
+            f"INSERT INTO {table} ({', '.join(key)}, count) VALUES ({', '.join('?' * len(key))}, ?) "
+            f"ON CONFLICT ({', '.join(key)}) DO UPDATE SET count = count + excluded.count",
+            rows
+        )
+        if sign < 0:
+            conn.executemany(
+                f"DELETE FROM {table} WHERE {' AND '.join(f'{col} = ?' for col in key)} AND count <= 0",
+                [row[:-1] for row in rows]
+            )
+    return groups
+
+
+def merge_deltas(*adjustments):
+    """
+    Nets out the return values of adjust() calls (e.g. the -1 and +1 around a status change).
+
+    Returns [{<GROUP_COLUMNS>..., 'delta': n}] for the groups whose count changed.
+    """
+    net = {}
+    for adjustment in adjustments:
+        for key, count in adjustment:
+            net[key] = net.get(key, 0) + count
+    return [dict(zip(GROUP_COLUMNS, key), delta=delta) for key, delta in net.items() if delta]
+
+
+def _expected_sql(conn, table):
+    """SELECT of the key columns and count of 'table', computed from applications + statuses."""
+    app_columns = _app_columns(conn)
+    day = _day_sql(app_columns)
+    source = "FROM applications a LEFT JOIN statuses s ON s.email = lower(a.email)"
+    if table == STATUS_TABLE:
+        return f"SELECT {day}, COALESCE(s.status, 'Applied'), COUNT(*) {source} GROUP BY 1, 2"
+    col = table[len('rollup_'):]
+    value = f'a."{col}"' if col in app_columns else 'NULL'
+    return (f"SELECT COALESCE({value}, ''), {value} IS NULL, {day}, COALESCE(s.status, 'Applied'), COUNT(*) "
+            f"{source} GROUP BY 1, 2, 3, 4")
+
+
+def rebuild(conn, dimensions=None):
+    """
+    Recomputes the counters from applications + statuses: those of the given dimensions, or
+    all of them. Returns the number of groups rebuilt.
+    """
+    groups = 0
+    for table, key in _tables():
+        if dimensions is not None and table not in [table_name(col) for col in dimensions]:
+            continue
+        conn.execute(_create_sql(table, key))
+        conn.execute(f"DELETE FROM {table}")
+        conn.execute(f"INSERT INTO {table} ({', '.join(key)}, count) {_expected_sql(conn, table)}")
+        groups += conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+    return groups
+
+
+def reset_dimension(conn, col):
+    """
+    Resets the counters of dimension 'col' after its column was added or dropped, i.e. is NULL
+    in every application. Derived from rollup_status, without reading applications.
+    """
+    if not is_available(conn):
+        return
+    conn.execute(f"DELETE FROM {table_name(col)}")
+    conn.execute(
+        f"INSERT INTO {table_name(col)} ({', '.join(DIMENSION_KEY)}, count) "
+        f"SELECT '', 1, submission_day, status, count FROM {STATUS_TABLE}"
+    )
+
+
+def check(conn):
+    """Returns the number of groups whose stored count differs from a fresh recomputation."""
+    drifted = 0
+    for table, key in _tables():
+        expected = _expected_sql(conn, table)
+        stored = f"SELECT {', '.join(key)}, count FROM {table} WHERE count != 0"
+        drifted += conn.execute(f"SELECT COUNT(*) FROM ({expected} EXCEPT {stored})").fetchone()[0]
+        drifted += conn.execute(f"SELECT COUNT(*) FROM ({stored} EXCEPT {expected})").fetchone()[0]
+    return drifted
+
+
+# --- Read path ---
+
+def _filter(conditions):
+    """The single (column, value) the conditions filter on, None for no filter, False if not answerable."""
+    filters = {(col, value) for col, value in conditions}
+    if not filters:
+        return None
+    if len(filters) > 1:
+        return False
+    col, value = filters.pop()
+    return (col, value) if col in DIMENSIONS else False
+
+
+def can_answer(conditions, col=None):
+    """
+    Whether the rollups can answer a query under 'conditions' (see get_status_counts), for
+    the values of 'col' or, with col=None, for the status counts.
+    """
+    single = _filter(conditions)
+    if single is False:
+        return False
+    return single is None or col is None or single[0] == col
+
+
+def _where(conditions, start_day, extra=None):
+    clauses, params = [extra] if extra else [], []
+    single = _filter(conditions)
+    if single:
+        clauses += ["value = ?", "value_is_null = 0"]
+        params.append(single[1])
+    if start_day:
+        clauses.append("submission_day >= ?")
+        params.append(start_day)
+    return (f" WHERE {' AND '.join(clauses)}" if clauses else ''), params
+
+
+def get_status_counts(conn, conditions, start_day=None):
+    """
+    {status: count} of the applications matching 'conditions', a list of (column, value)
+    equality filters that can_answer() accepted, submitted on or after start_day.
+    """
+    single = _filter(conditions)
+    table = table_name(single[0]) if single else STATUS_TABLE
+    where, params = _where(conditions, start_day)
+    rows = conn.execute(f"SELECT status, SUM(count) FROM {table}{where} GROUP BY status", params).fetchall()
+    return {row[0]: row[1] for row in rows}
+
+
+def get_value_counts(conn, col, conditions, start_day=None):
+    """Counts per non-NULL value of 'col', largest first, like pandas' value_counts()."""
+    where, params = _where(conditions, start_day, "value_is_null = 0")
+    rows = conn.execute(
+        f"SELECT value, SUM(count) AS total FROM {table_name(col)}{where} GROUP BY value ORDER BY total DESC", params
+    ).fetchall()
+    return {row[0]: row[1] for row in rows}
+
+
+def get_distinct_values(conn, col, conditions, start_day=None):
+    """Sorted distinct values of 'col', NULL reported as ''."""
+    where, params = _where(conditions, start_day)
+    rows = conn.execute(f"SELECT DISTINCT value FROM {table_name(col)}{where} ORDER BY 1", params).fetchall()
+    return [row[0] for row in rows]
@@ -0,0 +1,161 @@
+"""Change sequence numbers for delta sync of the candidate table.
+
+sync_state holds a database-wide counter. Triggers bump it on every insert, update and
+delete of an applications row and record the new value for that row in
+application_versions (deleted rows stay as tombstones); a status insert, update or delete
+re-stamps the applications rows with that email, since Status is part of their table row. A client that
+remembers the version its copy of the table reflects asks for the rows stamped after it
+and gets only those, plus the ids it should drop.
+
+Changes that alter the shape of every row (a form field dropped, the applications table
+rebuilt) call mark_reset(): clients older than that are told to reload in full.
+"""
+import payload
+from queries import STATUS_JOIN, build_filter_clause, build_table_select, get_application_columns
+
+# Larger deltas are answered with full=True; reloading is cheaper than patching that many rows
+MAX_DELTA_ROWS = 5000
+
+SCHEMA = [
+    '''
+    CREATE TABLE IF NOT EXISTS sync_state (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        version INTEGER NOT NULL DEFAULT 0,
+        reset_version INTEGER NOT NULL DEFAULT 0
+    )
+    ''',
+    "INSERT OR IGNORE INTO sync_state (id, version, reset_version) VALUES (1, 0, 0)",
+    '''
+    CREATE TABLE IF NOT EXISTS application_versions (
+        application_id INTEGER PRIMARY KEY,
+        version INTEGER NOT NULL,
+        deleted INTEGER NOT NULL DEFAULT 0
+    )
+    ''',
+    "CREATE INDEX IF NOT EXISTS idx_application_versions_version ON application_versions (version)",
+]
+
+_STAMP = "UPDATE sync_state SET version = version + 1 WHERE id = 1;"
+_CURRENT = "(SELECT version FROM sync_state WHERE id = 1)"
+
+TRIGGERS = {
+    'application_versions_insert': f'''
+        CREATE TRIGGER application_versions_insert AFTER INSERT ON applications BEGIN
+            {_STAMP}
+            INSERT OR REPLACE INTO application_versions (application_id, version, deleted) VALUES (new.rowid, {_CURRENT}, 0);
+        END
+    ''',
+    'application_versions_update': f'''
+        CREATE TRIGGER application_versions_update AFTER UPDATE ON applications BEGIN
+            {_STAMP}
+            INSERT OR REPLACE INTO application_versions (application_id, version, deleted) VALUES (new.rowid, {_CURRENT}, 0);
+        END
+    ''',
+    'application_versions_delete': f'''
+        CREATE TRIGGER application_versions_delete AFTER DELETE ON applications BEGIN
+            {_STAMP}
+            INSERT OR REPLACE INTO application_versions (application_id, version, deleted) VALUES (old.rowid, {_CURRENT}, 1);
+        END
+    ''',
+    # INSERT OR REPLACE on statuses fires the insert trigger only
+    'status_versions_insert': f'''
+        CREATE TRIGGER status_versions_insert AFTER INSERT ON statuses BEGIN
+            {_STAMP}
+            UPDATE application_versions SET version = {_CURRENT}
+            WHERE application_id IN (SELECT a.rowid FROM applications a WHERE lower(a.email) = new.email);
+        END
+    ''',
+    'status_versions_update': f'''
+        CREATE TRIGGER status_versions_update AFTER UPDATE ON statuses BEGIN
+            {_STAMP}
+            UPDATE application_versions SET version = {_CURRENT}
+            WHERE application_id IN (SELECT a.rowid FROM applications a WHERE lower(a.email) IN (old.email, new.email));
+        END
+    ''',
+    # Deleted statuses (e.g. merged by schema.normalize_status_emails) turn their rows back to 'Applied'
+    'status_versions_delete': f'''
+        CREATE TRIGGER status_versions_delete AFTER DELETE ON statuses BEGIN
+            {_STAMP}
+            UPDATE application_versions SET version = {_CURRENT}
+            WHERE application_id IN (SELECT a.rowid FROM applications a WHERE lower(a.email) = lower(old.email));
+        END
+    ''',
+}
+
+
+def init_row_versions(conn):
+    """
+    Creates the version tables and (re)creates missing triggers, e.g. after the applications
+    table was rebuilt. Rows without a version yet are stamped with the current one.
+    """
+    for sql in SCHEMA:
+        conn.execute(sql)
+    existing = {row[0] for row in conn.execute(
+        f"SELECT name FROM sqlite_master WHERE type = 'trigger' AND name IN ({', '.join('?' * len(TRIGGERS))})",
+        list(TRIGGERS)
+    ).fetchall()}
+    if existing == set(TRIGGERS):
+        return False
+    for name, sql in TRIGGERS.items():
+        if name not in existing:
+            conn.execute(sql)
+    conn.execute(
+        f"INSERT OR IGNORE INTO application_versions (application_id, version, deleted) "
+        f"SELECT rowid, {_CURRENT}, 0 FROM applications"
+    )
+    if existing:
+        mark_reset(conn)  # some writes went unrecorded
+    return True
+
+
+def get_state(conn):
+    row = conn.execute("SELECT version, reset_version FROM sync_state WHERE id = 1").fetchone()
+    return (row[0], row[1]) if row else (0, 0)
+
+
+def get_version(conn):
+    return get_state(conn)[0]
+
+
+def mark_reset(conn):
+    """Makes every client reload in full, on the caller's transaction."""
+    conn.execute("UPDATE sync_state SET version = version + 1, reset_version = version + 1 WHERE id = 1")
+
+
+def get_changes(conn, filters, since, limit=MAX_DELTA_ROWS, table_format='rows'):
+    """
+    Table rows changed after version 'since', within the dashboard filters.
+
+    Returns {"version", "full": False, "upserted": [rows], "deleted": [ids], "total"}:
+    'deleted' also lists rows that changed but no longer match the filters. When 'since' is
+    too old (before a reset, or more than 'limit' changes ago) returns {"version", "full": True}
+    and the client reloads. With table_format='columnar', 'upserted' is encoded with
+    payload.encode_columnar.
+    """
+    version, reset_version = get_state(conn)
+    if since < reset_version or since > version:
+        return {'version': version, 'full': True}
+    changed = conn.execute(
+        "SELECT application_id FROM application_versions WHERE version > ? LIMIT ?", (since, limit + 1)
+    ).fetchall()
+    if len(changed) > limit:
+        return {'version': version, 'full': True}
+
+    columns = get_application_columns(conn)
+    where, params = build_filter_clause(filters, columns)
+    # CROSS JOIN: the few changed rows drive the lookup, not a filter index over all applications
+    cursor = conn.execute(
+        f"SELECT {build_table_select(columns)} FROM application_versions v "
+        f"CROSS JOIN applications a ON a.rowid = v.application_id {STATUS_JOIN} "
+        f"WHERE v.version > ? AND v.deleted = 0{where.replace(' WHERE ', ' AND ', 1)} ORDER BY a.rowid",
+        [since] + params
+    )
+    rows = cursor.fetchall()
+    kept = {row['id'] for row in rows}
+    if table_format == 'columnar':
+        upserted = payload.encode_columnar([d[0] for d in cursor.description], rows)
+    else:
+        upserted = [dict(row) for row in rows]
+    deleted = [row[0] for row in changed if row[0] not in kept]
+    total = conn.execute(f"SELECT COUNT(*) FROM applications a{where}", params).fetchone()[0]
+    return {'version': version, 'full': False, 'upserted': upserted, 'deleted': deleted, 'total': total}
@@ -0,0 +1,247 @@
+"""Schema helpers for the dynamic applications table.
+
+Form fields flagged `indexed` in form_config (the dashboard's filterable columns) get a
+matching index on applications. The helpers here create and drop those indexes as fields
+are added, flagged or deleted, and keep the always-on core indexes in place.
+
+Fields are plain columns: adding one is ALTER TABLE ADD COLUMN and deleting one is ALTER
+TABLE DROP COLUMN, both in place and keeping the table's constraints. Only SQLite builds
+older than 3.35 fall back to copying the table, and then with the core column definitions
+restored; repair_applications_table() does the same for databases whose constraints were
+lost to the old copy-based delete.
+"""
+import sqlite3
+
+from queries import quote_ident, FILTER_COLUMNS, COLUMNS
+
+FIELD_INDEX_PREFIX = 'idx_applications_field_'
+
+# Indexes every applications table has, independent of form_config: (column, CREATE INDEX sql)
+CORE_INDEXES = [
+    ('submission_timestamp', "CREATE INDEX IF NOT EXISTS idx_applications_submission_timestamp ON applications (submission_timestamp)"),
+    # The statuses join and status updates match on lower(email)
+    ('email', "CREATE INDEX IF NOT EXISTS idx_applications_email_lower ON applications (lower(email))"),
+    # The candidate table's default sort besides id (the email and filter columns have theirs)
+    ('name', "CREATE INDEX IF NOT EXISTS idx_applications_name ON applications (name)"),
+]
+
+# Fields indexed by default: everything the dashboard filters on, plus gender for its chart
+DEFAULT_INDEXED_FIELDS = sorted({col for _, col in FILTER_COLUMNS} | {COLUMNS['GENDER']})
+
+# ALTER TABLE ... DROP COLUMN exists from SQLite 3.35
+SUPPORTS_DROP_COLUMN = sqlite3.sqlite_version_info >= (3, 35, 0)
+
+# Definitions of the core applications columns, as created by init_db
+CORE_COLUMN_DEFS = {
+    'id': 'INTEGER PRIMARY KEY AUTOINCREMENT',
+    'name': 'TEXT',
+    'email': 'TEXT UNIQUE',
+    'submission_timestamp': 'DATETIME DEFAULT CURRENT_TIMESTAMP',
+    'resume_path': 'TEXT',
+}
+
+
+def field_index_name(field_name):
+    return FIELD_INDEX_PREFIX + field_name
+
+
+def _application_columns(conn):
+    return {row[1] for row in conn.execute("PRAGMA table_info(applications)").fetchall()}
+
+
+def _existing_indexes(conn):
+    rows = conn.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'applications'").fetchall()
+    return {row[0] for row in rows}
+
+
+def create_field_index(conn, field_name):
+    conn.execute(
+        f"CREATE INDEX IF NOT EXISTS {quote_ident(field_index_name(field_name))} ON applications ({quote_ident(field_name)})"
+    )
+
+
+def drop_field_index(conn, field_name):
+    conn.execute(f"DROP INDEX IF EXISTS {quote_ident(field_index_name(field_name))}")
+
+
+def sync_indexes(conn):
+    """Makes the applications indexes match form_config: creates missing ones, drops stale field indexes."""
+    columns = _application_columns(conn)
+    wanted = {
+        row[0] for row in conn.execute("SELECT name FROM form_config WHERE indexed = 1").fetchall()
+        if row[0] in columns
+    }
+    existing = _existing_indexes(conn)
+    for index_name in existing:
+        if index_name.startswith(FIELD_INDEX_PREFIX) and index_name[len(FIELD_INDEX_PREFIX):] not in wanted:
+            conn.execute(f"DROP INDEX IF EXISTS {quote_ident(index_name)}")
+    for field_name in wanted:
+        if field_index_name(field_name) not in existing:
+            create_field_index(conn, field_name)
+    for column, sql in CORE_INDEXES:
+        if column in columns:
+            conn.execute(sql)
+
+
+def _unique_columns(conn):
+    """Columns of applications covered by a single-column UNIQUE constraint or index."""
+    unique = set()
+    for index in conn.execute("PRAGMA index_list(applications)").fetchall():
+        if index['unique']:
+            columns = [row['name'] for row in conn.execute(f"PRAGMA index_info({quote_ident(index['name'])})").fetchall()]
+            if len(columns) == 1 and columns[0] is not None:
+                unique.add(columns[0])
+    return unique
+
+
+def _column_def(column):
+    if column['name'] in CORE_COLUMN_DEFS:
+        return f"{quote_ident(column['name'])} {CORE_COLUMN_DEFS[column['name']]}"
+    parts = [quote_ident(column['name']), column['type'] or 'TEXT']
+    if column['notnull']:
+        parts.append('NOT NULL')
+    if column['dflt_value'] is not None:
+        parts.append(f"DEFAULT {column['dflt_value']}")
+    return ' '.join(parts)
+
+
+def _rebuild_applications(conn, exclude=None):
+    """
+    Copies applications into a new table with the core column definitions restored, keeping rowids.
+
+    Indexes and triggers on the old table are dropped with it; callers recreate them
+    (sync_indexes, search.sync_search_index).
+    """
+    columns = [col for col in conn.execute("PRAGMA table_info(applications)").fetchall() if col['name'] != exclude]
+    names = ', '.join(quote_ident(col['name']) for col in columns)
+    conn.execute("DROP TABLE IF EXISTS applications_new")
+    conn.execute(f"CREATE TABLE applications_new ({', '.join(_column_def(col) for col in columns)})")
+    # Rows whose id was lost (NULL) get a fresh one from the INTEGER PRIMARY KEY
+    conn.execute(f"INSERT INTO applications_new ({names}) SELECT {names} FROM applications ORDER BY rowid")
+    conn.execute("DROP TABLE applications")
+    # Triggers on other tables (row_versions' on statuses) name applications; with the modern
+    # rename SQLite rejects them while the table is missing, the legacy one leaves them as they are
+    conn.execute("PRAGMA legacy_alter_table = ON")
+    try:
+        conn.execute("ALTER TABLE applications_new RENAME TO applications")
+    finally:
+        conn.execute("PRAGMA legacy_alter_table = OFF")
+
+
+def drop_application_column(conn, field_name):
+    """
+    Removes a field's column from applications, on the caller's transaction.
+
+    Anything referencing the column (its field index, the search triggers) must be dropped
+    first; the field index is handled here.
+    """
+    drop_field_index(conn, field_name)
+    if SUPPORTS_DROP_COLUMN:
+        conn.execute(f"ALTER TABLE applications DROP COLUMN {quote_ident(field_name)}")
+    else:
+        _rebuild_applications(conn, exclude=field_name)
+        sync_indexes(conn)
+
+
+def get_lost_constraints(conn):
+    """Core column constraints missing from applications (lost to the old copy-based field delete)."""
+    columns = {col['name']: col for col in conn.execute("PRAGMA table_info(applications)").fetchall()}
+    lost = []
+    if 'id' in columns and not columns['id']['pk']:
+        lost.append('id PRIMARY KEY')
+    if 'email' in columns and 'email' not in _unique_columns(conn):
+        lost.append('email UNIQUE')
+    if 'submission_timestamp' in columns and columns['submission_timestamp']['dflt_value'] is None:
+        lost.append('submission_timestamp DEFAULT')
+    return lost
+
+
+def repair_applications_table(conn):
+    """
+    Restores the core column constraints if an earlier field delete dropped them. Returns what was restored.
+
+    When emails are duplicated (case-sensitively) the UNIQUE constraint can't come back;
+    the table is left alone and the duplicates are reported instead.
+    """
+    lost = get_lost_constraints(conn)
+    if not lost:
+        return []
+    if 'email UNIQUE' in lost:
+        duplicates = conn.execute(
+            "SELECT COUNT(*) FROM (SELECT email FROM applications WHERE email IS NOT NULL GROUP BY email HAVING COUNT(*) > 1)"
+        ).fetchone()[0]
+        if duplicates:
+            print(f"Cannot restore applications constraints ({', '.join(lost)}): {duplicates} email(s) are duplicated.")
+            return []
+    print(f"Migrating applications: restoring {', '.join(lost)}...")
+    _rebuild_applications(conn)
+    return lost
+
+
+def init_indexes(conn):
+    """
+    Adds the form_config.indexed flag to older databases and brings the indexes in line with it.
+    Also lower-cases statuses.email first, which the lower(email) join and index rely on.
+    """
+    form_config_columns = [row[1] for row in conn.execute("PRAGMA table_info(form_config)").fetchall()]
+    if 'indexed' not in form_config_columns:
+        print("Migrating form_config: Adding 'indexed' column...")
+        conn.execute("ALTER TABLE form_config ADD COLUMN indexed BOOLEAN NOT NULL DEFAULT 0")
+        conn.execute(
+            f"UPDATE form_config SET indexed = 1 WHERE name IN ({', '.join('?' * len(DEFAULT_INDEXED_FIELDS))})",
+            DEFAULT_INDEXED_FIELDS
+        )
+    normalize_status_emails(conn)
+    sync_indexes(conn)
+
+
+def normalize_status_emails(conn):
+    """
+    Lower-cases statuses.email, which the statuses join matches on, for rows written before
+    that was enforced. Of rows whose emails differ only in case the most recently written one
+    is kept (status updates replace the row, so it has the highest rowid) and the others are
+    deleted. Returns (merged, lowered): the rows deleted and the emails lower-cased.
+    """
+    merged = conn.execute(
+        "DELETE FROM statuses WHERE rowid NOT IN (SELECT MAX(rowid) FROM statuses GROUP BY lower(email))"
+    ).rowcount
+    lowered = conn.execute("UPDATE statuses SET email = lower(email) WHERE email != lower(email)").rowcount
+    if merged or lowered:
+        print(f"Migrating statuses: lower-cased {lowered} email(s), "
+              f"merged {merged} duplicate row(s) into the most recent status.")
+    return merged, lowered
+
+
+def explain(conn, sql, params=()):
+    """Returns the EXPLAIN QUERY PLAN detail lines for a query."""
+    return [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()]
+
+
+def get_index_report(conn):
+    """Lists the applications indexes and shows the query plans of the dashboard's filter queries."""
+    columns = _application_columns(conn)
+    indexes = [
+        {'name': row[0], 'sql': row[1]}
+        for row in conn.execute(
+            "SELECT name, sql FROM sqlite_master WHERE type = 'index' AND tbl_name = 'applications' ORDER BY name"
+        ).fetchall()
+    ]
+    indexed_fields = [row[0] for row in conn.execute("SELECT name FROM form_config WHERE indexed = 1 ORDER BY name").fetchall()]
+
+    probes = []
+    for field_name in indexed_fields:
+        if field_name in columns:
+            probes.append((f"filter on {field_name}", f"SELECT COUNT(*) FROM applications a WHERE a.{quote_ident(field_name)} = ?", ['']))
+    if 'submission_timestamp' in columns:
+        probes.append(("date range", "SELECT COUNT(*) FROM applications a WHERE a.submission_timestamp >= ? AND a.submission_timestamp <= ?",
+                       ['2000-01-01 00:00:00', '2000-01-02 00:00:00']))
+    probes.append(("status update lookup", "SELECT rowid FROM applications a WHERE lower(a.email) = ?", ['']))
+    probes.append(("status join", "SELECT COUNT(*) FROM applications a LEFT JOIN statuses s ON s.email = lower(a.email)", []))
+
+    plans = []
+    for label, sql, params in probes:
+        plan = explain(conn, sql, params)
+        plans.append({'query': label, 'sql': sql, 'plan': plan,
+                      'uses_index': any('USING INDEX' in line or 'USING COVERING INDEX' in line
+                                        or 'PRIMARY KEY' in line for line in plan)})
+    return {'indexes': indexes, 'indexed_fields': indexed_fields, 'plans': plans}
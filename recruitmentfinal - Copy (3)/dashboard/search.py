@@ -0,0 +1,286 @@
+"""Full-text search over applications with SQLite FTS5.
+
+applications_fts holds one document per application (rowid = applications.rowid) with two
+columns: 'fields', the text form fields joined together, and 'resume', the extracted resume
+text from resume_text. Triggers on applications and resume_text keep it in sync. Which form
+fields are searchable depends on form_config, so the triggers are generated, and
+sync_search_index() recreates them whenever that set changes.
+
+Adding a column that is still empty changes no document, so only the triggers are replaced.
+Other changes leave documents to reindex; from a request they are reindexed by a Reindexer
+thread in short batches (search_meta 'reindex_after' records how far it got) rather than
+under the request's write lock, and search results catch up as it goes.
+"""
+import html
+import re
+import threading
+
+import metrics
+from queries import quote_ident, get_application_columns, build_filter_clause, STATUS_EXPR, STATUS_JOIN
+
+# form_config field types whose values are worth indexing
+TEXT_FIELD_TYPES = ('text', 'textarea', 'email', 'select', 'radio')
+ALWAYS_INDEXED = ['name', 'email']
+# bm25 weights of the 'fields' and 'resume' columns
+RANK_WEIGHTS = (2.0, 1.0)
+SNIPPET_TOKENS = 12
+# Applications reindexed per transaction by a deferred reindex
+REINDEX_BATCH_SIZE = 2000
+
+CREATE_SQL = '''
+    CREATE VIRTUAL TABLE IF NOT EXISTS applications_fts USING fts5(
+        fields, resume, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'
+    )
+'''
+TRIGGERS = ['applications_fts_insert', 'applications_fts_update', 'applications_fts_delete', 'applications_fts_resume']
+
+
+def get_search_columns(conn):
+    """The applications columns indexed for search, in table order."""
+    columns = get_application_columns(conn)
+    text_fields = {row[0] for row in conn.execute(
+        f"SELECT name FROM form_config WHERE type IN ({', '.join('?' * len(TEXT_FIELD_TYPES))})", TEXT_FIELD_TYPES
+    ).fetchall()}
+    return [col for col in columns if col in text_fields or col in ALWAYS_INDEXED]
+
+
+def _document_sql(columns, alias):
+    """SQL expression joining the given columns of a row into one text document."""
+    if not columns:
+        return "''"
+    return " || ".join(f"COALESCE(NULLIF({alias}.{quote_ident(col)}, '') || char(10), '')" for col in columns)
+
+
+def drop_triggers(conn):
+    """Drops the sync triggers, e.g. before a column they reference is dropped. sync_search_index() restores them."""
+    for name in TRIGGERS:
+        conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+
+
+def _create_triggers(conn, columns):
+    drop_triggers(conn)
+    resume = "(SELECT text FROM resume_text WHERE application_id = new.rowid)"
+    conn.execute(f'''
+        CREATE TRIGGER applications_fts_insert AFTER INSERT ON applications BEGIN
+            INSERT INTO applications_fts (rowid, fields, resume) VALUES (new.rowid, {_document_sql(columns, 'new')}, {resume});
+        END
+    ''')
+    conn.execute(f'''
+        CREATE TRIGGER applications_fts_update AFTER UPDATE OF {', '.join(quote_ident(col) for col in columns)} ON applications BEGIN
+            UPDATE applications_fts SET fields = {_document_sql(columns, 'new')} WHERE rowid = new.rowid;
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER applications_fts_delete AFTER DELETE ON applications BEGIN
+            DELETE FROM applications_fts WHERE rowid = old.rowid;
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER applications_fts_resume AFTER INSERT ON resume_text BEGIN
+            UPDATE applications_fts SET resume = new.text WHERE rowid = new.application_id;
+        END
+    ''')
+
+
+def _indexed_signature(conn):
+    row = conn.execute("SELECT value FROM search_meta WHERE key = 'columns'").fetchone()
+    return row[0] if row else None
+
+
+def _index_rows(conn, columns, where='', params=()):
+    """(Re)writes the documents of the applications matching 'where' (a condition on 'a')."""
+    conn.execute(
+        f"INSERT OR REPLACE INTO applications_fts (rowid, fields, resume) "
+        f"SELECT a.rowid, {_document_sql(columns, 'a')}, r.text FROM applications a "
+        f"LEFT JOIN resume_text r ON r.application_id = a.rowid{where}",
+        params
+    )
+
+
+def rebuild(conn, columns=None):
+    """Reindexes every application. Returns the number of documents."""
+    columns = get_search_columns(conn) if columns is None else columns
+    conn.execute("DELETE FROM applications_fts")
+    _index_rows(conn, columns)
+    conn.execute("DELETE FROM search_meta WHERE key = 'reindex_after'")
+    return conn.execute("SELECT COUNT(*) FROM applications_fts").fetchone()[0]
+
+
+def _has_values(conn, col):
+    return conn.execute(
+        f"SELECT 1 FROM applications WHERE {quote_ident(col)} IS NOT NULL AND {quote_ident(col)} != '' LIMIT 1"
+    ).fetchone() is not None
+
+
+def sync_search_index(conn, defer=False):
+    """
+    Creates the FTS table and triggers and brings them in line with the searchable columns.
+    Cheap when nothing changed.
+
+    Columns that were added while still empty only need new triggers. Anything else (removed
+    or filled columns, missing triggers after the applications table was rebuilt) needs the
+    documents reindexed: right away, or with defer=True recorded for a Reindexer, which the
+    caller starts after its commit. Returns True when documents were (or are to be) reindexed.
+    """
+    conn.execute("CREATE TABLE IF NOT EXISTS search_meta (key TEXT PRIMARY KEY, value TEXT)")
+    created = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'applications_fts'"
+    ).fetchone() is None
+    conn.execute(CREATE_SQL)
+    columns = get_search_columns(conn)
+    signature = ','.join(columns)
+    indexed = _indexed_signature(conn)
+    triggers = {row[0] for row in conn.execute(
+        f"SELECT name FROM sqlite_master WHERE type = 'trigger' AND name IN ({', '.join('?' * len(TRIGGERS))})", TRIGGERS
+    ).fetchall()}
+    if not created and signature == indexed and triggers == set(TRIGGERS):
+        return False
+
+    _create_triggers(conn, columns)
+    conn.execute("INSERT OR REPLACE INTO search_meta (key, value) VALUES ('columns', ?)", (signature,))
+    if not created and indexed is not None and triggers == set(TRIGGERS):
+        previous = set(indexed.split(',')) if indexed else set()
+        added = [col for col in columns if col not in previous]
+        if previous <= set(columns) and not any(_has_values(conn, col) for col in added):
+            return False
+    if defer and not created:
+        conn.execute("INSERT OR REPLACE INTO search_meta (key, value) VALUES ('reindex_after', '0')")
+        return True
+    print("Building the application search index...")
+    rebuild(conn, columns)
+    return True
+
+
+def reindex_step(conn, batch_size=REINDEX_BATCH_SIZE):
+    """
+    Reindexes the next batch of a deferred reindex in its own short transaction.
+
+    Returns the number of applications reindexed, or None when no reindex is pending.
+    """
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        row = conn.execute("SELECT value FROM search_meta WHERE key = 'reindex_after'").fetchone()
+        if row is None:
+            conn.rollback()
+            return None
+        after = int(row[0])
+        last = conn.execute(
+            "SELECT MAX(rowid) FROM (SELECT rowid FROM applications WHERE rowid > ? ORDER BY rowid LIMIT ?)",
+            (after, batch_size)
+        ).fetchone()[0]
+        if last is None:
+            conn.execute("DELETE FROM search_meta WHERE key = 'reindex_after'")
+            conn.commit()
+            return 0
+        _index_rows(conn, get_search_columns(conn), " WHERE a.rowid > ? AND a.rowid <= ?", (after, last))
+        conn.execute("UPDATE search_meta SET value = ? WHERE key = 'reindex_after'", (str(last),))
+        count = conn.execute("SELECT COUNT(*) FROM applications WHERE rowid > ? AND rowid <= ?", (after, last)).fetchone()[0]
+        conn.commit()
+        return count
+    except BaseException:
+        conn.rollback()
+        raise
+
+
+class Reindexer:
+    """
+    Runs deferred reindexes (see sync_search_index) batch by batch on a background thread.
+
+    get_conn returns a database connection (closed when the reindex is done). start() is cheap
+    when nothing is pending, so it is called after every change that may have deferred one.
+    on_error(component, **fields) is called from the except block of a failed reindex.
+    """
+
+    def __init__(self, get_conn, batch_size=REINDEX_BATCH_SIZE, on_error=metrics.print_background_error):
+        self.get_conn = get_conn
+        self.on_error = on_error
+        self.batch_size = batch_size
+        self._lock = threading.Lock()
+        self._thread = None
+        self._again = False
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None:
+                self._again = True  # the running thread looks for pending work once more before it exits
+                return
+            self._thread = threading.Thread(target=self._run, name='search-reindex', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            conn = self.get_conn()
+            try:
+                while reindex_step(conn, self.batch_size) is not None:
+                    pass
+            except Exception:
+                self.on_error('search_reindex')
+            finally:
+                conn.close()
+            with self._lock:
+                if not self._again:
+                    self._thread = None
+                    return
+                self._again = False
+
+
+def build_match_query(text):
+    """
+    Turns free text into a safe FTS5 query: every word must match, the last one as a prefix.
+
+    Returns None when the text has no searchable words.
+    """
+    words = re.findall(r'\w+', text or '', flags=re.UNICODE)
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+
+def _highlight(snippet):
+    """HTML-escapes a snippet and turns the match markers into <mark> tags."""
+    if not snippet:
+        return None
+    snippet = re.sub(r'\s*\n\s*', ' · ', snippet.strip())
+    return html.escape(snippet).replace('\x02', '<mark>').replace('\x03', '</mark>')
+
+
+def search(conn, text, filters=None, page=1, page_size=20):
+    """
+    Ranked full-text search, optionally narrowed by the dashboard filters.
+
+    Returns {"total", "page", "page_size", "hits"}; each hit has the candidate's id, name,
+    email, post, Status, its score (lower is better) and HTML snippets with <mark>ed matches.
+    """
+    match = build_match_query(text)
+    if match is None:
+        return {'total': 0, 'page': page, 'page_size': page_size, 'hits': []}
+    columns = get_application_columns(conn)
+    where, params = build_filter_clause(filters or {}, columns)
+    where = where.replace(' WHERE ', ' AND ', 1)
+
+    # CROSS JOIN keeps the FTS index as the outer loop; otherwise a filter index can drive and run MATCH per row
+    base = f"FROM applications_fts CROSS JOIN applications a ON a.rowid = applications_fts.rowid {STATUS_JOIN} WHERE applications_fts MATCH ?{where}"
+    total = conn.execute(f"SELECT COUNT(*) {base}", [match] + params).fetchone()[0]
+
+    def column(name):
+        return f"a.{quote_ident(name)}" if name in columns else 'NULL'
+
+    rows = conn.execute(
+        f"SELECT a.rowid AS id, {column('name')} AS name, lower(a.email) AS email, "
+        f"{column('post_applying_for')} AS post_applying_for, {STATUS_EXPR} AS Status, "
+        f"bm25(applications_fts, {RANK_WEIGHTS[0]}, {RANK_WEIGHTS[1]}) AS score, "
+        f"snippet(applications_fts, 0, char(2), char(3), '…', {SNIPPET_TOKENS}) AS fields_snippet, "
+        f"snippet(applications_fts, 1, char(2), char(3), '…', {SNIPPET_TOKENS}) AS resume_snippet "
+        f"{base} ORDER BY score LIMIT ? OFFSET ?",
+        [match] + params + [page_size, (page - 1) * page_size]
+    ).fetchall()
+    hits = []
+    for row in rows:
+        hit = dict(row)
+        hit['score'] = round(hit['score'], 4)
+        hit['fields_snippet'] = _highlight(hit['fields_snippet'])
+        hit['resume_snippet'] = _highlight(hit['resume_snippet'])
+        hits.append(hit)
+    return {'total': total, 'page': page, 'page_size': page_size, 'hits': hits}
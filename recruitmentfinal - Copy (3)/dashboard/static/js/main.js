@@ -3,6 +3,25 @@ document.addEventListener('DOMContentLoaded', function() {
     const charts = {};
     let currentTableData = [];
 
+    // Server-side pagination state for the candidate table (keyset cursors per page)
+    const tableState = {
+        sort: 'id', order: 'asc', pageSize: 50,
+        cursors: [null], pageIndex: 0, nextCursor: null, total: 0,
+        version: 0  // row version of the loaded page, for /api/table/changes
+    };
+
+    // Full-text search state (ranked results, page-numbered)
+    const searchState = { query: '', page: 1, pageSize: 20, total: 0, timer: null };
+
+    // Live updates from /api/changes (Server-Sent Events). 'version' is the data version the
+    // dashboard reflects; events up to it are already included and are skipped.
+    // While the server turns the stream away, the dashboard polls every LIVE_POLL_MS instead.
+    const LIVE_POLL_MS = 15000;
+    const liveState = {
+        connected: false, version: 0, loading: false, pending: [], refreshTimer: null,
+        statusCounts: {}, charts: {}
+    };
+
     // Mobile menu functionality
     const mobileMenuBtn = document.getElementById('mobile-menu-btn');
     const mobileMenuOverlay = document.getElementById('mobile-menu-overlay');
@@ -113,18 +132,29 @@ document.addEventListener('DOMContentLoaded', function() {
     // --- Main Application Logic ---
 
     /**
-     * Fetches all dashboard data from the backend and orchestrates the UI update.
+     * Builds the query string for the currently selected dashboard filters.
      */
-    async function fetchDataAndRender() {
-        showLoading(true);
-        hideError();
-
+    function getFilterParams() {
         const params = new URLSearchParams();
         document.querySelectorAll('.filter-select').forEach(sel => {
             if (sel.value && sel.value !== 'all') {
                 params.append(sel.name, sel.value);
             }
         });
+        return params;
+    }
+
+    /**
+     * Fetches all dashboard data from the backend and orchestrates the UI update.
+     * KPIs, charts and filters come from /api/data; the table is loaded page by page.
+     */
+    async function fetchDataAndRender() {
+        showLoading(true);
+        hideError();
+        liveState.loading = true;
+
+        const params = getFilterParams();
+        params.append('include_table', '0');
 
         try {
             const response = await fetch(`/api/data?${params.toString()}`);
@@ -133,8 +163,7 @@ document.addEventListener('DOMContentLoaded', function() {
             if (!response.ok) {
                 throw new Error(data.message || 'An unknown error occurred on the server.');
             }
-            
-            currentTableData = data.table_data || [];
+            rememberDashboardState(data, Number(response.headers.get('X-Data-Version')) || 0);
 
             if (!document.getElementById('location-filter').dataset.populated) {
                 populateFilterOptions(data.filters);
@@ -142,11 +171,14 @@ document.addEventListener('DOMContentLoaded', function() {
 
             updateKPIs(data.kpis);
             updateAllCharts(data.charts);
-            populateTable(data.table_data, data.all_columns, data.default_columns);
-            populateStatusModal(data.table_data);
-            
+
             // Repopulate column selector every time to reflect schema changes
             populateColumnSelector(data.all_columns, data.default_columns);
+
+            // Filters changed, so start again from the first page
+            tableState.cursors = [null];
+            await loadTablePage(0);
+            if (searchState.query.trim()) await runSearch(1);
             
             // Ensure proper chart sizing after data load
             ensureChartSizing();
@@ -163,7 +195,393 @@ document.addEventListener('DOMContentLoaded', function() {
             showNotification(`Error loading dashboard: ${error.message}`, 'error');
         } finally {
             showLoading(false);
+            liveState.loading = false;
+            // Events that arrived while loading; the ones the payload already reflects are skipped
+            liveState.pending.splice(0).forEach(({ type, data }) => handleLiveEvent(type, data));
+        }
+    }
+
+    /**
+     * Turns a format=columnar table payload ({columns, length, data, dictionaries}) back into
+     * row objects. Dictionary-encoded columns hold indexes into their dictionary.
+     */
+    function decodeColumnar(table) {
+        const columns = table.columns.map((name, index) => {
+            const dictionary = table.dictionaries[index];
+            const values = table.data[index];
+            return { name, values: dictionary ? values.map(code => dictionary[code]) : values };
+        });
+        const rows = new Array(table.length);
+        for (let i = 0; i < table.length; i++) {
+            const row = {};
+            for (const column of columns) row[column.name] = column.values[i];
+            rows[i] = row;
+        }
+        return rows;
+    }
+
+    /**
+     * Loads one page of the candidate table from /api/table using the stored keyset cursor.
+     */
+    async function loadTablePage(pageIndex = 0) {
+        const params = getFilterParams();
+        params.set('format', 'columnar');
+        params.set('sort', tableState.sort);
+        params.set('order', tableState.order);
+        params.set('page_size', tableState.pageSize);
+        const cursor = tableState.cursors[pageIndex];
+        if (cursor) params.set('cursor', cursor);
+
+        const response = await fetch(`/api/table?${params.toString()}`);
+        const data = await response.json();
+        if (!response.ok) {
+            throw new Error(data.error || data.message || 'Failed to load the candidate table.');
+        }
+
+        tableState.pageIndex = pageIndex;
+        tableState.total = data.total;
+        tableState.version = data.version;
+        tableState.nextCursor = data.next_cursor;
+        tableState.cursors = tableState.cursors.slice(0, pageIndex + 1);
+        if (data.next_cursor) tableState.cursors.push(data.next_cursor);
+
+        currentTableData = data.table_data ? decodeColumnar(data.table_data) : [];
+        tableState.allColumns = data.all_columns;
+        tableState.defaultColumns = data.default_columns;
+        populateTable(currentTableData, data.all_columns, getVisibleColumns(data.default_columns));
+        populateStatusModal(currentTableData);
+        updateTablePager();
+    }
+
+    async function runSearch(page = 1) {
+        const panel = document.getElementById('search-results');
+        if (!searchState.query.trim()) {
+            panel.classList.add('hidden');
+            return;
+        }
+        const params = getFilterParams();
+        params.set('q', searchState.query);
+        params.set('page', page);
+        params.set('page_size', searchState.pageSize);
+        const response = await fetch(`/api/search?${params.toString()}`);
+        const data = await response.json();
+        if (!response.ok) {
+            showNotification(data.error || 'Search failed.', 'error');
+            return;
+        }
+        searchState.page = data.page;
+        searchState.total = data.total;
+        renderSearchResults(data.hits);
+        panel.classList.remove('hidden');
+    }
+
+    function renderSearchResults(hits) {
+        const list = document.getElementById('search-results-list');
+        list.innerHTML = '';
+        if (hits.length === 0) {
+            list.innerHTML = '<li class="px-4 py-3 text-sm text-gray-500">No matching candidates.</li>';
+        }
+        hits.forEach(hit => {
+            const item = document.createElement('li');
+            item.className = 'px-4 py-3 text-sm';
+            const title = document.createElement('div');
+            title.className = 'font-medium text-gray-800';
+            title.textContent = `${hit.name || hit.email} · ${hit.email}`;
+            const meta = document.createElement('div');
+            meta.className = 'text-xs text-gray-500';
+            meta.textContent = [hit.post_applying_for, hit.Status].filter(Boolean).join(' · ');
+            item.appendChild(title);
+            item.appendChild(meta);
+            // Snippets are HTML-escaped by the server; only <mark> tags are added
+            [hit.fields_snippet, hit.resume_snippet].filter(Boolean).forEach((snippet, i) => {
+                const line = document.createElement('div');
+                line.className = 'text-gray-600 mt-1';
+                line.innerHTML = (i === 1 || !hit.fields_snippet ? '<i class="fas fa-file-pdf mr-1 text-gray-400"></i>' : '') + snippet;
+                item.appendChild(line);
+            });
+            list.appendChild(item);
+        });
+        const start = searchState.total === 0 ? 0 : (searchState.page - 1) * searchState.pageSize + 1;
+        const end = (searchState.page - 1) * searchState.pageSize + hits.length;
+        document.getElementById('search-results-info').textContent = `${start}-${end} of ${searchState.total} matches`;
+        document.getElementById('search-prev-btn').disabled = searchState.page <= 1;
+        document.getElementById('search-next-btn').disabled = end >= searchState.total;
+    }
+
+    // --- Live Updates ---
+
+    // Dashboard filter keys -> rollup group columns (FILTER_COLUMNS in queries.py)
+    const GROUP_FILTER_COLUMNS = {
+        location: 'location_of_position', post: 'post_applying_for', qualification: 'qualification_grad_course',
+        business_entity: 'business_entity', course: 'qualification_grad_course', college: 'qualification_grad_school'
+    };
+    // Charts counting applications per value of a group column
+    const GROUP_CHART_COLUMNS = {
+        apps_per_company: 'business_entity', apps_per_college: 'qualification_grad_school', gender_diversity: 'gender'
+    };
+    const STATUS_KPIS = [['shortlisted', 'Shortlisted'], ['interviewed', 'Interviewed'], ['offered', 'Offered'],
+                         ['hired', 'Hired'], ['rejected', 'Rejected']];
+
+    /**
+     * Keeps what the live deltas are applied to: the version of the payload, status counts
+     * (recovered from the KPIs) and the chart data.
+     */
+    function rememberDashboardState(data, version) {
+        liveState.version = version;
+        const kpis = data.kpis || {};
+        const counts = {};
+        let others = 0;
+        STATUS_KPIS.forEach(([key, status]) => {
+            counts[status] = kpis[key] || 0;
+            others += counts[status];
+        });
+        counts.Applied = (kpis.applications || 0) - others;
+        liveState.statusCounts = counts;
+        liveState.charts = { ...(data.charts || {}) };
+    }
+
+    // Same as compute_kpis() in queries.py
+    function computeKpis(statusCounts) {
+        const total = Object.values(statusCounts).reduce((sum, count) => sum + count, 0);
+        const kpis = { applications: total };
+        STATUS_KPIS.forEach(([key, status]) => { kpis[key] = statusCounts[status] || 0; });
+        const round2 = value => Math.round(value * 100) / 100;
+        kpis.acceptance_rate = round2(kpis.offered > 0 ? ((kpis.hired + kpis.offered) / total) * 100 : 0);
+        kpis.rejection_rate = round2(total > 0 ? (kpis.rejected / total) * 100 : 0);
+        return kpis;
+    }
+
+    /**
+     * Whether a rollup group (or table row) falls within the selected filters; null when that
+     * can't be told from the day-granular group (an end date is set).
+     */
+    function matchesFilters(item, params, dayOf) {
+        for (const [key, column] of Object.entries(GROUP_FILTER_COLUMNS)) {
+            const value = params.get(key);
+            if (value && item[column] !== value) return false;
+        }
+        if (params.get('end_date')) return null;
+        const startDate = params.get('start_date');
+        return !startDate || (dayOf(item) || '') >= startDate;
+    }
+
+    function scheduleRefresh() {
+        clearTimeout(liveState.refreshTimer);
+        liveState.refreshTimer = setTimeout(fetchDataAndRender, 500);
+    }
+
+    /**
+     * Applies the rollup group deltas of an event to the KPIs and charts. Returns the net
+     * change in the number of applications matching the filters, or null if a full refresh
+     * was scheduled instead.
+     */
+    function applyGroupDeltas(groups = [], funnelVelocity = null) {
+        const params = getFilterParams();
+        const matched = [];
+        for (const group of groups) {
+            const match = matchesFilters(group, params, g => g.submission_day);
+            if (match === null) {
+                scheduleRefresh();
+                return null;
+            }
+            if (match) matched.push(group);
+        }
+
+        const bump = (counts, key, delta) => {
+            if (key === null || key === undefined) return counts;
+            counts = { ...counts, [key]: (counts[key] || 0) + delta };
+            // Ordered by count like the server's value_counts; empty values disappear
+            return Object.fromEntries(Object.entries(counts).filter(([, count]) => count > 0).sort((a, b) => b[1] - a[1]));
+        };
+        let applicationsDelta = 0;
+        matched.forEach(group => {
+            liveState.statusCounts[group.status] = (liveState.statusCounts[group.status] || 0) + group.delta;
+            for (const [chart, column] of Object.entries(GROUP_CHART_COLUMNS)) {
+                liveState.charts[chart] = bump(liveState.charts[chart] || {}, group[column], group.delta);
+            }
+            applicationsDelta += group.delta;
+        });
+        if (funnelVelocity) liveState.charts.funnel_velocity = funnelVelocity;
+
+        if (matched.length || funnelVelocity) {
+            const kpis = computeKpis(liveState.statusCounts);
+            liveState.charts.recruitment_funnel = {
+                labels: ['Applications', 'Shortlisted', 'Interviewed', 'Offered', 'Hired'],
+                data: [kpis.applications, kpis.shortlisted, kpis.interviewed, kpis.offered, kpis.hired]
+            };
+            updateKPIs(kpis);
+            updateAllCharts(liveState.charts);
+        }
+        return applicationsDelta;
+    }
+
+    /**
+     * Patches the loaded table page: rows already on it are replaced, deleted ids removed and,
+     * with allowAppend, new rows matching the filters appended when the last page (in id
+     * order) is showing and has room.
+     */
+    function patchTablePage(rows = [], deletedIds = [], allowAppend = false) {
+        let changed = false;
+        if (deletedIds.length) {
+            const deleted = new Set(deletedIds.map(String));
+            const kept = currentTableData.filter(row => !deleted.has(String(row.id)));
+            changed = kept.length !== currentTableData.length;
+            currentTableData = kept;
+        }
+        const byId = new Map(currentTableData.map((row, index) => [String(row.id), index]));
+        const params = getFilterParams();
+        rows.forEach(row => {
+            const index = byId.get(String(row.id));
+            if (index !== undefined) {
+                currentTableData[index] = row;
+                changed = true;
+            } else if (allowAppend && !tableState.nextCursor && tableState.sort === 'id' &&
+                       tableState.order === 'asc' && currentTableData.length < tableState.pageSize &&
+                       matchesFilters(row, params, r => (r.submission_timestamp || '').slice(0, 10))) {
+                currentTableData.push(row);
+                changed = true;
+            }
+            const select = document.querySelector(`.status-select[data-email="${row.email}"]`);
+            if (select && !select.disabled) select.value = row.Status;
+        });
+        if (changed) {
+            populateTable(currentTableData, tableState.allColumns, getVisibleColumns(tableState.defaultColumns));
+        }
+        updateTablePager();
+    }
+
+    /**
+     * Updates the candidate table from an event's rows: changed rows are replaced in place,
+     * new ones appended when they belong on the page showing.
+     */
+    function applyRowChanges(type, rows = [], truncated = false, applicationsDelta = 0) {
+        if (truncated) {
+            loadTablePage(tableState.pageIndex).catch(error => console.error('Table refresh failed:', error));
+            return;
+        }
+        if (type === 'application') tableState.total += applicationsDelta;
+        patchTablePage(rows, [], type === 'application');
+    }
+
+    /**
+     * Catches up after missed events (e.g. a reconnect): reloads the aggregates, which are
+     * small, and fetches only the table rows changed since the page was loaded.
+     */
+    async function resyncDashboard() {
+        const params = getFilterParams();
+        params.append('include_table', '0');
+        liveState.loading = true;
+        try {
+            const response = await fetch(`/api/data?${params.toString()}`);
+            const data = await response.json();
+            if (!response.ok) throw new Error(data.message || 'Failed to reload the dashboard.');
+            rememberDashboardState(data, Number(response.headers.get('X-Data-Version')) || 0);
+            updateKPIs(data.kpis);
+            updateAllCharts(data.charts);
+
+            const changesParams = getFilterParams();
+            changesParams.set('since', tableState.version);
+            changesParams.set('format', 'columnar');
+            const changesResponse = await fetch(`/api/table/changes?${changesParams.toString()}`);
+            const changes = await changesResponse.json();
+            if (!changesResponse.ok || changes.full) {
+                await loadTablePage(tableState.pageIndex);
+            } else {
+                tableState.version = changes.version;
+                tableState.total = changes.total;
+                patchTablePage(decodeColumnar(changes.upserted), changes.deleted, true);
+            }
+        } catch (error) {
+            console.error('Live resync failed:', error);
+            scheduleRefresh();
+        } finally {
+            liveState.loading = false;
+            liveState.pending.splice(0).forEach(({ type, data }) => handleLiveEvent(type, data));
+        }
+    }
+
+    function handleLiveEvent(type, data) {
+        if (liveState.loading) {
+            liveState.pending.push({ type, data });
+            return;
+        }
+        if (data.version <= liveState.version) return;
+        liveState.version = data.version;
+
+        if (type === 'form_config') {
+            scheduleRefresh();
+            return;
+        }
+        if (type === 'resync') {
+            resyncDashboard();
+            return;
         }
+        const applicationsDelta = applyGroupDeltas(data.groups, data.funnel_velocity);
+        if (applicationsDelta === null) return;
+        applyRowChanges(type, data.rows, data.rows_truncated, applicationsDelta);
+    }
+
+    /**
+     * Subscribes to /api/changes. EventSource reconnects by itself and resumes from the last
+     * event id; the server answers with the missed events or a resync. A refused stream (the
+     * server's live connection limit) is not retried by EventSource: poll, then try again.
+     */
+    function connectLiveUpdates() {
+        if (!window.EventSource) return;
+        const source = new EventSource('/api/changes');
+        source.onopen = () => { liveState.connected = true; };
+        source.onerror = () => {
+            liveState.connected = false;
+            if (source.readyState === EventSource.CLOSED) pollLiveUpdates();
+        };
+        ['application', 'status', 'form_config', 'resync'].forEach(type => {
+            source.addEventListener(type, event => handleLiveEvent(type, JSON.parse(event.data)));
+        });
+    }
+
+    function pollLiveUpdates() {
+        setTimeout(async () => {
+            if (!liveState.loading) await resyncDashboard();
+            connectLiveUpdates();
+        }, LIVE_POLL_MS);
+    }
+
+    function getVisibleColumns(defaultColumns = []) {
+        const checkboxes = document.querySelectorAll('#column-selector-options input');
+        if (checkboxes.length === 0) return defaultColumns;
+        return Array.from(checkboxes).filter(cb => cb.checked).map(cb => cb.value);
+    }
+
+    function updateTablePager() {
+        const info = document.getElementById('table-page-info');
+        const prevBtn = document.getElementById('table-prev-btn');
+        const nextBtn = document.getElementById('table-next-btn');
+        const start = tableState.total === 0 ? 0 : tableState.pageIndex * tableState.pageSize + 1;
+        const end = tableState.pageIndex * tableState.pageSize + currentTableData.length;
+        if (info) info.textContent = `Showing ${start}-${end} of ${tableState.total}`;
+        if (prevBtn) prevBtn.disabled = tableState.pageIndex === 0;
+        if (nextBtn) nextBtn.disabled = !tableState.nextCursor;
+    }
+
+    async function changeTablePage(delta) {
+        const pageIndex = tableState.pageIndex + delta;
+        if (pageIndex < 0 || (delta > 0 && !tableState.nextCursor)) return;
+        try {
+            await loadTablePage(pageIndex);
+        } catch (error) {
+            showNotification(`Error loading table: ${error.message}`, 'error');
+        }
+    }
+
+    async function handleSortChange(column) {
+        if (tableState.sort === column) {
+            tableState.order = tableState.order === 'asc' ? 'desc' : 'asc';
+        } else {
+            tableState.sort = column;
+            tableState.order = 'asc';
+        }
+        tableState.cursors = [null];
+        await changeTablePage(-tableState.pageIndex);
     }
 
     // --- UI Update Functions (KPIs, Charts, etc. - largely unchanged) ---
@@ -198,8 +616,13 @@ document.addEventListener('DOMContentLoaded', function() {
         const trHead = document.createElement('tr');
         allColumns.forEach(col => {
             const th = document.createElement('th');
-            th.className = 'py-2 px-4 border-b text-left sticky top-0 bg-gray-200';
+            th.className = 'py-2 px-4 border-b text-left sticky top-0 bg-gray-200 cursor-pointer select-none';
+            th.dataset.column = col;
             th.textContent = col;
+            if (tableState.sort === col) {
+                th.textContent += tableState.order === 'asc' ? ' \u25B2' : ' \u25BC';
+            }
+            th.addEventListener('click', () => handleSortChange(col));
             if (!defaultColumns.includes(col)) {
                 th.style.display = 'none';
             }
@@ -262,6 +685,7 @@ document.addEventListener('DOMContentLoaded', function() {
             let optionsHtml = statuses.map(s => `<option value="${s}" ${row.Status === s ? 'selected' : ''}>${s}</option>`).join('');
             
             tr.innerHTML = `
+                <td class="py-2 px-4"><input type="checkbox" class="bulk-select" data-email="${row.email}"></td>
                 <td class="py-2 px-4">${row.name || 'N/A'}</td>
                 <td class="py-2 px-4">${row.email}</td>
                 <td class="py-2 px-4">
@@ -277,6 +701,8 @@ document.addEventListener('DOMContentLoaded', function() {
         document.querySelectorAll('.status-select').forEach(select => {
             select.addEventListener('change', handleStatusChange);
         });
+        const selectAll = document.getElementById('bulk-select-all');
+        if (selectAll) selectAll.checked = false;
     }
     
     function populateColumnSelector(allColumns = [], defaultColumns = []) {
@@ -385,6 +811,29 @@ document.addEventListener('DOMContentLoaded', function() {
                     }
                 }
             },
+            funnelVelocityChart: {
+                type: 'bar',
+                label: 'Median Days in Stage',
+                data: chartData.funnel_velocity,
+                options: {
+                    responsive: true,
+                    maintainAspectRatio: false,
+                    aspectRatio: 2,
+                    scales: {
+                        y: {
+                            beginAtZero: true,
+                            grid: {
+                                color: 'rgba(0, 0, 0, 0.1)'
+                            }
+                        },
+                        x: {
+                            grid: {
+                                display: false
+                            }
+                        }
+                    }
+                }
+            },
             recruitmentFunnelChart: { 
                 type: 'funnel', 
                 label: 'Recruitment Funnel', 
@@ -554,7 +1003,7 @@ document.addEventListener('DOMContentLoaded', function() {
         if (!table) return;
 
         table.querySelectorAll('thead th').forEach((th, index) => {
-            const isVisible = selectedColumns.includes(th.textContent);
+            const isVisible = selectedColumns.includes(th.dataset.column);
             th.style.display = isVisible ? '' : 'none';
             table.querySelectorAll('tbody tr').forEach(tr => {
                 if (tr.children[index]) {
@@ -965,6 +1414,50 @@ document.addEventListener('DOMContentLoaded', function() {
         }
     }
 
+    /**
+     * Applies the status chosen in the bulk bar to the ticked candidates, or to every
+     * candidate matching the current dashboard filters, in one request / one transaction.
+     */
+    async function handleBulkStatusChange(useFilters) {
+        const status = document.getElementById('bulk-status-select').value;
+        const feedback = document.getElementById('bulk-status-feedback');
+        const payload = { status };
+
+        if (useFilters) {
+            if (!confirm(`Set the status of every candidate matching the current filters to "${status}"?`)) return;
+            payload.filters = Object.fromEntries(getFilterParams());
+        } else {
+            payload.emails = Array.from(document.querySelectorAll('.bulk-select:checked')).map(cb => cb.dataset.email);
+            if (payload.emails.length === 0) {
+                showNotification('Select at least one candidate first.', 'warning');
+                return;
+            }
+        }
+
+        feedback.textContent = 'Saving...';
+        try {
+            const response = await fetch('/api/update_status/bulk', {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify(payload),
+            });
+            const result = await response.json();
+            if (!response.ok) throw new Error(result.error || 'Server responded with an error.');
+
+            const notFound = result.results.filter(r => r.result === 'not_found').length;
+            feedback.textContent = `Updated ${result.updated} candidate(s)` + (notFound ? `, ${notFound} not found` : '');
+            result.results.forEach(r => {
+                const select = document.querySelector(`.status-select[data-email="${r.email}"]`);
+                if (select && r.result !== 'not_found') select.value = r.status;
+            });
+            document.querySelectorAll('.bulk-select:checked').forEach(cb => { cb.checked = false; });
+            showNotification(`Status set to ${status} for ${result.updated} candidate(s)`, 'success');
+        } catch (error) {
+            feedback.textContent = '';
+            showNotification(`Bulk status update failed: ${error.message}`, 'error');
+        }
+    }
+
     async function openUserManagementModal() {
         try {
             const response = await fetch('/api/users');
@@ -1493,6 +1986,7 @@ document.addEventListener('DOMContentLoaded', function() {
         const fieldSubsectionInput = document.getElementById('new-field-subsection');
         const fieldOptionsInput = document.getElementById('new-field-options');
         const fieldRequiredInput = document.getElementById('new-field-required');
+        const fieldIndexedInput = document.getElementById('new-field-indexed');
 
         const fieldName = fieldNameInput.value.trim().replace(/\s+/g, '_').toLowerCase();
         if (!fieldName) {
@@ -1513,7 +2007,8 @@ document.addEventListener('DOMContentLoaded', function() {
                     type: fieldTypeInput.value,
                     subsection: fieldSubsectionInput.value,
                     options: fieldOptionsInput.value,
-                    required: fieldRequiredInput.checked
+                    required: fieldRequiredInput.checked,
+                    indexed: fieldIndexedInput ? fieldIndexedInput.checked : false
                 }),
             });
             const result = await response.json();
@@ -1553,6 +2048,8 @@ document.addEventListener('DOMContentLoaded', function() {
         if (editFieldSubsection) editFieldSubsection.value = field.subsection || '';
         if (editFieldOptions) editFieldOptions.value = field.options || '';
         if (editFieldRequired) editFieldRequired.checked = field.required;
+        const editFieldIndexed = document.getElementById('edit-field-indexed');
+        if (editFieldIndexed) editFieldIndexed.checked = !!field.indexed;
         if (editFieldValidations) editFieldValidations.value = field.validations || '{}';
 
         // Show/hide options container based on field type
@@ -1587,6 +2084,8 @@ document.addEventListener('DOMContentLoaded', function() {
             required: requiredEl.checked,
             validations: validationsEl.value
         };
+        const indexedEl = document.getElementById('edit-field-indexed');
+        if (indexedEl) data.indexed = indexedEl.checked;
 
         try {
             const response = await fetch(`/api/form/config/${fieldId}`, {
@@ -2107,33 +2606,16 @@ document.addEventListener('DOMContentLoaded', function() {
         });
     }
     
-    function downloadCSV() {
-        if (!currentTableData || currentTableData.length === 0) {
-            alert("No data available to download.");
-            return;
-        }
-
+    function downloadExport(format) {
+        // The server streams the export, so the browser never holds the full dataset
+        const params = getFilterParams();
+        params.set('format', format);
         const selectedColumns = Array.from(document.querySelectorAll('#column-selector-options input:checked')).map(cb => cb.value);
-        const headers = selectedColumns.length > 0 ? selectedColumns : Object.keys(currentTableData[0]);
-        
-        const formatCell = (cell) => {
-            let cellString = String(cell === null || cell === undefined ? '' : cell);
-            if (cellString.search(/("|,|\n)/g) >= 0) {
-                cellString = `"${cellString.replace(/"/g, '""')}"`;
-            }
-            return cellString;
-        };
+        if (selectedColumns.length > 0) params.set('columns', selectedColumns.join(','));
 
-        const csvContent = [
-            headers.join(','),
-            ...currentTableData.map(row => headers.map(header => formatCell(row[header])).join(','))
-        ].join('\n');
-        
-        const blob = new Blob([csvContent], { type: 'text/csv;charset=utf-8;' });
         const link = document.createElement("a");
-        const url = URL.createObjectURL(blob);
-        link.setAttribute("href", url);
-        link.setAttribute("download", "recruitment_data.csv");
+        link.setAttribute("href", `/api/export?${params.toString()}`);
+        link.setAttribute("download", `recruitment_data.${format}`);
         link.style.visibility = 'hidden';
         document.body.appendChild(link);
         link.click();
@@ -2157,7 +2639,8 @@ document.addEventListener('DOMContentLoaded', function() {
                 if (closeBtn) {
                     closeBtn.addEventListener('click', () => {
                         modal.classList.add('hidden');
-                        if (modalId === 'status-modal' || modalId === 'form-config-modal') {
+                        // With live updates on, the changes made in these modals arrive as events
+                        if ((modalId === 'status-modal' || modalId === 'form-config-modal') && !liveState.connected) {
                             fetchDataAndRender(); // Refresh data on close
                         }
                     });
@@ -2243,11 +2726,27 @@ document.addEventListener('DOMContentLoaded', function() {
         });
         window.addEventListener('click', () => columnSelectorDropdown?.classList.add('hidden'));
 
-        document.getElementById('download-csv-btn').addEventListener('click', downloadCSV);
+        document.getElementById('download-csv-btn').addEventListener('click', () => downloadExport('csv'));
+        document.getElementById('download-xlsx-btn')?.addEventListener('click', () => downloadExport('xlsx'));
+        document.getElementById('bulk-apply-selected-btn')?.addEventListener('click', () => handleBulkStatusChange(false));
+        document.getElementById('bulk-apply-filtered-btn')?.addEventListener('click', () => handleBulkStatusChange(true));
+        document.getElementById('bulk-select-all')?.addEventListener('change', (e) => {
+            document.querySelectorAll('.bulk-select').forEach(cb => { cb.checked = e.target.checked; });
+        });
+        document.getElementById('table-prev-btn')?.addEventListener('click', () => changeTablePage(-1));
+        document.getElementById('table-next-btn')?.addEventListener('click', () => changeTablePage(1));
+        document.getElementById('candidate-search')?.addEventListener('input', (e) => {
+            searchState.query = e.target.value;
+            clearTimeout(searchState.timer);
+            searchState.timer = setTimeout(() => runSearch(1), 250);
+        });
+        document.getElementById('search-prev-btn')?.addEventListener('click', () => runSearch(searchState.page - 1));
+        document.getElementById('search-next-btn')?.addEventListener('click', () => runSearch(searchState.page + 1));
     }
 
     // --- Initial Load ---
     initializeEventListeners();
+    connectLiveUpdates();
     
     // Ensure DOM is fully loaded and layout is stable before initializing charts
     setTimeout(() => {
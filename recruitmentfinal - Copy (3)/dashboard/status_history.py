@@ -0,0 +1,200 @@
+"""Append-only status history and funnel velocity aggregates.
+
+Every status change is appended to status_events (never updated or deleted). Alongside
+each event the writer bumps two small precomputed tables:
+
+- status_transitions: how many candidates moved from one status to another
+- stage_duration_buckets: a log-scale histogram of how long candidates stayed in a status
+
+The funnel velocity chart reads only those two tables, so its cost depends on the number of
+statuses and buckets, not on how many events have been logged.
+"""
+import math
+from datetime import datetime, timezone
+
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+# Histogram resolution: buckets per doubling of the duration (~19% wide each)
+BUCKETS_PER_DOUBLING = 4
+
+SCHEMA = [
+    '''
+    CREATE TABLE IF NOT EXISTS status_events (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        email TEXT NOT NULL,
+        from_status TEXT NOT NULL,
+        to_status TEXT NOT NULL,
+        changed_at TEXT NOT NULL,
+        changed_by TEXT
+    )
+    ''',
+    "CREATE INDEX IF NOT EXISTS idx_status_events_email_time ON status_events (email, changed_at)",
+    '''
+    CREATE TRIGGER IF NOT EXISTS status_events_no_update BEFORE UPDATE ON status_events
+    BEGIN SELECT RAISE(ABORT, 'status_events is append-only'); END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS status_events_no_delete BEFORE DELETE ON status_events
+    BEGIN SELECT RAISE(ABORT, 'status_events is append-only'); END
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS status_transitions (
+        from_status TEXT NOT NULL,
+        to_status TEXT NOT NULL,
+        count INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (from_status, to_status)
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS stage_duration_buckets (
+        stage TEXT NOT NULL,
+        bucket INTEGER NOT NULL,
+        count INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (stage, bucket)
+    )
+    ''',
+]
+
+
+def init_status_history(conn):
+    for sql in SCHEMA:
+        conn.execute(sql)
+
+
+def _now():
+    return datetime.now(timezone.utc).strftime(TIMESTAMP_FORMAT)
+
+
+def _parse(timestamp):
+    try:
+        return datetime.strptime(str(timestamp)[:19], TIMESTAMP_FORMAT)
+    except ValueError:
+        return None
+
+
+def duration_bucket(seconds):
+    return int(math.floor(BUCKETS_PER_DOUBLING * math.log2(1 + max(seconds, 0))))
+
+
+def bucket_bounds(bucket):
+    """Duration range in seconds covered by a histogram bucket."""
+    return 2 ** (bucket / BUCKETS_PER_DOUBLING) - 1, 2 ** ((bucket + 1) / BUCKETS_PER_DOUBLING) - 1
+
+
+def _stage_entered_at(conn, email, from_status):
+    """When the candidate entered from_status: their last event, or the submission time for 'Applied'."""
+    last = conn.execute(
+        "SELECT changed_at FROM status_events WHERE email = ? ORDER BY changed_at DESC, id DESC LIMIT 1", (email,)
+    ).fetchone()
+    if last is not None:
+        return last[0]
+    if from_status == 'Applied':
+        row = conn.execute(
+            "SELECT submission_timestamp FROM applications a WHERE lower(a.email) = ? ORDER BY a.rowid LIMIT 1", (email,)
+        ).fetchone()
+        return row[0] if row is not None else None
+    return None  # status was set before history was kept
+
+
+def _count(conn, from_status, to_status, entered_at, changed_at):
+    conn.execute(
+        "INSERT INTO status_transitions (from_status, to_status, count) VALUES (?, ?, 1) "
+        "ON CONFLICT (from_status, to_status) DO UPDATE SET count = count + 1",
+        (from_status, to_status)
+    )
+    start, end = _parse(entered_at), _parse(changed_at)
+    if start is not None and end is not None:
+        conn.execute(
+            "INSERT INTO stage_duration_buckets (stage, bucket, count) VALUES (?, ?, 1) "
+            "ON CONFLICT (stage, bucket) DO UPDATE SET count = count + 1",
+            (from_status, duration_bucket((end - start).total_seconds()))
+        )
+
+
+def record_changes(conn, changes, changed_by=None):
+    """
+    Appends status events and updates the velocity aggregates, on the caller's transaction.
+
+    changes: iterable of (email, from_status, to_status); entries where nothing changed are skipped.
+    """
+    changed_at = _now()
+    for email, from_status, to_status in changes:
+        if from_status == to_status:
+            continue
+        entered_at = _stage_entered_at(conn, email, from_status)
+        conn.execute(
+            "INSERT INTO status_events (email, from_status, to_status, changed_at, changed_by) VALUES (?, ?, ?, ?, ?)",
+            (email, from_status, to_status, changed_at, changed_by)
+        )
+        _count(conn, from_status, to_status, entered_at, changed_at)
+
+
+def rebuild(conn):
+    """Recomputes status_transitions and stage_duration_buckets by replaying status_events."""
+    init_status_history(conn)
+    conn.execute("DELETE FROM status_transitions")
+    conn.execute("DELETE FROM stage_duration_buckets")
+    submitted = {row[0]: row[1] for row in conn.execute(
+        "SELECT lower(email), MIN(submission_timestamp) FROM applications GROUP BY lower(email)"
+    ).fetchall()}
+    last_email, entered_at, replayed = None, None, 0
+    for email, from_status, to_status, changed_at in conn.execute(
+        "SELECT email, from_status, to_status, changed_at FROM status_events ORDER BY email, changed_at, id"
+    ).fetchall():
+        if email != last_email:
+            last_email = email
+            entered_at = submitted.get(email) if from_status == 'Applied' else None
+        _count(conn, from_status, to_status, entered_at, changed_at)
+        entered_at = changed_at
+        replayed += 1
+    return replayed
+
+
+def get_history(conn, email):
+    rows = conn.execute(
+        "SELECT from_status, to_status, changed_at, changed_by FROM status_events WHERE email = ? ORDER BY changed_at, id",
+        (email.lower(),)
+    ).fetchall()
+    return [dict(row) for row in rows]
+
+
+def _median_seconds(buckets):
+    total = sum(count for _, count in buckets)
+    if total == 0:
+        return None
+    half, seen = total / 2, 0
+    for bucket, count in buckets:
+        if seen + count >= half:
+            low, high = bucket_bounds(bucket)
+            return low + (high - low) * ((half - seen) / count)
+        seen += count
+    return None
+
+
+def get_funnel_velocity(conn, stages):
+    """
+    Median days spent in each stage plus stage-to-stage transition counts.
+
+    Returns a chart-ready dict: labels/data (median days per stage), samples per stage and
+    the transition list.
+    """
+    histogram = {}
+    for stage, bucket, count in conn.execute(
+        "SELECT stage, bucket, count FROM stage_duration_buckets ORDER BY stage, bucket"
+    ).fetchall():
+        histogram.setdefault(stage, []).append((bucket, count))
+
+    labels, data, samples = [], [], []
+    for stage in list(stages) + sorted(set(histogram) - set(stages)):
+        if stage not in histogram:
+            continue
+        labels.append(stage)
+        data.append(round(_median_seconds(histogram[stage]) / 86400, 2))
+        samples.append(sum(count for _, count in histogram[stage]))
+
+    transitions = [
+        {'from': row[0], 'to': row[1], 'count': row[2]}
+        for row in conn.execute(
+            "SELECT from_status, to_status, count FROM status_transitions ORDER BY count DESC, from_status, to_status"
+        ).fetchall()
+    ]
+    return {'labels': labels, 'data': data, 'samples': samples, 'transitions': transitions}
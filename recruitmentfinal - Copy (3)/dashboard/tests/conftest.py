@@ -0,0 +1,51 @@
+import os
+import sqlite3
+import sys
+
+import pytest
+
+# The dashboard modules are flat files in the directory above
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import db  # noqa: E402
+import migrations  # noqa: E402
+
+
+@pytest.fixture
+def conn(tmp_path):
+    """A connection to a freshly migrated database, with rows as sqlite3.Row like the pool's."""
+    conn = sqlite3.connect(str(tmp_path / 'dashboard.db'))
+    conn.row_factory = sqlite3.Row
+    migrations.migrate(conn)
+    yield conn
+    conn.close()
+
+
+@pytest.fixture
+def pool(conn, tmp_path):
+    """A connection pool on the 'conn' database, like the one the app's background writers use."""
+    pool = db.ConnectionPool(str(tmp_path / 'dashboard.db'), max_size=4, timeout=5)
+    yield pool
+    pool.close_all()
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    """
+    A test client for the app, logged in as an admin, on a fresh database. The app's
+    per-process state (caches, shared versions) is module-level, so it is reset here.
+    """
+    import app
+    import coherence
+
+    monkeypatch.setattr(app, 'DATABASE', str(tmp_path / 'app.db'))
+    monkeypatch.setattr(app, 'shared_versions', coherence.SharedVersions())
+    monkeypatch.setattr(app, '_shared_versions_checked_at', 0.0)
+    app.data_cache.clear()
+    app.invalidate_form_config_snapshot()
+    app.init_db()
+    client = app.app.test_client()
+    with client.session_transaction() as session:
+        session.update({'user_id': 1, 'user_email': app.DEFAULT_ADMIN_EMAIL, 'user_role': 'admin'})
+    yield client
+    app.get_db_pool().close_all()
@@ -0,0 +1,105 @@
+"""Admission control: per-IP token buckets, the concurrency limit and its bounded wait queue."""
+import threading
+import time
+import types
+
+import pytest
+
+import admission
+import app
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(admission, 'time', types.SimpleNamespace(monotonic=clock.monotonic))
+    return clock
+
+
+def test_token_bucket_allows_a_burst_then_the_rate(clock):
+    buckets = admission.TokenBuckets(rate=2, burst=3)
+    assert [buckets.take('a') for _ in range(3)] == [0, 0, 0]
+    assert buckets.take('a') == pytest.approx(0.5)
+    assert buckets.take('b') == 0  # every client has its own bucket
+    clock.now += 0.5
+    assert buckets.take('a') == 0
+    assert buckets.take('a') == pytest.approx(0.5)
+    clock.now += 60
+    assert [buckets.take('a') for _ in range(4)][-1] > 0  # refills up to the burst, not beyond
+
+
+def test_token_buckets_forget_the_least_recently_seen_clients(clock):
+    buckets = admission.TokenBuckets(rate=1, burst=1, max_keys=2)
+    buckets.take('a')
+    buckets.take('b')
+    buckets.take('a')
+    buckets.take('c')
+    assert len(buckets) == 2
+    assert buckets.take('b') == 0  # forgotten, so it starts over with a full bucket
+    assert buckets.take('c') > 0
+
+
+def test_rate_limited_client_is_rejected(clock):
+    controller = admission.AdmissionController(rate=1, burst=1)
+    controller.acquire('10.0.0.1')
+    with pytest.raises(admission.Rejected) as rejected:
+        controller.acquire('10.0.0.1')
+    assert (rejected.value.reason, rejected.value.retry_after) == ('rate_limited', 1)
+    controller.acquire('10.0.0.2')
+    assert controller.stats()['shed'] == {'rate_limited': 1, 'queue_full': 0, 'queue_timeout': 0}
+
+
+def test_full_queue_sheds_and_release_admits_the_waiting_request():
+    controller = admission.AdmissionController(max_concurrent=1, max_queue=1, queue_timeout=5, rate=100, burst=100)
+    controller.acquire('a')
+    admitted = threading.Event()
+
+    def wait_in_queue():
+        controller.acquire('b')
+        admitted.set()
+
+    thread = threading.Thread(target=wait_in_queue)
+    thread.start()
+    deadline = time.monotonic() + 5
+    while controller.stats()['queued'] != 1:
+        assert time.monotonic() < deadline
+        time.sleep(0.005)
+
+    with pytest.raises(admission.Rejected) as rejected:
+        controller.acquire('c')
+    assert rejected.value.reason == 'saturated'
+    assert not admitted.is_set()
+    controller.release()
+    thread.join(5)
+    assert admitted.is_set()
+    stats = controller.stats()
+    assert (stats['in_flight'], stats['queued'], stats['admitted']) == (1, 0, 2)
+    assert stats['shed']['queue_full'] == 1
+
+
+def test_queued_request_is_shed_after_the_queue_timeout():
+    controller = admission.AdmissionController(max_concurrent=1, max_queue=1, queue_timeout=0.05, rate=100, burst=100)
+    controller.acquire('a')
+    with pytest.raises(admission.Rejected):
+        controller.acquire('b')
+    stats = controller.stats()
+    assert (stats['in_flight'], stats['queued'], stats['shed']['queue_timeout']) == (1, 0, 1)
+
+
+def test_public_endpoints_answer_429_but_the_dashboard_is_not_limited(client, monkeypatch):
+    monkeypatch.setattr(app, 'public_admission', admission.AdmissionController(rate=0.001, burst=1))
+    assert client.get('/api/public/form-config').status_code == 200
+    response = client.get('/api/public/form-config')
+    assert response.status_code == 429
+    assert int(response.headers['Retry-After']) >= 1
+    for _ in range(3):
+        assert client.get('/api/form/config').status_code == 200
+    assert app.public_admission.stats()['in_flight'] == 0
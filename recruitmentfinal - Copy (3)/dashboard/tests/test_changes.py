@@ -0,0 +1,81 @@
+"""Change bus: fan-out, Last-Event-ID replay, resync of lagging subscribers and the stream cap."""
+import app
+import changes
+
+
+def drain(subscription):
+    events = []
+    while not subscription.events.empty():
+        events.append(subscription.events.get_nowait()['id'])
+    return events
+
+
+def publish(bus, *ids):
+    for event_id in ids:
+        bus.publish(event_id, 'resync')
+
+
+def test_reconnecting_subscriber_gets_the_events_it_missed():
+    bus = changes.ChangeBus(history=10)
+    publish(bus, 1, 2, 3)
+    assert drain(bus.subscribe()) == []
+    subscription = bus.subscribe(last_event_id=1)
+    assert drain(subscription) == [2, 3]
+    publish(bus, 4)
+    assert drain(subscription) == [4]
+    assert bus.subscribe(last_event_id=4).overflowed is False
+
+
+def test_resync_when_the_missed_events_cannot_be_replayed():
+    bus = changes.ChangeBus(history=3)
+    publish(bus, 1, 2, 3, 4, 5)
+    assert bus.subscribe(last_event_id=1).overflowed  # older than the history
+    assert bus.subscribe(last_event_id=9).overflowed  # an id from before a restart
+    assert not bus.subscribe(last_event_id=2).overflowed
+
+    bus = changes.ChangeBus(history=10, max_pending=2)
+    publish(bus, 1, 2, 3, 4, 5)
+    assert bus.subscribe(last_event_id=2).overflowed  # more than max_pending behind
+    assert not bus.subscribe(last_event_id=3).overflowed
+
+
+def test_lagging_subscriber_overflows_until_resubscribed():
+    bus = changes.ChangeBus(max_pending=2)
+    subscription = bus.subscribe()
+    publish(bus, 1, 2, 3, 4)
+    assert subscription.overflowed
+    assert bus.stats()['overflows'] == 1
+    bus.resubscribe(subscription)
+    assert not subscription.overflowed and subscription.events.empty()
+    publish(bus, 5)
+    assert drain(subscription) == [5]
+
+
+def test_subscriber_cap():
+    bus = changes.ChangeBus(max_subscribers=1)
+    first = bus.subscribe()
+    assert bus.subscribe() is None
+    bus.unsubscribe(first)
+    assert bus.subscribe() is not None
+
+
+def test_stream_replays_from_last_event_id(client, monkeypatch):
+    bus = changes.ChangeBus()
+    monkeypatch.setattr(app, 'change_bus', bus)
+    bus.publish(7, 'application', {'rows': []})
+    bus.publish(8, 'status', {'rows': []})
+
+    response = client.get('/api/changes', headers={'Last-Event-ID': '7'})
+    assert response.mimetype == 'text/event-stream'
+    chunks = iter(response.response)
+    assert next(chunks).startswith(b'retry: ')
+    assert next(chunks) == b'id: 8\nevent: status\ndata: {"rows":[],"version":8}\n\n'
+    response.close()
+    assert bus.stats()['subscribers'] == 0
+
+
+def test_stream_turned_away_when_every_slot_is_taken(client, monkeypatch):
+    monkeypatch.setattr(app, 'change_bus', changes.ChangeBus(max_subscribers=0))
+    response = client.get('/api/changes')
+    assert response.status_code == 503
+    assert 'Retry-After' in response.headers
@@ -0,0 +1,77 @@
+"""Cross-process cache coherence: the shared cache_state versions and the per-request check."""
+import os
+import subprocess
+import sys
+
+import app
+import changes
+import coherence
+
+
+def test_public_form_config_revalidates_without_the_database(client, monkeypatch):
+    etag = client.get('/api/public/form-config').headers['ETag']
+
+    def no_database():
+        raise AssertionError('the database was used')
+
+    with monkeypatch.context() as patch:
+        patch.setattr(app, 'get_db_pool', no_database)
+        patch.setattr(app, 'get_db_conn', no_database)
+        response = client.get('/api/public/form-config', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+
+
+def test_public_endpoints_check_shared_versions_at_most_every_interval(client, monkeypatch):
+    reads = []
+    read_versions = app.coherence.read_versions
+    monkeypatch.setattr(app.coherence, 'read_versions', lambda conn: reads.append(1) or read_versions(conn))
+    monkeypatch.setattr(app, 'SHARED_VERSIONS_CHECK_MS', 60000)
+
+    for _ in range(3):
+        client.get('/api/public/form-config')
+    assert len(reads) == 1
+    # The dashboard looks on every request
+    client.get('/api/form/config')
+    client.get('/api/form/config')
+    assert len(reads) == 3
+    monkeypatch.setattr(app, 'SHARED_VERSIONS_CHECK_MS', 0)
+    client.get('/api/public/form-config')
+    assert len(reads) == 4
+
+
+def test_shared_versions_tell_own_writes_from_other_processes(conn):
+    first, second = coherence.SharedVersions(), coherence.SharedVersions()
+    first.catch_up(coherence.read_versions(conn))
+    second.catch_up(coherence.read_versions(conn))
+
+    assert first.bump(conn) == (1, False, False)
+    assert not second.is_current(coherence.read_versions(conn))
+    # The second process writes without having caught up: its bump reports the first one's write
+    assert second.bump(conn, form_config=True) == (2, True, False)
+    assert first.catch_up(coherence.read_versions(conn)) == (True, True)
+    assert first.is_current(coherence.read_versions(conn))
+    # A stale read (from before a concurrent bump) doesn't move a process backwards
+    assert first.catch_up((1, 0)) == (False, False)
+
+
+def test_write_from_another_process_drops_this_ones_caches(client, monkeypatch):
+    bus = changes.ChangeBus()
+    monkeypatch.setattr(app, 'change_bus', bus)
+    client.get('/api/form/config')
+    first_tag = client.get('/api/public/form-config').headers['ETag']
+    version = app.data_cache.version
+    subscription = bus.subscribe()
+
+    # Another process (the CLI, another worker) commits a form config change
+    subprocess.run([sys.executable, '-c', (
+        "import sqlite3, coherence; conn = sqlite3.connect(%r); "
+        "conn.execute(\"UPDATE form_config SET label = 'Applicant' WHERE name = 'name'\"); conn.commit(); "
+        "coherence.SharedVersions().bump(conn, form_config=True)" % app.DATABASE
+    )], cwd=os.path.dirname(os.path.abspath(app.__file__)), check=True)
+
+    client.get('/api/form/config')  # the dashboard looks on every request
+    assert app.data_cache.version == version + 1
+    assert subscription.get(0)['type'] == 'form_config'
+    response = client.get('/api/public/form-config')
+    assert response.headers['ETag'] != first_tag
+    assert b'Applicant' in response.data
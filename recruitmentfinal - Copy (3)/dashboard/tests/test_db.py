@@ -0,0 +1,68 @@
+"""Connection pool: FIFO hand-over to waiting threads, rollback on release, timeouts."""
+import threading
+import time
+
+import pytest
+
+import db
+
+
+def wait_until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, 'timed out'
+        time.sleep(0.005)
+
+
+def test_released_connection_goes_to_the_longest_waiting_thread(tmp_path):
+    pool = db.ConnectionPool(str(tmp_path / 'pool.db'), max_size=1, timeout=5)
+    order = []
+
+    def waiter(name):
+        conn = pool.acquire()
+        order.append(name)
+        time.sleep(0.01)
+        conn.close()
+
+    held = pool.acquire()
+    threads = []
+    for name in ('first', 'second'):
+        threads.append(threading.Thread(target=waiter, args=(name,)))
+        threads[-1].start()
+        wait_until(lambda: pool.stats()['waiting'] == len(threads))
+    held.close()
+    # Acquiring right after releasing queues behind the threads already waiting
+    pool.acquire().close()
+    order.append('releaser')
+    for thread in threads:
+        thread.join()
+
+    assert order == ['first', 'second', 'releaser']
+    stats = pool.stats()
+    assert (stats['created'], stats['in_use'], stats['waits']) == (1, 0, 3)
+    pool.close_all()
+
+
+def test_release_rolls_back_uncommitted_work(pool):
+    conn = pool.acquire()
+    conn.execute("INSERT INTO applications (email, name) VALUES ('ann@x.com', 'Ann')")
+    assert conn.in_transaction
+    conn.close()
+
+    again = pool.acquire()
+    assert again is conn
+    assert not again.in_transaction
+    assert again.execute("SELECT COUNT(*) FROM applications").fetchone()[0] == 0
+    again.close()
+
+
+def test_acquire_times_out_when_every_connection_is_in_use(tmp_path):
+    pool = db.ConnectionPool(str(tmp_path / 'pool.db'), max_size=1, timeout=0.05)
+    held = pool.acquire()
+    with pytest.raises(db.PoolTimeout):
+        pool.acquire()
+    assert pool.stats()['timeouts'] == 1
+    assert pool.stats()['waiting'] == 0
+    held.close()
+    pool.acquire().close()
+    pool.close_all()
@@ -0,0 +1,64 @@
+"""Bulk import: header mapping, merging rows into applications by lower-cased email."""
+import io
+
+import pytest
+
+import importer
+import rollups
+
+
+def run_import(conn, text, **kwargs):
+    return importer.import_rows(conn, importer.iter_file_rows(io.BytesIO(text.encode('utf-8')), 'file.csv'), **kwargs)
+
+
+def applications(conn):
+    return [tuple(row) for row in conn.execute(
+        "SELECT email, name, gender, location_of_position FROM applications ORDER BY id"
+    ).fetchall()]
+
+
+def test_headers_match_names_and_labels(conn):
+    report = run_import(conn, "Email Address,Full Name,GENDER,Favourite colour\nann@x.com,Ann,Female,Blue\n")
+    assert report['mapped_columns'] == {'Email Address': 'email', 'Full Name': 'name', 'GENDER': 'gender'}
+    assert report['ignored_headers'] == ['Favourite colour']
+    assert applications(conn) == [('ann@x.com', 'Ann', 'Female', None)]
+
+
+def test_mapping_overrides_and_missing_email(conn):
+    report = run_import(conn, "Mail,Who\nann@x.com,Ann\n", mapping={'Mail': 'email', 'Who': 'name'})
+    assert report['inserted'] == 1
+    with pytest.raises(importer.ImportFileError):
+        run_import(conn, "name\nAnn\n")
+    with pytest.raises(importer.ImportFileError):
+        run_import(conn, "Mail\nann@x.com\n", mapping={'Mail': 'no_such_field'})
+
+
+@pytest.mark.parametrize('chunk_size', [1, 100])
+def test_duplicate_emails_merge_the_same_within_and_across_chunks(conn, chunk_size):
+    report = run_import(conn, "email,name,gender,location_of_position\n"
+                              "Ann@X.com,Ann,Female,\n"
+                              "ann@x.com,,,Pune\n"
+                              "ANN@x.com,Ann B,,\n", chunk_size=chunk_size)
+    assert (report['inserted'], report['updated'], report['failed']) == (1, 2, 0)
+    assert [row[1:] for row in applications(conn)] == [('Ann B', 'Female', 'Pune')]
+    assert rollups.check(conn) == 0
+
+
+def test_existing_applications_match_case_insensitively(conn):
+    conn.execute("INSERT INTO applications (name, email, gender) VALUES ('Ann', 'Ann@X.com', 'Female')")
+    conn.commit()
+    report = run_import(conn, "email,location_of_position,gender\nann@x.COM,Pune,\nbob@x.com,Gurugram,Male\n")
+    assert (report['inserted'], report['updated']) == (1, 1)
+    assert applications(conn) == [('Ann@X.com', 'Ann', 'Female', 'Pune'), ('bob@x.com', None, 'Male', 'Gurugram')]
+    assert rollups.check(conn) == 0
+
+
+def test_bad_rows_are_reported_and_skipped(conn):
+    report = run_import(conn, "email,name,submission_timestamp\n"
+                              "not-an-email,Ann,\n"
+                              "bob@x.com,Bob,yesterday\n"
+                              ",,\n"
+                              "cid@x.com,Cid,2024-03-15T10:00\n")
+    assert (report['rows'], report['inserted'], report['failed']) == (3, 1, 2)
+    assert [error['row'] for error in report['errors']] == [2, 3]
+    assert conn.execute("SELECT submission_timestamp FROM applications").fetchone()[0] == '2024-03-15 10:00:00'
@@ -0,0 +1,90 @@
+"""Group-commit ingest: one transaction per batch, one savepoint per submission."""
+import sqlite3
+import threading
+
+import pytest
+
+import ingest
+import rollups
+
+
+def submit_together(queue, submissions):
+    """Submits from one thread each, all at once. Returns each one's application id or exception."""
+    results = [None] * len(submissions)
+
+    def run(i, values):
+        try:
+            results[i] = queue.submit(values, f'{i}.pdf')
+        except Exception as e:
+            results[i] = e
+
+    threads = [threading.Thread(target=run, args=(i, values)) for i, values in enumerate(submissions)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+@pytest.fixture
+def make_queue(pool):
+    queues = []
+
+    def make(**kwargs):
+        # A long delay, so submissions made together land in one batch
+        kwargs.setdefault('max_delay_ms', 500)
+        queue = ingest.IngestQueue(pool.acquire, **kwargs)
+        queues.append(queue)
+        return queue
+
+    yield make
+    for queue in queues:
+        queue.stop(timeout=5)
+
+
+def test_concurrent_submissions_share_one_commit(conn, make_queue):
+    committed = []
+    queue = make_queue(on_commit=lambda conn, ids, groups: committed.append(sorted(ids)))
+    results = submit_together(queue, [{'email': f'c{i}@x.com', 'name': f'C{i}', 'gender': 'Female'} for i in range(8)])
+
+    assert all(isinstance(result, int) for result in results)
+    assert committed == [sorted(results)]
+    stats = queue.stats()
+    assert (stats['batches'], stats['submissions'], stats['max_batch_size']) == (1, 8, 8)
+    assert conn.execute("SELECT COUNT(*) FROM applications").fetchone()[0] == 8
+    assert conn.execute("SELECT COUNT(*) FROM resume_jobs").fetchone()[0] == 8
+    assert rollups.check(conn) == 0
+
+
+def test_failed_submission_is_rolled_back_alone(conn, make_queue):
+    conn.execute("INSERT INTO applications (email, name) VALUES ('taken@x.com', 'Taken')")
+    rollups.rebuild(conn)
+    conn.commit()
+    queue = make_queue()
+    results = submit_together(queue, [
+        {'email': 'ann@x.com', 'name': 'Ann'},
+        {'email': 'taken@x.com', 'name': 'Again'},
+        {'email': 'bob@x.com', 'name': 'Bob'},
+    ])
+
+    assert isinstance(results[0], int) and isinstance(results[2], int)
+    assert isinstance(results[1], sqlite3.IntegrityError)
+    assert queue.stats()['batches'] == 1
+    assert queue.stats()['conflicts'] == 1
+    assert [row[0] for row in conn.execute("SELECT name FROM applications ORDER BY rowid")] == ['Taken', 'Ann', 'Bob']
+    assert sorted(row[0] for row in conn.execute("SELECT application_id FROM resume_jobs")) == sorted([results[0], results[2]])
+    assert rollups.check(conn) == 0
+
+
+def test_writer_failure_fails_the_whole_batch(make_queue):
+    errors = []
+
+    def get_conn():
+        raise sqlite3.OperationalError('disk I/O error')
+
+    queue = make_queue(on_error=lambda component, **fields: errors.append((component, fields)))
+    queue.get_conn = get_conn
+    results = submit_together(queue, [{'email': 'ann@x.com'}, {'email': 'bob@x.com'}])
+
+    assert all(isinstance(result, sqlite3.OperationalError) for result in results)
+    assert errors == [('ingest_writer', {'batch_size': 2})]
@@ -0,0 +1,58 @@
+"""Background thread errors: logged as JSON with their traceback and counted by component."""
+import io
+import json
+import logging
+import sqlite3
+
+import ingest
+import metrics
+
+
+def json_logger():
+    stream = io.StringIO()
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(metrics.JsonFormatter())
+    logger = logging.getLogger('test_metrics')
+    logger.handlers = [handler]
+    logger.propagate = False
+    return logger, stream
+
+
+def test_failed_on_commit_is_logged_and_counted(conn, tmp_path):
+    logger, stream = json_logger()
+    app_metrics = metrics.Metrics(logger=logger)
+
+    def on_commit(conn, ids, groups):
+        raise ValueError('rollup refresh failed')
+
+    def get_conn():
+        writer = sqlite3.connect(str(tmp_path / 'dashboard.db'), isolation_level=None)
+        writer.row_factory = sqlite3.Row
+        return writer
+
+    queue = ingest.IngestQueue(get_conn, on_commit=on_commit, on_error=app_metrics.record_background_error)
+    try:
+        # The submission itself is committed; only the callback failed
+        application_id = queue.submit({'email': 'ann@x.com', 'name': 'Ann'}, 'ann.pdf')
+    finally:
+        queue.stop(timeout=5)
+    assert conn.execute("SELECT email FROM applications WHERE rowid = ?", (application_id,)).fetchone()[0] == 'ann@x.com'
+
+    entry = json.loads(stream.getvalue().splitlines()[0])
+    assert entry['event'] == 'background_error'
+    assert entry['component'] == 'ingest_on_commit'
+    assert entry['applications'] == 1
+    assert 'ValueError: rollup refresh failed' in entry['exception']
+    assert 'dashboard_background_errors_total{component="ingest_on_commit"} 1' in app_metrics.render()
+
+
+def test_without_a_logger_errors_are_printed(capsys):
+    app_metrics = metrics.Metrics()
+    try:
+        raise RuntimeError('boom')
+    except RuntimeError:
+        app_metrics.record_background_error('search_reindex')
+    out = capsys.readouterr().out
+    assert out.startswith('--- SEARCH REINDEX ERROR ---')
+    assert 'RuntimeError: boom' in out
+    assert 'dashboard_background_errors_total{component="search_reindex"} 1' in app_metrics.render()
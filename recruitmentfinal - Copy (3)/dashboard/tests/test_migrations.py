@@ -0,0 +1,95 @@
+"""Schema migrations: fresh databases and databases left by the releases before schema_version."""
+import sqlite3
+
+import pytest
+
+import migrations
+import rollups
+import schema
+import search
+
+FIELDS = [('name', 'text'), ('email', 'email'), ('dob', 'date'), ('gender', 'select'), ('business_entity', 'select'),
+          ('post_applying_for', 'select'), ('location_of_position', 'select'), ('hobbies', 'text')]
+
+# The tables as the first release's init_db() created them, before schema_version existed
+BASELINE_SQL = [
+    "CREATE TABLE users (id INTEGER PRIMARY KEY AUTOINCREMENT, email TEXT UNIQUE NOT NULL, "
+    "password_hash TEXT NOT NULL, role TEXT NOT NULL CHECK(role IN ('admin', 'viewer')))",
+    "CREATE TABLE statuses (email TEXT PRIMARY KEY, name TEXT, status TEXT NOT NULL)",
+    "CREATE TABLE form_config (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT UNIQUE NOT NULL, label TEXT NOT NULL, "
+    "type TEXT NOT NULL, subsection TEXT, options TEXT, required BOOLEAN NOT NULL DEFAULT 0, "
+    "is_core BOOLEAN NOT NULL DEFAULT 0, field_order INTEGER DEFAULT 0, validations TEXT DEFAULT '{}')",
+    "CREATE TABLE form_sections (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT UNIQUE NOT NULL, "
+    "section_order INTEGER DEFAULT 0, description TEXT, icon TEXT DEFAULT 'folder', "
+    "created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)",
+]
+APPLICATIONS_SQL = ("CREATE TABLE applications (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT, email TEXT UNIQUE, "
+                    "submission_timestamp DATETIME DEFAULT CURRENT_TIMESTAMP, resume_path TEXT)")
+# What the old copy-based field delete left behind: the same columns without their constraints
+COPIED_APPLICATIONS_SQL = ("CREATE TABLE applications (id INTEGER, name TEXT, email TEXT, "
+                           "submission_timestamp DATETIME, resume_path TEXT)")
+
+
+def baseline_db(path, applications_sql=APPLICATIONS_SQL, emails=('ann@x.com', 'bob@x.com', 'cat@x.com')):
+    conn = sqlite3.connect(str(path))
+    conn.row_factory = sqlite3.Row
+    for sql in BASELINE_SQL + [applications_sql]:
+        conn.execute(sql)
+    for order, (name, field_type) in enumerate(FIELDS):
+        if name not in ('name', 'email'):
+            conn.execute(f"ALTER TABLE applications ADD COLUMN {name} TEXT")
+        conn.execute("INSERT INTO form_config (name, label, type, subsection, is_core, field_order) VALUES (?, ?, ?, ?, ?, ?)",
+                     (name, name.title(), field_type, 'Personal Details', int(name in ('name', 'email')), order))
+    for i, email in enumerate(emails, start=1):
+        conn.execute(
+            "INSERT INTO applications (id, name, email, submission_timestamp, gender, post_applying_for, hobbies) "
+            "VALUES (?, ?, ?, ?, 'Female', 'Intern', ?)",
+            (i, email.split('@')[0].title(), email, f'2024-03-0{i} 10:00:00', 'chess' if i == 1 else 'tennis')
+        )
+    # Status rows were keyed by the email as typed; the later row is the current status
+    conn.executemany("INSERT INTO statuses (email, name, status) VALUES (?, ?, ?)",
+                     [('Ann@X.com', 'Ann', 'Shortlisted'), ('ann@x.com', 'Ann', 'Rejected'), ('bob@x.com', 'Bob', 'Hired')])
+    conn.commit()
+    return conn
+
+
+def test_fresh_database_gets_every_migration_and_the_default_form(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / 'fresh.db'))
+    conn.row_factory = sqlite3.Row
+    assert migrations.migrate(conn) == list(range(1, migrations.LATEST_VERSION + 1))
+    assert migrations.get_version(conn) == migrations.LATEST_VERSION
+    assert conn.execute("SELECT COUNT(*) FROM form_config").fetchone()[0] == len(migrations.DEFAULT_FIELDS)
+    assert migrations.migrate(conn) == []
+
+
+@pytest.mark.parametrize('applications_sql', [APPLICATIONS_SQL, COPIED_APPLICATIONS_SQL], ids=['baseline', 'field_deleted'])
+def test_baseline_database_is_migrated_in_place(tmp_path, applications_sql):
+    conn = baseline_db(tmp_path / 'baseline.db', applications_sql)
+    assert migrations.get_version(conn) == 0
+    assert migrations.migrate(conn) == list(range(1, migrations.LATEST_VERSION + 1))
+    assert migrations.migrate(conn) == []
+
+    # Data and the customized form are kept; lost constraints are restored
+    assert [tuple(row) for row in conn.execute("SELECT id, email, hobbies FROM applications ORDER BY id")] == [
+        (1, 'ann@x.com', 'chess'), (2, 'bob@x.com', 'tennis'), (3, 'cat@x.com', 'tennis')]
+    assert [row[0] for row in conn.execute("SELECT name FROM form_config ORDER BY field_order")] == [name for name, _ in FIELDS]
+    assert schema.get_lost_constraints(conn) == []
+    # Status emails are lower-cased, keeping the most recent of case variants
+    assert [tuple(row) for row in conn.execute("SELECT email, status FROM statuses ORDER BY email")] == [
+        ('ann@x.com', 'Rejected'), ('bob@x.com', 'Hired')]
+
+    indexes = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert {schema.field_index_name(name) for name, _ in FIELDS if name in schema.DEFAULT_INDEXED_FIELDS} <= indexes
+    assert rollups.check(conn) == 0
+    assert [hit['email'] for hit in search.search(conn, 'chess')['hits']] == ['ann@x.com']
+    assert conn.execute("SELECT COUNT(*) FROM application_versions").fetchone()[0] == 3
+    assert conn.execute("SELECT COUNT(*) FROM cache_state").fetchone()[0] == 1
+
+
+def test_duplicate_emails_leave_the_constraints_unrestored_but_migrate(tmp_path):
+    conn = baseline_db(tmp_path / 'baseline.db', COPIED_APPLICATIONS_SQL, emails=('ann@x.com', 'ann@x.com', 'cat@x.com'))
+    migrations.migrate(conn)
+    assert migrations.get_version(conn) == migrations.LATEST_VERSION
+    assert 'email UNIQUE' in schema.get_lost_constraints(conn)
+    assert conn.execute("SELECT COUNT(*) FROM applications").fetchone()[0] == 3
+    assert rollups.check(conn) == 0
@@ -0,0 +1,146 @@
+"""get_dashboard_data() compared with the pandas computation /api/data used before it.
+
+Every case runs twice on the same fixture database: once answered from the rollup tables
+where they can, once from SQL on the applications table alone. Needs pandas, which the
+dashboard itself no longer installs (see requirements-dev.txt).
+"""
+import random
+import sqlite3
+
+import pytest
+
+import migrations
+import queries
+import rollups
+
+pd = pytest.importorskip('pandas')
+
+COLUMNS = queries.COLUMNS
+
+FILTER_CASES = [
+    {},
+    {'location': 'Pune'},
+    {'location': 'all', 'college': ''},
+    {'business_entity': ''},
+    {'business_entity': 'SIL', 'college': 'IIT'},
+    {'post': 'Intern', 'location': 'Gurugram'},
+    {'qualification': 'BTech', 'course': 'BTech'},
+    {'location': 'Nowhere'},
+    {'start_date': '2024-03-15'},
+    {'start_date': '2024-03-15T12:30'},
+    {'end_date': '2024-03-15'},
+    {'start_date': '2024-02-01', 'end_date': '2024-05-01', 'course': 'BSc'},
+    {'start_date': '2024-06-01', 'location': 'Bangalore'},
+]
+
+
+def pandas_dashboard(conn, filters):
+    """KPIs, charts and filter lists the way the pandas version of /api/data computed them."""
+    df = pd.read_sql_query("SELECT * FROM applications", conn)
+    df['email'] = df['email'].astype(str).str.lower().fillna('')
+    statuses_df = pd.read_sql_query("SELECT lower(email) as email, status FROM statuses", conn)
+    status_map = {row['email']: row['status'] for _, row in statuses_df.iterrows()}
+    df['Status'] = df.apply(lambda row: status_map.get(row.get('email', '').lower(), 'Applied'), axis=1)
+
+    df[COLUMNS['DATE']] = pd.to_datetime(df[COLUMNS['DATE']], errors='coerce')
+    if filters.get('start_date'):
+        df = df[df[COLUMNS['DATE']] >= pd.to_datetime(filters['start_date'])]
+    if filters.get('end_date'):
+        df = df[df[COLUMNS['DATE']] <= pd.to_datetime(filters['end_date'])]
+    for key, col in queries.FILTER_COLUMNS:
+        value = filters.get(key)
+        if value and value != 'all':
+            df = df[df[col].astype(str) == value]
+
+    status_counts = df['Status'].value_counts()
+    kpis = {'applications': len(df)}
+    for key, status in queries.STATUS_KPIS:
+        kpis[key] = int(status_counts.get(status, 0))
+    kpis['acceptance_rate'] = round(((kpis['hired'] + kpis['offered']) / kpis['applications']) * 100 if kpis['offered'] > 0 else 0, 2)
+    kpis['rejection_rate'] = round((kpis['rejected'] / len(df)) * 100 if len(df) > 0 else 0, 2)
+    charts = {
+        'apps_per_company': df[COLUMNS['COMPANY']].value_counts().to_dict(),
+        'apps_per_college': df[COLUMNS['COLLEGE']].value_counts().to_dict(),
+        'gender_diversity': df[COLUMNS['GENDER']].value_counts().to_dict(),
+        'recruitment_funnel': queries.build_funnel(kpis),
+    }
+    ids = sorted(df['id'].tolist())
+    df = df.fillna('')
+    filter_lists = {key: sorted(df[col].dropna().unique().tolist()) for key, col in queries.FILTER_LISTS}
+    return kpis, charts, filter_lists, ids
+
+
+@pytest.fixture(scope='module')
+def fixture_db(tmp_path_factory):
+    """A migrated database with applications full of NULL and '' values and partial statuses."""
+    conn = sqlite3.connect(str(tmp_path_factory.mktemp('db') / 'dashboard.db'))
+    conn.row_factory = sqlite3.Row
+    migrations.migrate(conn)
+    rnd = random.Random(1)
+    for i in range(400):
+        row = {
+            'name': f"Candidate {i}", 'email': f"User{i}@Example.com",
+            'business_entity': rnd.choice(['SIL', 'ZIL', 'ZMSL', None, '']),
+            'post_applying_for': rnd.choice(['Intern', 'Civil Engineer', None]),
+            'location_of_position': rnd.choice(['Gurugram', 'Pune', 'Bangalore', None]),
+            'qualification_grad_school': rnd.choice(['IIT', 'NIT', 'DU', None, '']),
+            'qualification_grad_course': rnd.choice(['BTech', 'BSc', None]),
+            'gender': rnd.choice(['Male', 'Female', 'Other', None, '']),
+            'submission_timestamp': rnd.choice([
+                f"2024-0{rnd.randint(1, 9)}-{rnd.randint(10, 28)} {rnd.randint(0, 23):02d}:{rnd.randint(0, 59):02d}:00",
+                '2024-03-15 00:00:00', '2024-03-15 12:30:00', None,
+            ]),
+        }
+        conn.execute(
+            f"INSERT INTO applications ({', '.join(row)}) VALUES ({', '.join('?' * len(row))})", list(row.values())
+        )
+        # Candidates without a statuses row count as 'Applied'
+        if rnd.random() < 0.6:
+            conn.execute("INSERT INTO statuses (email, name, status) VALUES (?, ?, ?)",
+                         (row['email'].lower(), row['name'], rnd.choice(queries.STATUSES)))
+    rollups.rebuild(conn)
+    conn.commit()
+    yield conn
+    conn.close()
+
+
+@pytest.fixture(params=['rollups', 'sql'])
+def conn(request, fixture_db):
+    """The fixture database, with the rollup tables hidden for the 'sql' run."""
+    if request.param == 'sql':
+        fixture_db.execute("ALTER TABLE rollup_status RENAME TO hidden_rollup_status")
+        assert not rollups.is_available(fixture_db)
+    yield fixture_db
+    if request.param == 'sql':
+        fixture_db.execute("ALTER TABLE hidden_rollup_status RENAME TO rollup_status")
+    fixture_db.commit()
+
+
+@pytest.mark.parametrize('filters', FILTER_CASES, ids=lambda filters: '&'.join(f"{k}={v}" for k, v in filters.items()) or 'none')
+def test_dashboard_data_matches_pandas(conn, filters):
+    kpis, charts, filter_lists, ids = pandas_dashboard(conn, filters)
+    data = queries.get_dashboard_data(conn, filters)
+
+    assert data['kpis'] == kpis
+    assert {key: value for key, value in data['charts'].items() if key != 'funnel_velocity'} == charts
+    assert data['filters'] == filter_lists
+    assert sorted(row['id'] for row in data['table_data']) == ids
+
+
+def test_status_defaults_to_applied(conn):
+    data = queries.get_dashboard_data(conn, {})
+    without_status, explicitly_applied = conn.execute(
+        "SELECT SUM(s.email IS NULL), SUM(s.status = 'Applied') FROM applications a "
+        "LEFT JOIN statuses s ON s.email = lower(a.email)"
+    ).fetchone()
+    assert without_status > 0
+    assert sum(row['Status'] == 'Applied' for row in data['table_data']) == without_status + explicitly_applied
+    assert data['kpis']['applications'] == data['charts']['recruitment_funnel']['data'][0] == 400
+
+
+def test_empty_database(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / 'empty.db'))
+    conn.row_factory = sqlite3.Row
+    migrations.migrate(conn)
+    assert queries.get_dashboard_data(conn, {}) == queries.EMPTY_DASHBOARD
+    conn.close()
@@ -0,0 +1,98 @@
+"""Row version triggers and the /api/table delta sync (row_versions.get_changes)."""
+import row_versions
+import schema
+
+
+def add_application(conn, name, email, location=None):
+    return conn.execute(
+        "INSERT INTO applications (name, email, location_of_position) VALUES (?, ?, ?)", (name, email, location)
+    ).lastrowid
+
+
+def changed_ids(conn, since, **filters):
+    changes = row_versions.get_changes(conn, filters, since)
+    assert not changes['full']
+    return sorted(row['id'] for row in changes['upserted']), sorted(changes['deleted'])
+
+
+def test_application_writes_are_stamped(conn):
+    first = add_application(conn, 'Ann', 'ann@x.com')
+    second = add_application(conn, 'Bob', 'bob@x.com')
+    since = row_versions.get_version(conn)
+
+    conn.execute("UPDATE applications SET name = 'Ann B' WHERE id = ?", (first,))
+    conn.execute("DELETE FROM applications WHERE id = ?", (second,))
+    third = add_application(conn, 'Cid', 'cid@x.com')
+
+    assert changed_ids(conn, since) == ([first, third], [second])
+    assert changed_ids(conn, row_versions.get_version(conn)) == ([], [])
+
+
+def test_status_insert_update_and_delete_restamp_the_application(conn):
+    ann = add_application(conn, 'Ann', 'Ann@X.com')
+    add_application(conn, 'Bob', 'bob@x.com')
+
+    since = row_versions.get_version(conn)
+    conn.execute("INSERT OR REPLACE INTO statuses (email, name, status) VALUES ('ann@x.com', 'Ann', 'Hired')")
+    changes = row_versions.get_changes(conn, {}, since)
+    assert [(row['id'], row['Status']) for row in changes['upserted']] == [(ann, 'Hired')]
+
+    since = changes['version']
+    conn.execute("UPDATE statuses SET status = 'Rejected' WHERE email = 'ann@x.com'")
+    assert changed_ids(conn, since) == ([ann], [])
+
+    since = row_versions.get_version(conn)
+    conn.execute("DELETE FROM statuses WHERE email = 'ann@x.com'")
+    changes = row_versions.get_changes(conn, {}, since)
+    assert [(row['id'], row['Status']) for row in changes['upserted']] == [(ann, 'Applied')]
+
+
+def test_merged_status_emails_restamp_the_application(conn):
+    ann = add_application(conn, 'Ann', 'ann@x.com')
+    conn.execute("INSERT INTO statuses (email, name, status) VALUES ('ANN@x.com', 'Ann', 'Hired')")
+    conn.execute("INSERT INTO statuses (email, name, status) VALUES ('ann@x.com', 'Ann', 'Offered')")
+    since = row_versions.get_version(conn)
+
+    assert schema.normalize_status_emails(conn) == (1, 0)
+    assert changed_ids(conn, since) == ([ann], [])
+
+
+def test_rows_leaving_the_filters_are_reported_deleted(conn):
+    pune = add_application(conn, 'Ann', 'ann@x.com', 'Pune')
+    add_application(conn, 'Bob', 'bob@x.com', 'Gurugram')
+    since = row_versions.get_version(conn)
+
+    conn.execute("UPDATE applications SET location_of_position = 'Gurugram' WHERE id = ?", (pune,))
+    assert changed_ids(conn, since, location='Pune') == ([], [pune])
+    assert changed_ids(conn, since, location='Gurugram') == ([pune], [])
+
+
+def test_old_or_large_deltas_ask_for_a_full_reload(conn):
+    add_application(conn, 'Ann', 'ann@x.com')
+    since = row_versions.get_version(conn)
+    row_versions.mark_reset(conn)
+    assert row_versions.get_changes(conn, {}, since)['full']
+
+    since = row_versions.get_version(conn)
+    for i in range(3):
+        add_application(conn, f"C{i}", f"c{i}@x.com")
+    assert row_versions.get_changes(conn, {}, since, limit=2)['full']
+    assert not row_versions.get_changes(conn, {}, since, limit=3)['full']
+    assert row_versions.get_changes(conn, {}, row_versions.get_version(conn) + 1)['full']
+
+
+def test_table_changes_endpoint(client):
+    import app
+    conn = app.get_db_conn()
+    add_application(conn, 'Ann', 'ann@x.com')
+    conn.commit()
+    conn.close()
+    page = client.get('/api/table').get_json()
+    assert page['total'] == 1
+
+    client.post('/api/update_status', json={'email': 'ann@x.com', 'name': 'Ann', 'status': 'Hired'})
+    changes = client.get(f"/api/table/changes?since={page['version']}").get_json()
+    assert [row['Status'] for row in changes['upserted']] == ['Hired']
+    assert changes['version'] > page['version'] and changes['deleted'] == []
+
+    assert client.get('/api/table/changes').status_code == 400
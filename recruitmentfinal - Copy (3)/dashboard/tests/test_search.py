@@ -0,0 +1,78 @@
+"""Full-text search: the sync triggers, column changes and deferred reindexes."""
+import time
+
+import search
+
+
+def found(conn, text):
+    return [hit['email'] for hit in search.search(conn, text)['hits']]
+
+
+def add_application(conn, email, name, **values):
+    values = dict(values, email=email, name=name)
+    return conn.execute(
+        f"INSERT INTO applications ({', '.join(values)}) VALUES ({', '.join('?' * len(values))})", list(values.values())
+    ).lastrowid
+
+
+def test_triggers_keep_documents_in_sync(conn):
+    ann = add_application(conn, 'ann@x.com', 'Ann Lee', hobbies='chess')
+    add_application(conn, 'bob@x.com', 'Bob Roy', hobbies='tennis')
+    assert found(conn, 'chess') == ['ann@x.com']
+    assert found(conn, 'ro') == ['bob@x.com']  # the last word matches as a prefix
+
+    conn.execute("UPDATE applications SET hobbies = 'go' WHERE rowid = ?", (ann,))
+    assert found(conn, 'chess') == []
+    conn.execute("INSERT INTO resume_text (application_id, resume_path, text, extracted_at) "
+                 "VALUES (?, 'ann.pdf', 'Kubernetes operator', '2026-01-01 00:00:00')", (ann,))
+    hits = search.search(conn, 'kubernetes')['hits']
+    assert [hit['email'] for hit in hits] == ['ann@x.com']
+    assert hits[0]['resume_snippet'] == '<mark>Kubernetes</mark> operator'
+
+    conn.execute("DELETE FROM applications WHERE rowid = ?", (ann,))
+    assert found(conn, 'kubernetes') == []
+    assert conn.execute("SELECT COUNT(*) FROM applications_fts").fetchone()[0] == 1
+
+
+def test_adding_an_empty_column_only_replaces_the_triggers(conn):
+    add_application(conn, 'ann@x.com', 'Ann')
+    conn.execute("ALTER TABLE applications ADD COLUMN github TEXT")
+    conn.execute("INSERT INTO form_config (name, label, type) VALUES ('github', 'GitHub', 'text')")
+    assert search.sync_search_index(conn, defer=True) is False
+    assert conn.execute("SELECT value FROM search_meta WHERE key = 'reindex_after'").fetchone() is None
+
+    conn.execute("UPDATE applications SET github = 'octocat' WHERE email = 'ann@x.com'")
+    assert found(conn, 'octocat') == ['ann@x.com']
+
+
+def test_reindex_step_works_through_the_backlog_in_batches(conn):
+    for i in range(5):
+        add_application(conn, f'c{i}@x.com', f'C{i}', mobile_number=f'98765{i}')
+    conn.execute("UPDATE form_config SET type = 'text' WHERE name = 'mobile_number'")
+    assert search.sync_search_index(conn, defer=True) is True
+    conn.commit()
+    assert found(conn, '987650') == []  # not reindexed yet
+
+    assert [search.reindex_step(conn, batch_size=2) for _ in range(5)] == [2, 2, 1, 0, None]
+    assert found(conn, '987650') == ['c0@x.com']
+    assert len(found(conn, '98765')) == 5
+
+
+def test_reindexer_finishes_a_deferred_reindex(conn, pool):
+    for i in range(5):
+        add_application(conn, f'c{i}@x.com', f'C{i}', mobile_number=f'98765{i}')
+    conn.execute("UPDATE form_config SET type = 'text' WHERE name = 'mobile_number'")
+    search.sync_search_index(conn, defer=True)
+    conn.commit()
+
+    errors = []
+    reindexer = search.Reindexer(pool.acquire, batch_size=2, on_error=lambda component, **fields: errors.append(component))
+    reindexer.start()
+    deadline = time.monotonic() + 5
+    while reindexer._thread is not None:
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+    assert errors == []
+    assert len(found(conn, '98765')) == 5
+    assert conn.execute("SELECT value FROM search_meta WHERE key = 'reindex_after'").fetchone() is None
@@ -0,0 +1,73 @@
+"""Single and bulk status updates: validation, rollups, history and the live event."""
+import pytest
+
+import app
+import rollups
+
+
+@pytest.fixture
+def candidates(client):
+    conn = app.get_db_conn()
+    conn.executemany("INSERT INTO applications (name, email, gender) VALUES (?, ?, ?)",
+                     [('Ann', 'Ann@X.com', 'Female'), ('Bob', 'bob@x.com', 'Male')])
+    rollups.rebuild(conn)
+    conn.commit()
+    conn.close()
+    return client
+
+
+def query(sql, params=()):
+    conn = app.get_db_conn()
+    try:
+        return [tuple(row) for row in conn.execute(sql, params).fetchall()]
+    finally:
+        conn.close()
+
+
+def test_update_status(candidates):
+    subscription = app.change_bus.subscribe()
+    try:
+        response = candidates.post('/api/update_status', json={'email': 'ANN@x.com ', 'name': 'Ann', 'status': 'Hired'})
+        assert response.get_json() == {'success': True}
+        event = subscription.get(1)
+    finally:
+        app.change_bus.unsubscribe(subscription)
+
+    assert query("SELECT email, status FROM statuses") == [('ann@x.com', 'Hired')]
+    assert query("SELECT email, from_status, to_status FROM status_events") == [('ann@x.com', 'Applied', 'Hired')]
+    assert query("SELECT status, SUM(count) FROM rollup_status GROUP BY status ORDER BY status") == [('Applied', 1), ('Hired', 1)]
+    assert event['type'] == 'status'
+    assert [row['Status'] for row in event['data']['rows']] == ['Hired']
+    assert 'transitions' in event['data']['funnel_velocity']
+
+
+@pytest.mark.parametrize('body', [{'email': 'ann@x.com', 'status': 'Promoted'}, {'email': 'ann@x.com'}, {'status': 'Hired'}])
+def test_update_status_rejects_bad_requests(candidates, body):
+    response = candidates.post('/api/update_status', json=body)
+    assert response.status_code == 400 and 'error' in response.get_json()
+    assert query("SELECT * FROM statuses") == []
+
+
+def test_update_status_database_error_is_json(candidates):
+    conn = app.get_db_conn()
+    conn.execute("DROP TABLE status_events")
+    conn.commit()
+    conn.close()
+    response = candidates.post('/api/update_status', json={'email': 'ann@x.com', 'status': 'Hired'})
+    assert response.status_code == 500
+    assert response.get_json()['error']
+    assert query("SELECT * FROM statuses") == []
+
+
+def test_bulk_update_status(candidates):
+    response = candidates.post('/api/update_status/bulk', json={'status': 'Offered', 'emails': ['ann@x.com', 'nobody@x.com']})
+    assert [result['result'] for result in response.get_json()['results']] == ['updated', 'not_found']
+    response = candidates.post('/api/update_status/bulk', json={'status': 'Offered', 'filters': {}})
+    assert [result['result'] for result in response.get_json()['results']] == ['unchanged', 'updated']
+    assert candidates.post('/api/update_status/bulk', json={'status': 'Promoted', 'emails': []}).status_code == 400
+
+    conn = app.get_db_conn()
+    try:
+        assert rollups.check(conn) == 0
+    finally:
+        conn.close()
@@ -0,0 +1,31 @@
+"""WSGI entry point for running the dashboard with several worker processes.
+
+    gunicorn wsgi:app
+
+gunicorn reads gunicorn.conf.py from the working directory: WEB_WORKERS processes with
+SERVER_THREADS threads each, the same variable app.py derives its per-worker limits from.
+
+Each worker process imports this module and sets itself up with init_worker_process(): the
+database is migrated once (workers starting together wait for each other), and every worker
+keeps its own caches, which the shared cache_state row keeps consistent across workers.
+
+- Keep threaded workers (gthread, as in gunicorn.conf.py): the live dashboard stream
+  (/api/changes) holds a thread for as long as a dashboard is open. CHANGE_MAX_SUBSCRIBERS
+  (a quarter of SERVER_THREADS by default) caps the streams per worker; dashboards turned
+  away poll for changes instead.
+- Don't use --preload: init_worker_process() opens database connections and starts threads, which
+  must happen in the worker process, after the fork.
+- Admission limits (PUBLIC_MAX_CONCURRENT ...) and the connection pool (DB_POOL_SIZE) apply
+  per worker and default to shares of SERVER_THREADS: running and queued public requests
+  together get at most half of the threads, and live streams a quarter. /metrics reports the worker that answered the scrape.
+- Resume extraction doesn't run in the workers: the gunicorn master starts one
+  "flask --app app process-resumes --watch" process for the host (see gunicorn.conf.py), so
+  there is a single extraction pool however many workers there are. With
+  RESUME_WORKER_IN_WEB=0 it doesn't either, for when that process runs elsewhere.
+
+On Windows, where gunicorn isn't available, waitress serves the same module with threads in
+one process; give it SERVER_THREADS threads: waitress-serve --listen=0.0.0.0:5000 --threads=16 wsgi:app
+"""
+from app import app, init_worker_process
+
+init_worker_process()